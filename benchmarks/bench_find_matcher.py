@@ -0,0 +1,74 @@
+"""Benchmark: /find matching over a synthetic 100k-message corpus.
+
+"legacy" is the original inner loop (lowercasing the query and the message
+for every comparison, extended naively to several terms); "compiled" is
+oda_search.compile_query. Install pyahocorasick to exercise the automaton
+path for the many-terms case.
+
+    python benchmarks/bench_find_matcher.py [--messages 100000]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from oda_search import ahocorasick, compile_query, parse_terms  # noqa: E402
+
+WORDS = ("operator tenno void dash relic fissure ordis liset lotus grineer corpus infested kuva "
+         "lich riven mod build frame prime warframe helminth arcane steel path sortie archon "
+         "the a to of and is in it you that for on with run anyone need help trade wts wtb").split()
+
+
+def make_corpus(n, rng):
+    return [" ".join(rng.choices(WORDS, k=rng.randint(3, 30))).capitalize() for _ in range(n)]
+
+
+def legacy_matcher(text, mode):
+    terms = parse_terms(text)
+    if len(terms) == 1:
+        return lambda content: text.lower() in content.lower()
+    if mode == "all":
+        return lambda content: all(t.lower() in content.lower() for t in terms)
+    return lambda content: any(t.lower() in content.lower() for t in terms)
+
+
+def timed(matcher, corpus):
+    started = time.perf_counter()
+    hits = sum(1 for content in corpus if matcher(content))
+    return time.perf_counter() - started, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100000)
+    args = parser.parse_args()
+    rng = random.Random(42)
+    corpus = make_corpus(args.messages, rng)
+    many = " ".join(rng.sample(WORDS, 20))
+
+    cases = [
+        ("single term", "riven", "all"),
+        ("3 terms AND", "void relic fissure", "all"),
+        ("3 terms OR", "kuva lich archon", "any"),
+        ("20 terms OR", many, "any"),
+        ("20 terms AND", many, "all"),
+        ("regex", r"\bw(ts|tb)\b.*prime", "regex"),
+    ]
+    print(f"{len(corpus)} messages, aho-corasick {'available' if ahocorasick else 'not installed'}")
+    print(f"{'case':14s} {'legacy':>10s} {'compiled':>10s} {'speedup':>8s}")
+    for label, text, mode in cases:
+        compiled_time, compiled_hits = timed(compile_query(text, mode), corpus)
+        if mode == "regex":
+            print(f"{label:14s} {'-':>10s} {compiled_time * 1000:8.1f}ms {'-':>8s}  ({compiled_hits} hits)")
+            continue
+        legacy_time, legacy_hits = timed(legacy_matcher(text, mode), corpus)
+        assert legacy_hits == compiled_hits, (label, legacy_hits, compiled_hits)
+        print(f"{label:14s} {legacy_time * 1000:8.1f}ms {compiled_time * 1000:8.1f}ms "
+              f"{legacy_time / compiled_time:7.1f}x  ({compiled_hits} hits)")
+
+
+if __name__ == "__main__":
+    main()
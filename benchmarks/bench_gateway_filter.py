@@ -0,0 +1,99 @@
+"""Benchmark: CPU per MESSAGE_CREATE event with and without the pre-parse filter.
+
+Replays --events synthetic MESSAGE_CREATE frames from a busy guild through a
+discord.py ConnectionState, the way the gateway reader does (JSON decode, then
+the parser). --relevant is the fraction of messages sent in a live IGN channel,
+the only ones the bot keeps when the message index is off. The third line is
+what lean intents save outright: with guild_messages off Discord never sends
+the frame. Requires discord.py.
+
+    python benchmarks/bench_gateway_filter.py [--events 100000] [--relevant 0.01]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+GUILD_ID = 1
+LIVE_CHANNEL_ID = 100
+
+
+def message_frame(i, channel_id):
+    return json.dumps({
+        "id": str(10**17 + i),
+        "channel_id": str(channel_id),
+        "guild_id": str(GUILD_ID),
+        "author": {"id": str(2 * 10**17 + i % 5000), "username": f"tenno{i % 5000}",
+                   "discriminator": "0", "global_name": None, "avatar": None},
+        "member": {"roles": [], "joined_at": "2024-01-01T00:00:00+00:00", "deaf": False, "mute": False,
+                   "flags": 0},
+        "content": f"looking for squad for eidolons, message {i} <@{2 * 10**17}>",
+        "timestamp": "2024-06-01T12:00:00+00:00",
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [{"id": str(2 * 10**17), "username": "tenno0", "discriminator": "0", "avatar": None}],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+        "flags": 0,
+    })
+
+
+def build_state():
+    import discord
+    from oda_gateway import lean_intents
+
+    client = discord.Client(intents=lean_intents(True), max_messages=1000)
+    state = client._connection
+    channels = [{"id": str(LIVE_CHANNEL_ID + n), "type": 0, "name": f"chat-{n}", "position": n,
+                 "permission_overwrites": []} for n in range(20)]
+    guild = discord.Guild(data={"id": str(GUILD_ID), "name": "Synthetic", "member_count": 5000,
+                                "channels": channels, "roles": []}, state=state)
+    state._add_guild(guild)
+    return state
+
+
+def run(frames, state, filtered):
+    from oda_gateway import EventFilter
+
+    event_filter = None
+    if filtered:
+        event_filter = EventFilter(state, "MESSAGE_CREATE",
+                                   lambda data: int(data["channel_id"]) == LIVE_CHANNEL_ID).install()
+    parse = state.parsers["MESSAGE_CREATE"]
+    started = time.process_time()
+    for frame in frames:
+        parse(json.loads(frame))
+    elapsed = time.process_time() - started
+    if event_filter is not None:
+        event_filter.uninstall()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--relevant", type=float, default=0.01)
+    args = parser.parse_args()
+
+    every = max(1, round(1 / args.relevant)) if args.relevant > 0 else args.events + 1
+    frames = [message_frame(i, LIVE_CHANNEL_ID if i % every == 0 else LIVE_CHANNEL_ID + 1 + i % 19)
+              for i in range(args.events)]
+    state = build_state()
+
+    before = run(frames, state, filtered=False)
+    after = run(frames, state, filtered=True)
+    print(f"unfiltered (decode + parse):  {before / args.events * 1e6:8.2f} us CPU/event")
+    print(f"filtered (decode + drop):     {after / args.events * 1e6:8.2f} us CPU/event")
+    print(f"lean intents, events off:     {0:8.2f} us CPU/event (never sent)")
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
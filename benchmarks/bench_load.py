@@ -0,0 +1,276 @@
+"""Load test: drive OdaBot end to end against a local fake Discord gateway and REST API.
+
+Starts benchmarks/fake_discord.py in a subprocess, points discord.py's REST,
+webhook and gateway URLs at it, imports oda_bot_improved_Version2 with a
+throwaway state and index, and replays a weighted mix of /pun, /tip, /find and
+/sync_ign interactions plus background MESSAGE_CREATE traffic at fixed rates.
+Reports per-command throughput, time to first response and completion latency
+percentiles (measured by the fake server, from INTERACTION_CREATE to the last
+callback/webhook call), queue wait, run time and end-to-end latency (submit to
+finish) of the /find and /sync_ign background jobs, REST calls and 429s per
+route, and the bot process's resident memory. /find and /sync_ign interactions
+complete when the job is acknowledged, so their job latency is the one to read,
+along with the drain time: how long the jobs took to finish after the load
+ended. /sync_ign jobs are paced by the fake's member-edit limit (10 renames per
+10s per guild) and /find jobs for the same guild queue behind them, so draining
+can take minutes. Exits with status 1 only if --max-drain is given and the jobs
+take longer than that to drain.
+Runs fully offline. Requires discord.py.
+
+    python benchmarks/bench_load.py [--rate 20] [--messages 100] [--duration 30] \\
+        [--mix pun=4,tip=4,find=1,sync_ign=1] [--index] [--unthrottled]
+"""
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+FAKE_DISCORD = Path(__file__).resolve().parent / "fake_discord.py"
+RSS_SAMPLE_INTERVAL = 0.25
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * resource.getpagesize() / 2**20
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def configure_environment(args, workdir):
+    """Environment read by oda_config when the bot is imported"""
+    os.environ.update({
+        "DISCORD_TOKEN": "fake-token",
+        "ODA_STATE_BACKEND": args.state_backend,
+        "ODA_STATE_PATH": str(workdir / "state.json"),
+        "ODA_STATE_DB": str(workdir / "state.db"),
+        "ODA_INDEX_PATH": str(workdir / "message_index.db"),
+        "ODA_MESSAGE_INDEX": "1" if args.index else "0",
+        "ODA_LEAN_INTENTS": "0" if args.full_intents else "1",
+        "ODA_DIAGNOSTICS": "0",
+    })
+    for name in ("ODA_METRICS_PORT", "ODA_DEV_GUILD_ID", "ODA_SHARDING", "ODA_SHARD_COUNT", "ODA_SHARD_IDS"):
+        os.environ.pop(name, None)
+
+
+def point_discord_at(port):
+    """Send discord.py's REST, webhook and gateway traffic to the fake server"""
+    import discord.gateway
+    import discord.http
+    import discord.webhook.async_
+    import yarl
+
+    base = f"http://127.0.0.1:{port}/api/v10"
+    discord.http.Route.BASE = base
+    discord.webhook.async_.Route.BASE = base
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(f"ws://127.0.0.1:{port}/gateway")
+
+
+async def wait_for_server(session, port, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            async with session.get(f"http://127.0.0.1:{port}/_harness/health") as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError("fake Discord server did not start")
+        await asyncio.sleep(0.2)
+
+
+async def sample_rss(peak):
+    while True:
+        peak[0] = max(peak[0], rss_mb())
+        await asyncio.sleep(RSS_SAMPLE_INTERVAL)
+
+
+def format_latency(summary):
+    if not summary:
+        return "-"
+    return f"{summary['p50']:7.1f} {summary['p95']:7.1f} {summary['p99']:7.1f} {summary['max']:8.1f}"
+
+
+def print_report(report, memory, args):
+    print(f"\nran {args.duration:.0f}s at {args.rate:g} interactions/s and {args.messages:g} messages/s "
+          f"(settled after {report['elapsed']:.1f}s)\n")
+    print(f"{'command':10s} {'sent':>6s} {'ok':>6s} {'throt.':>6s} {'other':>6s} {'done/s':>7s}   "
+          f"{'first response ms p50/p95/p99/max':>33s}   {'completion ms p50/p95/p99/max':>33s}")
+    for command, stats in report["commands"].items():
+        outcomes = stats["outcomes"]
+        other = stats["sent"] - outcomes.get("ok", 0) - outcomes.get("throttled", 0)
+        print(f"{command:10s} {stats['sent']:6d} {outcomes.get('ok', 0):6d} {outcomes.get('throttled', 0):6d} "
+              f"{other:6d} {stats['throughput']:7.1f}   {format_latency(stats['first_response_ms']):>33s}   "
+              f"{format_latency(stats['completion_ms']):>33s}")
+    if {"find", "sync_ign"} & set(report["commands"]):
+        print("(/find and /sync_ign complete once their job is queued; see the job table for the time to finish)")
+    print("\nREST calls (429s):")
+    for route, count in report["rest_calls"].items():
+        limited = report["rest_429"].get(route, 0)
+        print(f"  {count:7d} ({limited:5d})  {route}")
+    sent = ", ".join(f"{k}={v}" for k, v in sorted(report["gateway_sent"].items()))
+    print(f"\ngateway events sent: {sent}")
+    if report["gateway_suppressed"]:
+        suppressed = ", ".join(f"{k}={v}" for k, v in report["gateway_suppressed"].items())
+        print(f"gateway events not subscribed (intents): {suppressed}")
+    print(f"\nbot RSS: after import {memory['import']:.1f} MiB, ready {memory['ready']:.1f} MiB, "
+          f"peak {memory['peak']:.1f} MiB, end {memory['end']:.1f} MiB")
+
+
+async def wait_for_jobs(scheduler, timeout):
+    """Interactions settle once a job is queued; wait for the jobs themselves to finish.
+    Returns how many are still queued or running at the deadline and the seconds waited."""
+    from oda_jobs import ACTIVE
+
+    started = time.monotonic()
+    while True:
+        unfinished = sum(1 for r in scheduler.records.values() if r["status"] in ACTIVE)
+        waited = time.monotonic() - started
+        if not unfinished or waited >= timeout:
+            return unfinished, waited
+        await asyncio.sleep(0.1)
+
+
+def print_jobs(scheduler):
+    from fake_discord import percentiles
+
+    counts = {}
+    waits, runs, totals = {}, {}, {}
+    for record in scheduler.records.values():
+        kind = record["kind"]
+        key = (kind, record["status"])
+        counts[key] = counts.get(key, 0) + 1
+        waits.setdefault(kind, [])
+        if record["started"]:
+            waits[kind].append(record["started"] - record["created"])
+            if record["finished"]:
+                runs.setdefault(kind, []).append(record["finished"] - record["started"])
+                totals.setdefault(kind, []).append(record["finished"] - record["created"])
+    if not counts:
+        return
+    jobs = ", ".join(f"{kind} {status}={n}" for (kind, status), n in sorted(counts.items()))
+    print(f"\nbackground jobs: {jobs}")
+    print(f"{'job':10s} {'queue wait ms p50/p95/p99/max':>33s}   {'run ms p50/p95/p99/max':>33s}   "
+          f"{'submit to finish ms p50/p95/p99/max':>35s}")
+    for kind in sorted(waits):
+        print(f"{kind:10s} {format_latency(percentiles(waits[kind])):>33s}   "
+              f"{format_latency(percentiles(runs.get(kind, []))):>33s}   "
+              f"{format_latency(percentiles(totals.get(kind, []))):>35s}")
+
+
+async def run(args):
+    import aiohttp
+
+    workdir = Path(tempfile.mkdtemp(prefix="oda-load-"))
+    port = free_port()
+    server = subprocess.Popen([sys.executable, str(FAKE_DISCORD), "--port", str(port), "--guilds", str(args.guilds),
+                               "--members", str(args.members), "--history", str(args.history)],
+                              stdout=subprocess.DEVNULL)
+    bot = runner = None
+    exit_status = 0
+    try:
+        async with aiohttp.ClientSession() as session:
+            await wait_for_server(session, port)
+            configure_environment(args, workdir)
+            point_discord_at(port)
+            import oda_bot_improved_Version2 as oda
+            import oda_config
+            if not args.verbose:
+                # Quiet the output without raising logger levels: BotMetrics counts 429s from discord.http warnings
+                for handler in logging.getLogger().handlers:
+                    handler.setLevel(logging.ERROR)
+            if args.unthrottled:
+                for limiter in (oda_config.COMMAND_LIMIT, oda_config.FIND_LIMIT, oda_config.SYNC_IGN_LIMIT,
+                                oda_config.LIVE_IGN_LIMIT):
+                    limiter.configure(10**9, 1)
+            memory = {"import": rss_mb()}
+
+            bot = oda.bot
+            runner = asyncio.create_task(bot.start(os.environ["DISCORD_TOKEN"]))
+            await asyncio.wait_for(bot.wait_until_ready(), 60)
+            memory["ready"] = rss_mb()
+
+            peak = [memory["ready"]]
+            sampler = asyncio.create_task(sample_rss(peak))
+            spec = {"duration": args.duration, "rate": args.rate, "messages": args.messages,
+                    "mix": parse_mix(args.mix), "settle": args.settle, "timeout": args.timeout}
+            timeout = aiohttp.ClientTimeout(total=args.duration + args.timeout + 60)
+            async with session.post(f"http://127.0.0.1:{port}/_harness/run", json=spec, timeout=timeout) as response:
+                report = await response.json()
+            unfinished, drain = await wait_for_jobs(bot.jobs, args.timeout)
+            sampler.cancel()
+            memory["peak"] = max(peak[0], rss_mb())
+            memory["end"] = rss_mb()
+            print_report(report, memory, args)
+            print_jobs(bot.jobs)
+            drifted = {guild.id: bot.guild_stats.verify(guild) for guild in bot.guilds}
+            drifted = {guild_id: mismatches for guild_id, mismatches in drifted.items() if mismatches}
+            print(f"\nguild counts ({bot.guild_stats.guild_count} guilds, {bot.guild_stats.total_members} members) "
+                  f"vs recount: {drifted or 'consistent'}")
+            if unfinished:
+                print(f"\njobs drained: no, {unfinished} still queued or running {drain:.1f}s after the load ended; "
+                      f"their latency is not in the report (raise --timeout to wait longer)")
+            else:
+                print(f"\njobs drained: {drain:.1f}s after the load ended")
+            if args.max_drain is not None and (unfinished or drain > args.max_drain):
+                print(f"FAILED: jobs took longer than --max-drain {args.max_drain:g}s to drain")
+                exit_status = 1
+    finally:
+        if bot is not None:
+            await bot.close()
+        if runner is not None:
+            with contextlib.suppress(Exception):
+                await runner
+        server.terminate()
+        server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return exit_status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=20, help="interactions per second")
+    parser.add_argument("--messages", type=float, default=100, help="MESSAGE_CREATE events per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load")
+    parser.add_argument("--mix", default="pun=4,tip=4,find=1,sync_ign=1", help="command weights")
+    parser.add_argument("--guilds", type=int, default=4)
+    parser.add_argument("--members", type=int, default=5000, help="members per guild")
+    parser.add_argument("--history", type=int, default=2000, help="seeded messages per channel")
+    parser.add_argument("--index", action="store_true", help="enable the message index (and message events)")
+    parser.add_argument("--full-intents", action="store_true", help="ODA_LEAN_INTENTS=0")
+    parser.add_argument("--state-backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--unthrottled", action="store_true", help="lift the bot's per-user/guild command limits")
+    parser.add_argument("--settle", type=float, default=2.0, help="idle seconds that end a run")
+    parser.add_argument("--timeout", type=float, default=300.0, help="max seconds to wait for stragglers and jobs")
+    parser.add_argument("--max-drain", type=float, help="exit with status 1 if jobs take longer than this to drain")
+    parser.add_argument("--verbose", action="store_true", help="keep the bot's INFO logging")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
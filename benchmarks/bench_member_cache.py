@@ -0,0 +1,82 @@
+"""Benchmark: resident memory of the full vs lean member cache on a synthetic large guild.
+
+Each policy runs in a fresh subprocess that builds a discord.py Guild with
+--members members. "full" caches every member (what chunking at startup
+does); "lean" disables the member cache and keeps only the --active members
+seen in messages/interactions in the bot's LRU. Requires discord.py.
+
+    python benchmarks/bench_member_cache.py [--members 200000] [--active 5000]
+"""
+import argparse
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * resource.getpagesize() / 2**20
+
+
+def member_payload(i):
+    return {
+        "user": {"id": str(10**17 + i), "username": f"tenno{i}", "discriminator": "0",
+                 "global_name": f"Tenno {i}", "avatar": None},
+        "nick": f"IGN{i}" if i % 3 == 0 else None,
+        "roles": [],
+        "joined_at": "2024-01-01T00:00:00+00:00",
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+
+
+def build(policy, members, active):
+    import discord
+    from oda_cache import LRUCache
+
+    intents = discord.Intents.default()
+    intents.members = True
+    flags = discord.MemberCacheFlags.all() if policy == "full" else discord.MemberCacheFlags.none()
+    client = discord.Client(intents=intents, member_cache_flags=flags,
+                            chunk_guilds_at_startup=policy == "full")
+    state = client._connection
+    guild = discord.Guild(data={"id": "1", "name": "Synthetic", "member_count": members}, state=state)
+
+    baseline = rss_mb()
+    started = time.perf_counter()
+    if policy == "full":
+        for i in range(members):
+            guild._add_member(discord.Member(data=member_payload(i), guild=guild, state=state))
+    else:
+        lru = LRUCache(active)
+        # Members only enter the cache when they post or interact; simulate a day's activity
+        for i in range(0, members, max(1, members // (active * 4))):
+            member = discord.Member(data=member_payload(i), guild=guild, state=state)
+            lru.put((guild.id, member.id), member)
+    elapsed = time.perf_counter() - started
+    print(f"{policy:5s} cached={len(guild._members) if policy == 'full' else len(lru):8d} "
+          f"rss_delta={rss_mb() - baseline:8.1f} MiB  build={elapsed:6.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, default=200000)
+    parser.add_argument("--active", type=int, default=5000)
+    parser.add_argument("--policy", choices=["full", "lean"])
+    args = parser.parse_args()
+    if args.policy:
+        build(args.policy, args.members, args.active)
+        return
+    for policy in ("full", "lean"):
+        subprocess.run([sys.executable, __file__, "--policy", policy,
+                        "--members", str(args.members), "--active", str(args.active)], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Micro-benchmark: sanitize_nickname over a corpus of realistic IGN posts.
+
+Compares the original three-regex, two-pass implementation with the compiled
+sanitizer, both uncached and through its LRU cache, and reports how many
+outputs differ from the original (mentions are now removed instead of being
+left behind as "@1234").
+
+    python benchmarks/bench_sanitize.py [--posts 20000] [--repeat 5]
+"""
+import argparse
+import random
+import re
+import sys
+import timeit
+import unicodedata
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from oda_ign import _sanitize, sanitize_nickname, _sanitize_cached  # noqa: E402
+
+
+def legacy_sanitize_nickname(raw: str, max_length: int = 32) -> str:
+    if not raw:
+        return ""
+    s = raw
+    s = s.replace('`', '')
+    s = s.replace('<', '')
+    s = s.replace('>', '')
+    s = re.sub(r"@(?:here|everyone)", "", s, flags=re.IGNORECASE)
+    s = re.sub(r"<@!?(\d+)>", "", s)
+    s = unicodedata.normalize('NFKD', s)
+    s = ''.join(ch for ch in s if not unicodedata.category(ch).startswith('C'))
+    s = ''.join(ch for ch in s if unicodedata.category(ch) != 'Mn')
+    s = re.sub(r"[\uFE0E\uFE0F\u200D\u200B]", "", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    if len(s) > max_length:
+        s = s[:max_length].strip()
+    return s
+
+
+NAMES = ["Tenno", "VoidWalker", "xX_Excal_Xx", "LotusChild", "KuvaLich", "Ordis", "Nyx Prime",
+         "Grineer Hunter", "corpus_cfo", "Saryn4Life", "Mesa Main", "TennoGen"]
+EMOJI = ["🔥", "⚔️", "👍🏽", "🏳️‍🌈", "✨", "🐉"]
+ZALGO = [chr(c) for c in range(0x300, 0x36F)]
+
+
+def make_post(rng):
+    name = rng.choice(NAMES) + str(rng.randint(0, 9999))
+    kind = rng.random()
+    if kind < 0.55:
+        pass  # plain ASCII, the common case
+    elif kind < 0.70:
+        name = rng.choice(EMOJI) + name + rng.choice(EMOJI)
+    elif kind < 0.80:
+        name = ''.join(ch + ''.join(rng.choices(ZALGO, k=rng.randint(1, 4))) for ch in name)
+    elif kind < 0.90:
+        name = f"<@!{rng.randint(10**17, 10**18)}> {name} @everyone"
+    else:
+        name = "\u200b" + name.replace("o", "\uff4f") + "\ufe0f `code`"
+    return name
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(1234)
+    # Real channels repeat: members re-post and the same IGNs recur across syncs
+    unique = [make_post(rng) for _ in range(args.posts // 4)]
+    corpus = [rng.choice(unique) for _ in range(args.posts)]
+
+    differing = sum(legacy_sanitize_nickname(p) != _sanitize(p, 32) for p in unique)
+
+    def run(fn):
+        return lambda: [fn(p) for p in corpus]
+
+    timings = {
+        "legacy": run(legacy_sanitize_nickname),
+        "compiled (uncached)": run(lambda p: _sanitize(p, 32)),
+        "compiled + LRU cache": run(sanitize_nickname),
+    }
+    print(f"{len(corpus)} posts, {len(unique)} unique, {differing} unique outputs differ from legacy")
+    baseline = None
+    for label, fn in timings.items():
+        _sanitize_cached.cache_clear()
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        baseline = baseline or best
+        print(f"{label:22s} {best * 1e6 / len(corpus):8.2f} us/post  {baseline / best:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
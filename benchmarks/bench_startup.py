@@ -0,0 +1,145 @@
+"""Benchmark: time from process start to READY, checked against a budget.
+
+Starts benchmarks/fake_discord.py, then launches the improved bot --runs times
+in fresh interpreters against it, sharing one state directory the way a
+restarted container does. Each run reports when imports finished, when
+setup_hook finished (state, extensions, command sync) and when READY arrived,
+measured from process spawn. The first run is a first boot (no state, so the
+command tree is synced); the rest are restarts. Exits non-zero when the median
+restart exceeds --budget seconds. With --handoff each run stops through the
+bot's graceful shutdown with ODA_SESSION_HANDOFF=1, so every restart resumes
+the previous run's gateway session instead of identifying. Runs fully offline.
+Requires discord.py.
+
+    python benchmarks/bench_startup.py [--runs 5] [--budget 2.0] [--extensions fun,info,search,ign,diagnostics] \
+        [--handoff]
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCHMARKS = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARKS.parent))
+sys.path.insert(0, str(BENCHMARKS))
+FAKE_DISCORD = BENCHMARKS / "fake_discord.py"
+
+
+async def child(port):
+    """One bot start: print wall-clock timestamps of each phase as JSON"""
+    from bench_load import point_discord_at
+
+    point_discord_at(port)
+    import oda_bot_improved_Version2 as oda
+    timings = {"imported": time.time()}
+    bot = oda.bot
+    runner = None
+    try:
+        await bot.login(os.environ["DISCORD_TOKEN"])  # runs setup_hook
+        timings["setup"] = time.time()
+        runner = asyncio.create_task(bot.connect())
+        await asyncio.wait_for(bot.wait_until_ready(), 60)
+        timings["ready"] = time.time()
+        timings["resumed"] = bool(bot.handoff and bot.handoff.resumed)
+    finally:
+        if bot.handoff is not None:
+            await bot.shutdown()
+        else:
+            await bot.close()
+    if runner is not None:
+        await asyncio.gather(runner, return_exceptions=True)
+    print(json.dumps(timings), flush=True)
+
+
+def start_once(port, env):
+    spawned = time.time()
+    result = subprocess.run([sys.executable, __file__, "--child", str(port)], env=env,
+                            capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(f"bot failed to start:\n{result.stderr[-2000:]}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    resumed = timings.pop("resumed", False)
+    return dict({phase: at - spawned for phase, at in timings.items()}, resumed=resumed)
+
+
+def wait_for_server(port, timeout=60.0):
+    """Wait until the fake server answers; returns its health report"""
+    import urllib.request
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_harness/health", timeout=1) as response:
+                return json.loads(response.read())
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError("fake Discord server did not start")
+            time.sleep(0.2)
+
+
+def format_run(label, run):
+    return (f"{label:10s} imports {run['imported'] * 1000:6.0f}ms  setup {(run['setup'] - run['imported']) * 1000:6.0f}ms  "
+            f"gateway {(run['ready'] - run['setup']) * 1000:6.0f}ms  READY {run['ready'] * 1000:6.0f}ms"
+            f"{'  (resumed)' if run['resumed'] else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=2.0, help="max median seconds from spawn to READY on restart")
+    parser.add_argument("--extensions", default=None, help="ODA_EXTENSIONS for the bot (default: all)")
+    parser.add_argument("--guilds", type=int, default=4)
+    parser.add_argument("--members", type=int, default=5000, help="members per guild")
+    parser.add_argument("--index", action="store_true", help="enable the message index (and message events)")
+    parser.add_argument("--handoff", action="store_true", help="stop gracefully and resume the session on restart")
+    parser.add_argument("--child", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        asyncio.run(child(args.child))
+        return
+
+    from bench_load import free_port
+
+    workdir = Path(tempfile.mkdtemp(prefix="oda-startup-"))
+    port = free_port()
+    server = subprocess.Popen([sys.executable, str(FAKE_DISCORD), "--port", str(port), "--guilds", str(args.guilds),
+                               "--members", str(args.members), "--history", "10"], stdout=subprocess.DEVNULL)
+    env = dict(os.environ, DISCORD_TOKEN="fake-token", ODA_STATE_PATH=str(workdir / "state.json"),
+               ODA_STATE_DB=str(workdir / "state.db"), ODA_INDEX_PATH=str(workdir / "message_index.db"),
+               ODA_MESSAGE_INDEX="1" if args.index else "0", ODA_DIAGNOSTICS="0")
+    for name in ("ODA_METRICS_PORT", "ODA_DEV_GUILD_ID", "ODA_SHARDING", "ODA_SHARD_COUNT", "ODA_SHARD_IDS",
+                 "ODA_FORCE_SYNC"):
+        env.pop(name, None)
+    if args.extensions is not None:
+        env["ODA_EXTENSIONS"] = args.extensions
+    env["ODA_SESSION_HANDOFF"] = "1" if args.handoff else "0"
+    env["ODA_HANDOFF_PATH"] = str(workdir / "gateway_session.json")
+    try:
+        wait_for_server(port)
+        runs = [start_once(port, env) for _ in range(max(2, args.runs))]
+        sessions = wait_for_server(port)["sessions"]
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(format_run("first boot", runs[0]))
+    for n, run in enumerate(runs[1:], 1):
+        print(format_run(f"restart {n}", run))
+    print(f"\ngateway sessions: {', '.join(f'{k}={v}' for k, v in sorted(sessions.items()))}")
+    median = statistics.median(run["ready"] for run in runs[1:])
+    verdict = "within" if median <= args.budget else "OVER"
+    print(f"\nmedian restart to READY: {median:.2f}s ({verdict} the {args.budget:.2f}s budget)")
+    if median > args.budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark: /pun-style command throughput with per-command vs batched state saves.
+
+Runs a simulated burst of commands on the event loop. "before" rewrites
+state.json synchronously on every command (the old save_state), "after" only
+marks the StateStore dirty and lets it flush in the background.
+
+    python benchmarks/bench_state.py [--commands 5000]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from oda_state import StateStore, default_state  # noqa: E402
+
+
+def legacy_save_state(state, path):
+    with open(path, 'w') as f:
+        json.dump(state, f, indent=4)
+
+
+def bump(state):
+    stats = state["stats"]
+    stats["puns_told"] = stats.get("puns_told", 0) + 1
+    stats["commands_used"] = stats.get("commands_used", 0) + 1
+
+
+async def run_legacy(path, n):
+    state = default_state()
+    start = time.perf_counter()
+    for _ in range(n):
+        bump(state)
+        legacy_save_state(state, path)
+        await asyncio.sleep(0)
+    return time.perf_counter() - start
+
+
+async def run_store(path, n):
+    store = StateStore(path, flush_interval=1.0)
+    store.start()
+    start = time.perf_counter()
+    for _ in range(n):
+        bump(store.state)
+        store.mark_dirty()
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    await store.close()
+    with open(path) as f:
+        assert json.load(f)["stats"]["commands_used"] == n
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", type=int, default=5000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        before = asyncio.run(run_legacy(Path(tmp) / "legacy.json", args.commands))
+        after = asyncio.run(run_store(Path(tmp) / "state.json", args.commands))
+    print(f"before (save_state per command): {args.commands / before:12,.0f} commands/s")
+    print(f"after  (StateStore.mark_dirty):  {args.commands / after:12,.0f} commands/s")
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
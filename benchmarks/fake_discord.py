@@ -0,0 +1,736 @@
+"""Offline stand-in for the Discord gateway and REST API, for load tests.
+
+Serves, on one local port:
+- /gateway: a websocket speaking enough of the gateway protocol for discord.py
+  (HELLO, heartbeats, IDENTIFY -> READY + GUILD_CREATE, RESUME with replay of
+  the events sent while disconnected, member chunk requests) and replaying synthetic MESSAGE_CREATE and INTERACTION_CREATE events
+- /api/v10/...: the REST routes the bot uses (login, command sync, interaction
+  callbacks and webhooks, paginated channel history, member fetch/edit, the guild
+  reads a resumed session loads its cache with), with
+  per-route buckets that send X-RateLimit headers and answer 429 when exhausted
+- /_harness/...: control endpoints used by bench_load.py to start a run and
+  collect per-interaction latencies and REST/429 counts
+
+Guilds, channels, members and channel history are generated from a seed.
+Requires aiohttp. Normally started by bench_load.py:
+
+    python benchmarks/fake_discord.py --port 8765 [--guilds 4] [--members 5000] [--history 2000]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict, deque
+from datetime import datetime, timezone
+
+from aiohttp import WSMsgType, web
+
+API_PREFIX = "/api/v10"
+DISCORD_EPOCH = 1420070400000
+HEARTBEAT_INTERVAL_MS = 41250
+GUILD_MESSAGES_INTENT = 1 << 9
+ADMINISTRATOR = "8"
+APPLICATION_ID = 900000000000000001
+BOT_USER_ID = APPLICATION_ID
+GUILD_ID_BASE = 910000000000000000
+CHANNEL_ID_BASE = 920000000000000000
+USER_ID_BASE = 930000000000000000
+CHANNELS_PER_GUILD = 6
+MEMBER_CHUNK_SIZE = 1000
+HISTORY_PAGE_DEFAULT = 50
+HISTORY_PAGE_MAX = 100
+REPLAY_BUFFER = 10000  # dispatched events kept for RESUME
+VOCABULARY = ("eidolon", "squad", "riven", "arbitration", "kuva", "lich", "steel", "path", "void", "relic",
+              "radiant", "fissure", "netracells", "archon", "shard", "helminth", "incarnon", "duviri",
+              "circuit", "sortie", "nightwave", "baro", "prime", "trade", "build", "forma", "catalyst")
+
+# (method, route template) -> (bucket, limit, per seconds, major parameter); interaction
+# callbacks and webhooks are not bound by the global limit, like on Discord
+DEFAULT_LIMITS = {
+    ("GET", "/channels/{channel_id}/messages"): ("history", 10, 1.0, "channel_id"),
+    ("GET", "/guilds/{guild_id}/members/{user_id}"): ("member-get", 20, 1.0, "guild_id"),
+    ("PATCH", "/guilds/{guild_id}/members/{user_id}"): ("member-edit", 10, 10.0, "guild_id"),
+}
+GLOBAL_LIMIT = (50, 1.0)
+GLOBAL_EXEMPT = ("/interactions/", "/webhooks/")
+
+
+def snowflake(ms: float, sequence: int = 0) -> int:
+    return (int(ms) - DISCORD_EPOCH) << 22 | (sequence & 0x3FFFFF)
+
+
+def iso_timestamp(ms: float) -> str:
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).isoformat()
+
+
+def json_response(data, status=200, headers=None):
+    """JSON response with a bare application/json content type, which is what discord.py parses"""
+    return web.Response(body=json.dumps(data).encode(), status=status,
+                        headers={**(headers or {}), "Content-Type": "application/json"})
+
+
+def percentiles(values, points=(50, 90, 95, 99)):
+    """Nearest-rank percentiles plus max, in milliseconds"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    summary = {f"p{p}": ordered[min(len(ordered) - 1, max(0, -(-p * len(ordered) // 100) - 1))] * 1000
+               for p in points}
+    summary["max"] = ordered[-1] * 1000
+    return summary
+
+
+class Bucket:
+    """Fixed-window REST bucket reporting Discord-style rate limit headers"""
+
+    def __init__(self, name: str, limit: int, per: float):
+        self.name = name
+        self.limit = limit
+        self.per = per
+        self.remaining = limit
+        self.reset_at = 0.0
+
+    def take(self, now: float):
+        """Returns (allowed, headers, retry_after)"""
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.per
+        reset_after = self.reset_at - now
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Reset": f"{time.time() + reset_after:.3f}",
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+            "X-RateLimit-Bucket": self.name,
+        }
+        if self.remaining <= 0:
+            headers["X-RateLimit-Remaining"] = "0"
+            headers["X-RateLimit-Scope"] = "user"
+            return False, headers, reset_after
+        self.remaining -= 1
+        headers["X-RateLimit-Remaining"] = str(self.remaining)
+        return True, headers, 0.0
+
+
+class Channel:
+    def __init__(self, guild_id: int, channel_id: int, name: str, kind: int = 0, parent_id=None, position=0):
+        self.guild_id = guild_id
+        self.id = channel_id
+        self.name = name
+        self.type = kind
+        self.parent_id = parent_id
+        self.position = position
+        self.ids = []
+        self.messages = []
+
+    def to_dict(self):
+        data = {"id": str(self.id), "guild_id": str(self.guild_id), "type": self.type, "name": self.name,
+                "position": self.position, "permission_overwrites": [], "nsfw": False,
+                "parent_id": str(self.parent_id) if self.parent_id else None}
+        if self.type == 0:
+            data.update({"topic": None, "rate_limit_per_user": 0,
+                         "last_message_id": str(self.ids[-1]) if self.ids else None})
+        return data
+
+    def append(self, message):
+        self.ids.append(int(message["id"]))
+        self.messages.append(message)
+
+    def page(self, limit: int, before=None, after=None):
+        """Up to `limit` messages, newest first, like GET /channels/{id}/messages"""
+        if after is not None:
+            start = bisect_right(self.ids, after)
+            chunk = self.messages[start:start + limit]
+        else:
+            end = bisect_left(self.ids, before) if before is not None else len(self.ids)
+            chunk = self.messages[max(0, end - limit):end]
+        return chunk[::-1]
+
+
+class Guild:
+    def __init__(self, index: int, members: int, rng: random.Random):
+        self.id = GUILD_ID_BASE + index
+        self.name = f"Synthetic Clan {index}"
+        self.created_ms = time.time() * 1000 - 86400000 * 365
+        self.members = {}
+        for i in range(members):
+            user_id = USER_ID_BASE + index * 10**7 + i
+            self.members[user_id] = {
+                "user": {"id": str(user_id), "username": f"tenno{index}_{i}", "discriminator": "0",
+                         "global_name": f"Tenno {i}", "avatar": None},
+                "nick": f"Old{i}" if rng.random() < 0.3 else None,
+                "roles": [], "joined_at": iso_timestamp(self.created_ms), "deaf": False, "mute": False,
+                "flags": 0, "pending": False, "avatar": None,
+            }
+        self.member_ids = list(self.members)
+        self.bot_role_id = self.id + 500000
+        category_id = CHANNEL_ID_BASE + index * 100
+        self.category = Channel(self.id, category_id, "Warframe", kind=4)
+        self.channels = [Channel(self.id, category_id + 1 + n, "ign" if n == 0 else f"chat-{n}",
+                                 parent_id=category_id, position=n) for n in range(CHANNELS_PER_GUILD)]
+        self.ign_channel = self.channels[0]
+
+    def bot_member(self):
+        return {"user": {"id": str(BOT_USER_ID), "username": "Oda", "discriminator": "0", "avatar": None,
+                         "bot": True, "global_name": None},
+                "nick": None, "roles": [str(self.bot_role_id)], "joined_at": iso_timestamp(self.created_ms),
+                "deaf": False, "mute": False, "flags": 0}
+
+    def role(self, role_id, name, permissions, position):
+        return {"id": str(role_id), "name": name, "permissions": permissions, "position": position, "color": 0,
+                "hoist": False, "managed": False, "mentionable": False, "flags": 0}
+
+    def to_dict(self):
+        return {
+            "id": str(self.id), "name": self.name, "icon": None, "splash": None, "discovery_splash": None,
+            "owner_id": str(self.member_ids[0]), "afk_channel_id": None, "afk_timeout": 300,
+            "verification_level": 1, "default_message_notifications": 1, "explicit_content_filter": 0,
+            "mfa_level": 0, "premium_tier": 0, "premium_subscription_count": 0, "preferred_locale": "en-US",
+            "nsfw_level": 0, "system_channel_id": None, "system_channel_flags": 0, "features": [],
+            "emojis": [], "stickers": [], "max_members": 500000, "premium_progress_bar_enabled": False,
+            "roles": [self.role(self.id, "@everyone", "104324673", 0),
+                      self.role(self.bot_role_id, "Oda", ADMINISTRATOR, 1)],
+            "channels": [self.category.to_dict()] + [c.to_dict() for c in self.channels],
+            "members": [self.bot_member()], "member_count": len(self.members) + 1,
+            "large": len(self.members) > 250, "unavailable": False, "joined_at": iso_timestamp(self.created_ms),
+            "voice_states": [], "presences": [], "threads": [], "stage_instances": [],
+            "guild_scheduled_events": [],
+        }
+
+    def to_rest_dict(self):
+        """GET /guilds/{guild_id}?with_counts=true: no channels or members, approximate counts"""
+        data = {k: v for k, v in self.to_dict().items()
+                if k not in ("channels", "members", "member_count", "large", "unavailable", "joined_at",
+                             "voice_states", "presences", "threads", "stage_instances", "guild_scheduled_events")}
+        data.update(approximate_member_count=len(self.members) + 1, approximate_presence_count=0)
+        return data
+
+
+class FakeDiscord:
+    """State and handlers of the fake gateway + REST server"""
+
+    def __init__(self, port: int, guilds: int = 4, members: int = 5000, history: int = 2000, seed: int = 1,
+                 limits=None):
+        self.port = port
+        self.rng = random.Random(seed)
+        self.guilds = [Guild(i, members, self.rng) for i in range(guilds)]
+        self.guilds_by_id = {g.id: g for g in self.guilds}
+        self.channels = {c.id: c for g in self.guilds for c in g.channels}
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.buckets = {}
+        self.global_bucket = Bucket("global", *GLOBAL_LIMIT)
+        self._sequence = itertools.count()
+        self.commands = {}
+        self.ws = None
+        self.intents = 0
+        self.seq = 0
+        self.session_id = None
+        self.backlog = deque(maxlen=REPLAY_BUFFER)  # (seq, event, data) for RESUME
+        self.sessions = Counter()  # "identify" / "resume" / "resume_rejected"
+        self.interactions = {}
+        self.rest_calls = Counter()
+        self.rest_429 = Counter()
+        self.gateway_sent = Counter()
+        self.gateway_suppressed = Counter()
+        self.last_activity = time.monotonic()
+        self._ready = asyncio.Event()
+        self._seed_history(history)
+
+    # -- synthetic data -----------------------------------------------------
+
+    def next_id(self, ms=None) -> int:
+        return snowflake(time.time() * 1000 if ms is None else ms, next(self._sequence))
+
+    def make_message(self, channel, author_id, content, ms=None, live=False):
+        ms = time.time() * 1000 if ms is None else ms
+        guild = self.guilds_by_id[channel.guild_id]
+        member = guild.members[author_id]
+        message = {
+            "id": str(self.next_id(ms)), "channel_id": str(channel.id), "author": member["user"],
+            "content": content, "timestamp": iso_timestamp(ms), "edited_timestamp": None, "tts": False,
+            "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [], "embeds": [],
+            "pinned": False, "type": 0, "flags": 0,
+        }
+        if live:
+            message = dict(message, guild_id=str(guild.id),
+                           member={k: v for k, v in member.items() if k != "user"})
+        return message
+
+    def random_content(self, channel, author_index):
+        if channel is self.guilds_by_id[channel.guild_id].ign_channel:
+            clan = " CLAN Golden Pagoda" if author_index % 4 == 0 else ""
+            return f"IGN: Tenno{author_index}_{self.rng.randint(1, 9)}{clan}"
+        return " ".join(self.rng.choice(VOCABULARY) for _ in range(self.rng.randint(3, 12)))
+
+    def _seed_history(self, per_channel):
+        now_ms = time.time() * 1000
+        for guild in self.guilds:
+            for channel in guild.channels:
+                for n in range(per_channel):
+                    index = self.rng.randrange(len(guild.member_ids))
+                    ms = now_ms - (per_channel - n) * 1000
+                    channel.append(self.make_message(channel, guild.member_ids[index],
+                                                     self.random_content(channel, index), ms))
+
+    def bot_user(self):
+        return {"id": str(BOT_USER_ID), "username": "Oda", "discriminator": "0", "avatar": None, "bot": True,
+                "global_name": None, "flags": 0, "verified": True, "mfa_enabled": False, "locale": "en-US"}
+
+    # -- gateway ------------------------------------------------------------
+
+    async def send(self, ws, payload):
+        await ws.send_str(json.dumps(payload))
+
+    async def dispatch(self, event, data):
+        # While a session is open, events are sequenced and kept for RESUME even with no socket attached
+        if self.session_id is None:
+            return
+        self.seq += 1
+        self.backlog.append((self.seq, event, data))
+        if self.ws is None or self.ws.closed:
+            return
+        self.gateway_sent[event] += 1
+        await self.send(self.ws, {"op": 0, "t": event, "s": self.seq, "d": data})
+
+    async def gateway(self, request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        await self.send(ws, {"op": 10, "d": {"heartbeat_interval": HEARTBEAT_INTERVAL_MS}, "s": None, "t": None})
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            payload = json.loads(msg.data)
+            op, data = payload.get("op"), payload.get("d")
+            if op == 1:
+                await self.send(ws, {"op": 11, "d": None, "s": None, "t": None})
+            elif op == 2:
+                await self._identify(ws, data)
+            elif op == 6:
+                await self._resume(ws, data)
+            elif op == 8:
+                await self._member_chunks(data)
+        if self.ws is ws:
+            self.ws = None
+        return ws
+
+    async def _resume(self, ws, data):
+        if data.get("session_id") != self.session_id or self.session_id is None:
+            self.sessions["resume_rejected"] += 1
+            await self.send(ws, {"op": 9, "d": False, "s": None, "t": None})
+            return
+        self.sessions["resume"] += 1
+        self.ws = ws
+        for seq, event, payload in list(self.backlog):
+            if seq > (data.get("seq") or 0):
+                self.gateway_sent[event] += 1
+                await self.send(ws, {"op": 0, "t": event, "s": seq, "d": payload})
+        await self.dispatch("RESUMED", {})
+
+    async def _identify(self, ws, data):
+        self.ws = ws
+        self.intents = data.get("intents", 0)
+        self.seq = 0
+        self.backlog.clear()
+        self.sessions["identify"] += 1
+        self.session_id = f"fake-{self.next_id()}"
+        url = f"ws://127.0.0.1:{self.port}/gateway"
+        await self.dispatch("READY", {
+            "v": 10, "user": self.bot_user(), "session_id": self.session_id, "resume_gateway_url": url,
+            "guilds": [{"id": str(g.id), "unavailable": True} for g in self.guilds],
+            "application": {"id": str(APPLICATION_ID), "flags": 0}, "private_channels": [], "relationships": [],
+            "presences": [], "shard": data.get("shard", [0, 1]),
+        })
+        for guild in self.guilds:
+            await self.dispatch("GUILD_CREATE", guild.to_dict())
+        self._ready.set()
+
+    async def _member_chunks(self, data):
+        guild = self.guilds_by_id.get(int(data["guild_id"]))
+        if guild is None:
+            return
+        nonce = data.get("nonce")
+        not_found = []
+        if data.get("user_ids"):
+            members = []
+            for user_id in data["user_ids"]:
+                member = guild.members.get(int(user_id))
+                (members.append(member) if member else not_found.append(str(user_id)))
+        else:
+            members = list(guild.members.values())
+            if data.get("query"):
+                members = [m for m in members if m["user"]["username"].startswith(data["query"])]
+            if data.get("limit"):
+                members = members[:data["limit"]]
+        chunks = [members[i:i + MEMBER_CHUNK_SIZE] for i in range(0, len(members), MEMBER_CHUNK_SIZE)] or [[]]
+        for index, chunk in enumerate(chunks):
+            await self.dispatch("GUILD_MEMBERS_CHUNK", {
+                "guild_id": str(guild.id), "members": chunk, "chunk_index": index, "chunk_count": len(chunks),
+                "not_found": not_found if index == 0 else [], "nonce": nonce,
+            })
+
+    # -- REST ---------------------------------------------------------------
+
+    def _rate_limit(self, method, template, params):
+        now = time.monotonic()
+        key = (method, template)
+        buckets = []
+        if not any(prefix in template for prefix in GLOBAL_EXEMPT):
+            buckets.append(self.global_bucket)
+        if key in self.limits:
+            name, limit, per, major = self.limits[key]
+            bucket_key = (name, params.get(major))
+            bucket = self.buckets.get(bucket_key)
+            if bucket is None:
+                bucket = self.buckets[bucket_key] = Bucket(f"{name}:{params.get(major)}", limit, per)
+            buckets.append(bucket)
+        headers = {}
+        for bucket in buckets:
+            allowed, bucket_headers, retry_after = bucket.take(now)
+            if bucket is not self.global_bucket or not allowed:
+                headers = bucket_headers
+            if not allowed:
+                self.rest_429[f"{method} {template}"] += 1
+                headers["Via"] = "1.1 fake-discord"
+                headers["Retry-After"] = str(max(1, round(retry_after)))
+                body = {"message": "You are being rate limited.", "retry_after": round(retry_after, 3),
+                        "global": bucket is self.global_bucket, "code": 0}
+                if bucket is self.global_bucket:
+                    headers["X-RateLimit-Global"] = "true"
+                    headers["X-RateLimit-Scope"] = "global"
+                return json_response(body, status=429, headers=headers)
+        return headers
+
+    def route(self, method, template):
+        """Wrap a handler with call counting and rate limiting for `template`"""
+        def decorator(handler):
+            async def wrapped(request):
+                self.last_activity = time.monotonic()
+                self.rest_calls[f"{method} {template}"] += 1
+                limited = self._rate_limit(method, template, request.match_info)
+                if isinstance(limited, web.Response):
+                    return limited
+                response = await handler(request)
+                response.headers.update(limited)
+                return response
+            return method, API_PREFIX + template, wrapped
+        return decorator
+
+    async def _json_body(self, request):
+        if request.content_type.startswith("multipart/"):
+            form = await request.post()
+            return json.loads(form.get("payload_json") or "{}")
+        if request.can_read_body:
+            return await request.json()
+        return {}
+
+    def _webhook_message(self, token, payload):
+        record = self.interactions.get(token, {})
+        return {
+            "id": str(self.next_id()), "channel_id": str(record.get("channel_id", 0)),
+            "author": self.bot_user(), "content": payload.get("content") or "", "timestamp": iso_timestamp(
+                time.time() * 1000), "edited_timestamp": None, "tts": False, "mention_everyone": False,
+            "mentions": [], "mention_roles": [], "attachments": [], "embeds": payload.get("embeds") or [],
+            "pinned": False, "type": 20, "flags": payload.get("flags", 0), "webhook_id": str(APPLICATION_ID),
+            "application_id": str(APPLICATION_ID),
+        }
+
+    def _touch(self, token, first=False, payload=None):
+        record = self.interactions.get(token)
+        if record is None:
+            return
+        now = time.monotonic()
+        if first and record["first"] is None:
+            record["first"] = now
+            record["deferred"] = (payload or {}).get("type") == 5
+            content = ((payload or {}).get("data") or {}).get("content") or ""
+            if content.startswith("⏳"):
+                record["outcome"] = "throttled"
+            elif content.startswith("❌"):
+                record["outcome"] = "rejected"
+        elif not first:
+            record["deferred"] = False
+        record["last"] = now
+
+    def routes(self):
+        route = self.route
+        handlers = []
+
+        @route("GET", "/users/@me")
+        async def me(request):
+            return json_response(self.bot_user())
+
+        @route("GET", "/oauth2/applications/@me")
+        async def application(request):
+            return json_response({
+                "id": str(APPLICATION_ID), "name": "Oda", "icon": None, "description": "", "rpc_origins": [],
+                "bot_public": True, "bot_require_code_grant": False, "owner": self.bot_user(), "team": None,
+                "verify_key": "0" * 64, "flags": 0, "summary": "", "tags": [], "redirect_uris": [],
+            })
+
+        @route("GET", "/gateway/bot")
+        async def gateway_bot(request):
+            return json_response({"url": f"ws://127.0.0.1:{self.port}/gateway", "shards": 1,
+                                      "session_start_limit": {"total": 1000, "remaining": 1000,
+                                                              "reset_after": 0, "max_concurrency": 1}})
+
+        async def register_commands(request):
+            commands = await self._json_body(request)
+            for command in commands:
+                command.setdefault("id", str(self.commands.get(command["name"]) or self.next_id()))
+                command.update({"application_id": str(APPLICATION_ID), "version": command["id"]})
+                self.commands[command["name"]] = int(command["id"])
+            return json_response(commands)
+
+        sync_commands = route("PUT", "/applications/{application_id}/commands")(register_commands)
+        sync_guild_commands = route("PUT", "/applications/{application_id}/guilds/{guild_id}/commands")(
+            register_commands)
+
+        @route("POST", "/interactions/{interaction_id}/{token}/callback")
+        async def callback(request):
+            payload = await self._json_body(request)
+            token = request.match_info["token"]
+            self._touch(token, first=True, payload=payload)
+            return json_response({"interaction": {
+                "id": request.match_info["interaction_id"], "type": 2, "response_message_id": None,
+                "response_message_loading": payload.get("type") == 5, "response_message_ephemeral": False}})
+
+        @route("PATCH", "/webhooks/{application_id}/{token}/messages/{message_id}")
+        async def edit_message(request):
+            token = request.match_info["token"]
+            self._touch(token)
+            return json_response(self._webhook_message(token, await self._json_body(request)))
+
+        @route("POST", "/webhooks/{application_id}/{token}")
+        async def followup(request):
+            token = request.match_info["token"]
+            self._touch(token)
+            return json_response(self._webhook_message(token, await self._json_body(request)))
+
+        @route("GET", "/channels/{channel_id}/messages")
+        async def history(request):
+            channel = self.channels.get(int(request.match_info["channel_id"]))
+            if channel is None:
+                return json_response({"message": "Unknown Channel", "code": 10003}, status=404)
+            query = request.query
+            limit = min(int(query.get("limit", HISTORY_PAGE_DEFAULT)), HISTORY_PAGE_MAX)
+            before = int(query["before"]) if "before" in query else None
+            after = int(query["after"]) if "after" in query else None
+            return json_response(channel.page(limit, before=before, after=after))
+
+        @route("GET", "/users/@me/guilds")
+        async def my_guilds(request):
+            after = int(request.query.get("after", 0))
+            limit = int(request.query.get("limit", 200))
+            guilds = [g for g in self.guilds if g.id > after][:limit]
+            return json_response([{"id": str(g.id), "name": g.name, "icon": None, "owner": False,
+                                   "permissions": ADMINISTRATOR, "features": []} for g in guilds])
+
+        @route("GET", "/guilds/{guild_id}")
+        async def get_guild(request):
+            guild = self.guilds_by_id.get(int(request.match_info["guild_id"]))
+            if guild is None:
+                return json_response({"message": "Unknown Guild", "code": 10004}, status=404)
+            return json_response(guild.to_rest_dict())
+
+        @route("GET", "/guilds/{guild_id}/channels")
+        async def get_channels(request):
+            guild = self.guilds_by_id.get(int(request.match_info["guild_id"]))
+            if guild is None:
+                return json_response({"message": "Unknown Guild", "code": 10004}, status=404)
+            return json_response([guild.category.to_dict()] + [c.to_dict() for c in guild.channels])
+
+        @route("GET", "/guilds/{guild_id}/members/{user_id}")
+        async def get_member(request):
+            guild = self.guilds_by_id.get(int(request.match_info["guild_id"]))
+            user_id = int(request.match_info["user_id"])
+            member = guild and (guild.bot_member() if user_id == BOT_USER_ID else guild.members.get(user_id))
+            if not member:
+                return json_response({"message": "Unknown Member", "code": 10007}, status=404)
+            return json_response(member)
+
+        @route("PATCH", "/guilds/{guild_id}/members/{user_id}")
+        async def edit_member(request):
+            guild = self.guilds_by_id.get(int(request.match_info["guild_id"]))
+            member = guild and guild.members.get(int(request.match_info["user_id"]))
+            if not member:
+                return json_response({"message": "Unknown Member", "code": 10007}, status=404)
+            payload = await self._json_body(request)
+            if "nick" in payload:
+                member["nick"] = payload["nick"]
+            return json_response(member)
+
+        handlers.extend([me, application, gateway_bot, sync_commands, sync_guild_commands, callback,
+                         edit_message, followup, history, my_guilds, get_guild, get_channels, get_member,
+                         edit_member])
+        return handlers
+
+    async def unknown_route(self, request):
+        self.rest_calls[f"{request.method} (unhandled) {request.path}"] += 1
+        return json_response({"message": "404: Not Found", "code": 0}, status=404)
+
+    # -- load generation ----------------------------------------------------
+
+    def interaction_payload(self, command, guild, channel, member_id, options=(), resolved=None):
+        interaction_id = self.next_id()
+        token = f"tok{interaction_id}"
+        member = dict(self.guilds_by_id[guild.id].members[member_id], permissions=ADMINISTRATOR)
+        data = {"id": str(self.commands.get(command) or self.next_id()), "name": command, "type": 1,
+                "guild_id": str(guild.id), "options": list(options)}
+        if resolved:
+            data["resolved"] = resolved
+        self.interactions[token] = {"command": command, "sent": None, "first": None, "last": None,
+                                    "deferred": False, "outcome": "ok", "channel_id": channel.id}
+        return token, {
+            "id": str(interaction_id), "application_id": str(APPLICATION_ID), "type": 2, "token": token,
+            "version": 1, "guild_id": str(guild.id), "channel_id": str(channel.id),
+            "channel": channel.to_dict(), "member": member, "app_permissions": ADMINISTRATOR,
+            "locale": "en-US", "guild_locale": "en-US", "entitlements": [], "context": 0,
+            "attachment_size_limit": 10 * 2**20,
+            "authorizing_integration_owners": {"0": str(guild.id)}, "data": data,
+        }
+
+    def build_interaction(self, command):
+        guild = self.rng.choice(self.guilds)
+        member_id = self.rng.choice(guild.member_ids)
+        if command == "find":
+            channel = self.rng.choice(guild.channels[1:])
+            resolved_channel = dict(channel.to_dict(), permissions=ADMINISTRATOR)
+            return self.interaction_payload(
+                command, guild, channel, member_id,
+                options=[{"name": "text", "type": 3, "value": self.rng.choice(VOCABULARY)},
+                         {"name": "channel", "type": 7, "value": str(channel.id)}],
+                resolved={"channels": {str(channel.id): resolved_channel}})
+        if command == "sync_ign":
+            channel = guild.ign_channel
+            resolved_channel = dict(channel.to_dict(), permissions=ADMINISTRATOR)
+            return self.interaction_payload(
+                command, guild, channel, member_id,
+                options=[{"name": "channel", "type": 7, "value": str(channel.id)}],
+                resolved={"channels": {str(channel.id): resolved_channel}})
+        return self.interaction_payload(command, guild, self.rng.choice(guild.channels), member_id)
+
+    async def _paced(self, rate, duration, emit):
+        if rate <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        interval = 1 / rate
+        start = next_at = loop.time()
+        while next_at - start < duration:
+            await emit()
+            next_at += interval
+            await asyncio.sleep(max(0.0, next_at - loop.time()))
+
+    async def _emit_interaction(self, commands, weights):
+        command = self.rng.choices(commands, weights)[0]
+        token, payload = self.build_interaction(command)
+        self.interactions[token]["sent"] = time.monotonic()
+        await self.dispatch("INTERACTION_CREATE", payload)
+
+    async def _emit_message(self):
+        guild = self.rng.choice(self.guilds)
+        channel = self.rng.choice(guild.channels)
+        index = self.rng.randrange(len(guild.member_ids))
+        message = self.make_message(channel, guild.member_ids[index], self.random_content(channel, index),
+                                    live=True)
+        channel.append({k: v for k, v in message.items() if k not in ("guild_id", "member")})
+        if self.intents & GUILD_MESSAGES_INTENT:
+            await self.dispatch("MESSAGE_CREATE", message)
+        else:
+            self.gateway_suppressed["MESSAGE_CREATE"] += 1
+
+    async def run(self, request):
+        """POST /_harness/run {"duration", "rate", "messages", "mix": {command: weight}, "settle", "timeout"}"""
+        spec = await request.json()
+        await asyncio.wait_for(self._ready.wait(), 30)
+        mix = spec.get("mix") or {"pun": 1, "tip": 1, "find": 1, "sync_ign": 1}
+        commands, weights = list(mix), list(mix.values())
+        duration = float(spec.get("duration", 10))
+        self.interactions.clear()
+        self.rest_calls.clear()
+        self.rest_429.clear()
+        self.gateway_sent.clear()
+        self.gateway_suppressed.clear()
+        started = time.monotonic()
+        await asyncio.gather(
+            self._paced(float(spec.get("rate", 10)), duration, lambda: self._emit_interaction(commands, weights)),
+            self._paced(float(spec.get("messages", 0)), duration, self._emit_message),
+        )
+        settle = float(spec.get("settle", 2.0))
+        deadline = time.monotonic() + float(spec.get("timeout", 120))
+        while time.monotonic() < deadline:
+            # Deferred interactions are pending until their first follow-up or edit, however
+            # long the bot backs off on 429s; after that, `settle` idle seconds end the run
+            pending = any(r["first"] is None or r["deferred"] for r in self.interactions.values())
+            if not pending and time.monotonic() - self.last_activity >= settle:
+                break
+            await asyncio.sleep(0.1)
+        return json_response(self.report(started))
+
+    def report(self, started):
+        per_command = defaultdict(lambda: {"sent": 0, "outcomes": Counter(), "first": [], "done": [],
+                                           "last": started})
+        for record in self.interactions.values():
+            stats = per_command[record["command"]]
+            stats["sent"] += 1
+            if record["first"] is None or record["deferred"]:
+                stats["outcomes"]["timeout"] += 1
+                continue
+            stats["outcomes"][record["outcome"]] += 1
+            stats["first"].append(record["first"] - record["sent"])
+            stats["done"].append(record["last"] - record["sent"])
+            stats["last"] = max(stats["last"], record["last"])
+        commands = {}
+        for command, stats in sorted(per_command.items()):
+            elapsed = max(stats["last"] - started, 1e-9)
+            commands[command] = {
+                "sent": stats["sent"], "outcomes": dict(stats["outcomes"]),
+                "throughput": len(stats["done"]) / elapsed,
+                "first_response_ms": percentiles(stats["first"]), "completion_ms": percentiles(stats["done"]),
+            }
+        return {
+            "elapsed": time.monotonic() - started, "commands": commands,
+            "rest_calls": dict(self.rest_calls.most_common()), "rest_429": dict(self.rest_429.most_common()),
+            "gateway_sent": dict(self.gateway_sent), "gateway_suppressed": dict(self.gateway_suppressed),
+        }
+
+    async def health(self, request):
+        return json_response({"ready": self._ready.is_set(), "sessions": dict(self.sessions), "seq": self.seq})
+
+    def app(self):
+        app = web.Application(client_max_size=64 * 2**20)
+        app.router.add_get("/gateway", self.gateway)
+        app.router.add_get("/_harness/health", self.health)
+        app.router.add_post("/_harness/run", self.run)
+        for method, path, handler in self.routes():
+            app.router.add_route(method, path, handler)
+        app.router.add_route("*", API_PREFIX + "/{tail:.*}", self.unknown_route)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--guilds", type=int, default=4)
+    parser.add_argument("--members", type=int, default=5000)
+    parser.add_argument("--history", type=int, default=2000, help="seeded messages per channel")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    async def serve():
+        fake = FakeDiscord(args.port, args.guilds, args.members, args.history, args.seed)
+        runner = web.AppRunner(fake.app())
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", args.port).start()
+        print(f"fake discord listening on 127.0.0.1:{args.port}", flush=True)
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
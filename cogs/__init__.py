@@ -0,0 +1,6 @@
+"""Command extensions for oda_bot_improved_Version2.
+
+Each module is a discord.py extension with a `setup(bot)` entry point that
+adds one cog. The bot loads the ones listed in ODA_EXTENSIONS at startup;
+modules that only a disabled extension uses are never imported.
+"""
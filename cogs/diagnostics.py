@@ -0,0 +1,53 @@
+"""/diagnostics (bot owner only)"""
+from typing import Optional
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+
+class Diagnostics(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @app_commands.command(name="diagnostics", description="Toggle the loop watchdog and command profiling, or recount guild stats (Owner)")
+    @app_commands.describe(
+        watchdog="Log a stack snapshot whenever the event loop is blocked",
+        profile="Command name to start or stop profiling, e.g. find",
+        recount="Recount every guild's channels, roles, emojis and members and fix drifted counters",
+    )
+    async def diagnostics(self, interaction: discord.Interaction, watchdog: Optional[bool] = None,
+                          profile: Optional[str] = None, recount: Optional[bool] = False):
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("❌ Only the bot owner can use this command.", ephemeral=True)
+            return
+        diag = self.bot.diagnostics
+        if watchdog is True:
+            diag.watchdog.start()
+        elif watchdog is False:
+            diag.watchdog.stop()
+        if profile:
+            name = profile.strip().lstrip("/")
+            if name in diag.profiled:
+                diag.profiled.discard(name)
+            else:
+                diag.profiled.add(name)
+
+        recounted = ""
+        if recount:
+            drifted = [guild for guild in self.bot.guilds if self.bot.guild_stats.verify(guild, repair=True)]
+            for guild in drifted:
+                self.bot.embeds.invalidate_guild(guild.id)
+            recounted = f"\n🧮 Recounted {len(self.bot.guilds)} guilds, {len(drifted)} had drifted counts"
+
+        profiled = ", ".join(f"`/{c}`" for c in sorted(diag.profiled)) or "None"
+        await interaction.response.send_message(
+            f"🩺 Watchdog: **{'on' if diag.watchdog.running else 'off'}** "
+            f"(threshold {diag.watchdog.threshold * 1000:.0f}ms)\n"
+            f"🔬 Profiling: {profiled} → `{diag.profile_dir}`{recounted}",
+            ephemeral=True
+        )
+
+
+async def setup(bot):
+    await bot.add_cog(Diagnostics(bot))
@@ -0,0 +1,47 @@
+"""/pun and /tip, drawing from the content pools in data/ (see oda_content)"""
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from oda_config import COMMAND_LIMIT, CONTENT_DIR, CONTENT_NO_REPEAT, CONTENT_RELOAD_INTERVAL
+from oda_content import CONTENT_DIR as DEFAULT_CONTENT_DIR, NO_REPEAT, RELOAD_INTERVAL, ContentLibrary
+from oda_ratelimit import rate_limit
+
+POOLS = ("ordis_jokes", "warframe_tips")
+
+
+class Fun(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        no_repeat = NO_REPEAT if CONTENT_NO_REPEAT is None else CONTENT_NO_REPEAT
+        self.content = ContentLibrary(CONTENT_DIR or DEFAULT_CONTENT_DIR, POOLS, no_repeat)
+
+    async def cog_load(self):
+        await self.content.reload(force=True)
+        self.content.start(RELOAD_INTERVAL if CONTENT_RELOAD_INTERVAL is None else CONTENT_RELOAD_INTERVAL)
+
+    async def cog_unload(self):
+        self.content.stop()
+
+    @app_commands.command(name="pun", description="Ordis will tell you a random joke!")
+    @rate_limit(COMMAND_LIMIT)
+    async def pun(self, interaction: discord.Interaction):
+        joke = self.content["ordis_jokes"].pick(interaction.channel_id)
+        if joke is None:
+            await interaction.response.send_message("❌ No jokes are loaded right now.", ephemeral=True)
+            return
+        self.bot.store.increment("puns_told", guild_id=interaction.guild_id)
+        await interaction.response.send_message(joke)
+
+    @app_commands.command(name="tip", description="Get a random Warframe gameplay tip!")
+    @rate_limit(COMMAND_LIMIT)
+    async def tip(self, interaction: discord.Interaction):
+        tip = self.content["warframe_tips"].pick(interaction.channel_id)
+        if tip is None:
+            await interaction.response.send_message("❌ No tips are loaded right now.", ephemeral=True)
+            return
+        await interaction.response.send_message(tip)
+
+
+async def setup(bot):
+    await bot.add_cog(Fun(bot))
@@ -0,0 +1,368 @@
+"""/sync_ign, /ign_live and live IGN sync from channel posts"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from oda_config import (COMMAND_LIMIT, IGN_PLAN_TIMEOUT, IGN_PREVIEW_SCAN_LIMIT, IGN_SYNC_WORKERS, JOB_SCAN_LIMIT,
+                        LIVE_IGN_LIMIT, SYNC_IGN_LIMIT)
+from oda_embeds import branded_embed, truncated_field
+from oda_ign import IgnPlan, extract_ign, plan_ign_sync, sanitize_nickname, shows_nickname
+from oda_jobs import JobError
+from oda_ratelimit import limit_messages, rate_limit
+
+logger = logging.getLogger('OdaBot.ign')
+
+PROGRESS_EVERY = 100  # messages scanned or nicknames edited between progress reports
+
+
+def _ign_from_message(message):
+    """IGN to apply for a message, or None if it is not a usable IGN post"""
+    ign = extract_ign(message.content)
+    if ign is None:
+        return None
+    if not ign:
+        ign = sanitize_nickname(message.author.display_name, max_length=32)
+    return ign or None
+
+
+def _can_rename(member):
+    """Whether Discord would accept a nickname edit for `member` from the bot"""
+    guild = member.guild
+    me = guild.me
+    if member.id == guild.owner_id:
+        return False
+    if me is None:
+        return True
+    if member.id == me.id:
+        return me.guild_permissions.change_nickname
+    return me.guild_permissions.manage_nicknames and me.top_role > member.top_role
+
+
+def _plan_footer(plan):
+    footer = f"Scanned {plan.scanned} {'new ' if plan.incremental else ''}message{'s' if plan.scanned != 1 else ''}"
+    footer += f" • {len(plan.unchanged)} already set"
+    if plan.forbidden:
+        footer += f" • {len(plan.forbidden)} not renamable"
+    if plan.missing:
+        footer += f" • {len(plan.missing)} left the server"
+    return footer
+
+
+def _build_plan_embed(plan):
+    embed = branded_embed("🔍 IGN Sync Preview")
+    count = len(plan.changes)
+    if count:
+        embed.description = f"**{count}** nickname{'s' if count != 1 else ''} would change. Nothing has been edited yet."
+        lines = [f"{c.member.name}: {c.before or '*(none)*'} → **{c.after}**" for c in plan.changes]
+        embed.add_field(name="Planned Changes", value=truncated_field(lines), inline=False)
+    else:
+        embed.description = "✅ Nothing to change."
+    if plan.forbidden:
+        names = [m.name for m in plan.forbidden]
+        embed.add_field(name="⚠️ Cannot Rename (owner or role above the bot)",
+                        value=truncated_field(names, joiner=", "), inline=False)
+    embed.set_footer(text=_plan_footer(plan))
+    return embed
+
+
+class IgnPlanView(discord.ui.View):
+    """Apply button under a /sync_ign preview; only the admin who ran the preview may press it"""
+
+    def __init__(self, cog, plan, channel, owner_id):
+        super().__init__(timeout=IGN_PLAN_TIMEOUT)
+        self.cog = cog
+        self.plan = plan
+        self.channel = channel
+        self.owner_id = owner_id
+        self.message = None  # the preview message, set once it is sent
+        count = len(plan.changes)
+        self.apply.label = f"Apply {count} change{'s' if count != 1 else ''}"
+
+    @discord.ui.button(label="Apply", style=discord.ButtonStyle.success, emoji="✅")
+    async def apply(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message("❌ Only the admin who ran this preview can apply it.", ephemeral=True)
+            return
+        self.stop()
+        await interaction.response.edit_message(view=None)
+        async with self.cog.sync_lock(self.channel.id):
+            embed = await self.cog.apply_plan(self.plan, self.channel)
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    async def on_timeout(self):
+        """Disable the Apply button so an expired preview cannot look applicable"""
+        if self.message is None:
+            return
+        self.apply.disabled = True
+        self.apply.label = "Preview expired"
+        try:
+            await self.message.edit(view=self)
+        except discord.HTTPException as e:
+            logger.info(f"Could not disable an expired /sync_ign preview: {e}")
+
+
+class Ign(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def cog_load(self):
+        self.bot.jobs.register("sync_ign", self.run_sync_ign)
+
+    async def cog_unload(self):
+        self.bot.jobs.unregister("sync_ign")
+
+    def sync_lock(self, channel_id):
+        """Per-channel lock, so concurrent syncs don't plan the same edits"""
+        return self.bot.ign_sync_locks.setdefault(channel_id, asyncio.Lock())
+
+    async def apply_nicknames(self, edits, workers=IGN_SYNC_WORKERS, progress=None):
+        """Apply (member, ign, message_id) nickname edits through a bounded worker pool.
+
+        discord.py serializes requests per rate-limit bucket and sleeps through 429s,
+        so the pool only bounds how many edits are in flight at once. `progress`, if
+        given, is awaited with the number of edits done every PROGRESS_EVERY edits.
+        """
+        queue = asyncio.Queue()
+        for edit in edits:
+            queue.put_nowait(edit)
+        results = []
+        failures = []
+
+        async def worker():
+            while not queue.empty():
+                member, ign, message_id = queue.get_nowait()
+                previous_nick = member.nick if member.nick else member.name
+                try:
+                    updated = await member.edit(nick=ign)
+                    if updated is not None:
+                        self.bot.members.remember(updated)
+                    results.append({
+                        "user": member,
+                        "ign": ign,
+                        "previous_nick": previous_nick,
+                        "message_id": message_id
+                    })
+                except discord.Forbidden:
+                    failures.append(f"❌ Cannot change {member.display_name}'s nickname (missing permissions)")
+                except Exception as e:
+                    failures.append(f"❌ Failed for {member.display_name}: {str(e)[:50]}")
+                done = len(results) + len(failures)
+                if progress is not None and done % PROGRESS_EVERY == 0:
+                    await progress(done)
+
+        await asyncio.gather(*(worker() for _ in range(min(workers, len(edits)))))
+        return results, failures
+
+    def advance_cursor(self, channel_id, message_id):
+        """Persist the newest processed message ID for a channel"""
+        cursors = self.bot.state.setdefault("ign_cursors", {})
+        if message_id > cursors.get(str(channel_id), 0):
+            cursors[str(channel_id)] = message_id
+            self.bot.store.mark_dirty()
+
+    def hold_cursor(self, channel_id, message_id):
+        """Stop live posts from advancing a channel's cursor past a post whose nickname was not applied.
+        Persisted, so the next /sync_ign picks the post up even after a restart."""
+        held = self.bot.state.setdefault("ign_held_cursors", {})
+        if str(channel_id) not in held:
+            held[str(channel_id)] = message_id
+            self.bot.store.mark_dirty()
+
+    def release_cursor(self, channel_id, newest_id):
+        """Drop a channel's hold once a sync has scanned up to `newest_id`"""
+        held = self.bot.state.get("ign_held_cursors", {})
+        if str(channel_id) in held and held[str(channel_id)] <= newest_id:
+            del held[str(channel_id)]
+            self.bot.store.mark_dirty()
+
+    # -- Live sync ------------------------------------------------------------
+
+    @limit_messages(LIVE_IGN_LIMIT)
+    async def _set_live_nickname(self, ign, message) -> bool:
+        """Apply one IGN post; returns whether the nickname was set (None when rate limited)"""
+        _, failures = await self.apply_nicknames([(message.author, ign, message.id)])
+        for failure in failures:
+            logger.warning(f"Live IGN sync in #{message.channel.name}: {failure}")
+        return not failures
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        """Apply a single IGN post from a live-synced channel"""
+        if message.author.bot or not message.guild or message.channel.id not in self.bot.state.get("ign_live_channels", ()):
+            return
+        ign = _ign_from_message(message)
+        author = message.author
+        if ign and isinstance(author, discord.Member) and not shows_nickname(author, ign):
+            if not _can_rename(author) or not await self._set_live_nickname(ign, message):
+                # Keep the post after the cursor (also past later posts) so the next /sync_ign picks it up
+                self.hold_cursor(message.channel.id, message.id)
+                return
+        if str(message.channel.id) not in self.bot.state.get("ign_held_cursors", {}):
+            self.advance_cursor(message.channel.id, message.id)
+
+    # -- /sync_ign ------------------------------------------------------------
+
+    async def plan(self, guild, channel, limit, full, progress=None, new_limit=None):
+        """Scan a channel's IGN posts and work out which nicknames need to change; nothing is edited.
+
+        The first sync (or a `full` one) scans the last `limit` messages; later
+        ones scan the messages after the channel's cursor, oldest first, at most
+        `new_limit` of them (None scans them all).
+        `progress`, if given, is awaited with the number of messages scanned every PROGRESS_EVERY messages.
+        """
+        cursor = None if full else self.bot.state.get("ign_cursors", {}).get(str(channel.id))
+        if cursor:
+            history = channel.history(limit=new_limit, after=discord.Object(id=cursor))
+        else:
+            history = channel.history(limit=limit)
+
+        # Keep only the newest usable post per author
+        posts = {}
+        plan = IgnPlan(newest_id=cursor or 0, incremental=bool(cursor))
+        async for message in history:
+            plan.scanned += 1
+            plan.newest_id = max(plan.newest_id, message.id)
+            if progress is not None and plan.scanned % PROGRESS_EVERY == 0:
+                await progress(plan.scanned)
+            if message.author.id in posts and posts[message.author.id][1] > message.id:
+                continue
+            ign = _ign_from_message(message)
+            if ign:
+                posts[message.author.id] = (ign, message.id)
+
+        members = await self.bot.members.resolve_many(guild, list(posts))
+        return plan_ign_sync(posts, members, _can_rename, plan)
+
+    async def apply_plan(self, plan, channel, progress=None):
+        """Issue the plan's edits, advance the channel cursor and build the result embed"""
+        started = time.perf_counter()
+        results, failures = await self.apply_nicknames(plan.edits, progress=progress)
+        elapsed = time.perf_counter() - started
+
+        embed = branded_embed("🔄 IGN Sync Results")
+
+        if results:
+            synced_count = len(results)
+            embed.description = f"✅ Successfully synced **{synced_count}** user{'s' if synced_count != 1 else ''}."
+
+            lines = []
+            for r in results[:10]:
+                lines.append(f"✓ {r['user'].name} → **{r['ign']}**")
+            if synced_count > 10:
+                lines.append(f"...and {synced_count - 10} more")
+
+            embed.add_field(name="Updated Nicknames", value=truncated_field(lines, joiner="\n"), inline=False)
+        elif plan.unchanged:
+            count = len(plan.unchanged)
+            embed.description = f"✅ All **{count}** user{'s' if count != 1 else ''} already have their IGN as nickname."
+        elif not failures:
+            if plan.incremental:
+                embed.description = "📭 No new IGN posts since the last sync."
+            else:
+                embed.description = "📭 No IGN patterns found in the last messages."
+        else:
+            embed.description = "⚠️ No nicknames could be updated."
+
+        if failures:
+            embed.add_field(name="⚠️ Failures", value=truncated_field(failures[:5], joiner="\n"), inline=False)
+
+        footer = _plan_footer(plan)
+        if plan.changes:
+            rate = len(plan.changes) / elapsed if elapsed > 0 else float(len(plan.changes))
+            footer += f" • {len(plan.changes)} edits in {elapsed:.1f}s ({rate:.1f}/s)"
+        embed.set_footer(text=footer)
+
+        if plan.newest_id:
+            self.advance_cursor(channel.id, plan.newest_id)
+            self.release_cursor(channel.id, plan.newest_id)
+        return embed
+
+    @app_commands.command(name="sync_ign", description="Sync IGNs from a channel and set as nicknames")
+    @app_commands.describe(
+        limit=f"Messages to scan on the first sync of a channel (max {JOB_SCAN_LIMIT}, {IGN_PREVIEW_SCAN_LIMIT} for a dry run)",
+        full="Ignore the saved position and rescan the last `limit` messages",
+        dry_run="Only preview the nickname changes, with a button to apply them",
+        dm="Also send me the results by DM when the sync finishes",
+    )
+    @rate_limit(SYNC_IGN_LIMIT, "guild")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def sync_ign(self, interaction: discord.Interaction, channel: discord.TextChannel,
+                       limit: Optional[int] = 100, full: Optional[bool] = False, dry_run: Optional[bool] = False,
+                       dm: Optional[bool] = False):
+        if dry_run:
+            # Previews run inline: the plan holds live member objects for the Apply button
+            await interaction.response.defer(ephemeral=True, thinking=True)
+            preview_limit = min(limit, IGN_PREVIEW_SCAN_LIMIT)
+            plan = await self.plan(interaction.guild, channel, preview_limit, full, new_limit=preview_limit)
+            if not plan.changes:
+                await interaction.followup.send(embed=_build_plan_embed(plan), ephemeral=True)
+                return
+            view = IgnPlanView(self, plan, channel, interaction.user.id)
+            view.message = await interaction.followup.send(embed=_build_plan_embed(plan), view=view, ephemeral=True,
+                                                           wait=True)
+            return
+        params = {"channel_id": channel.id, "limit": min(limit, JOB_SCAN_LIMIT), "full": full}
+        await self.bot.get_cog("Jobs").submit(interaction, "sync_ign", params, dm)
+
+    async def run_sync_ign(self, job):
+        """Job handler for /sync_ign: plan and apply under the channel's lock, returning the results embed.
+
+        Safe to run again after a restart: nicknames already applied show up as unchanged.
+        """
+        guild = self.bot.get_guild(job.guild_id)
+        channel = guild.get_channel(job.params["channel_id"]) if guild else None
+        if channel is None:
+            raise JobError("The channel no longer exists")
+
+        async def scanned(count):
+            await job.report(scanned=count, text=f"Scanned **{count}** messages of {channel.mention}")
+
+        async def edited(count):
+            await job.report(edited=count, text=f"Updated **{count}**/{len(plan.changes)} nicknames")
+
+        async with self.sync_lock(channel.id):
+            plan = await self.plan(guild, channel, job.params["limit"], job.params["full"], progress=scanned,
+                                   new_limit=JOB_SCAN_LIMIT)
+            await job.report(scanned=plan.scanned, text=f"Updating {len(plan.changes)} nicknames")
+            embed = await self.apply_plan(plan, channel, progress=edited)
+        embed.set_footer(text=f"{embed.footer.text} • job {job.id}")
+        return {"embed": embed.to_dict(), "edits": len(plan.changes)}
+
+    @app_commands.command(name="ign_live", description="Apply IGN posts in a channel as they are sent")
+    @rate_limit(COMMAND_LIMIT)
+    @app_commands.checks.has_permissions(administrator=True)
+    async def ign_live(self, interaction: discord.Interaction, channel: discord.TextChannel, enabled: bool):
+        bot = self.bot
+        live = set(bot.state.get("ign_live_channels", []))
+        if enabled:
+            live.add(channel.id)
+        else:
+            live.discard(channel.id)
+        bot.state["ign_live_channels"] = sorted(live)
+        bot.store.mark_dirty()
+        status = "now applied live" if enabled else "no longer applied live"
+        note = ""
+        if enabled and not bot.intents.guild_messages:
+            note = "\n⚠️ Message events are disabled in this run (lean intents); live sync starts after a restart."
+        await interaction.response.send_message(f"✅ IGN posts in {channel.mention} are {status}.{note}", ephemeral=True)
+
+    @sync_ign.error
+    async def sync_ign_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        if isinstance(error, app_commands.MissingPermissions):
+            await interaction.response.send_message("❌ You need Administrator permissions to use this command.", ephemeral=True)
+
+    @ign_live.error
+    async def ign_live_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        if isinstance(error, app_commands.MissingPermissions):
+            await interaction.response.send_message("❌ You need Administrator permissions to use this command.", ephemeral=True)
+
+
+async def setup(bot):
+    if "cogs.jobs" not in bot.extensions:
+        await bot.load_extension("cogs.jobs")
+    await bot.add_cog(Ign(bot))
@@ -0,0 +1,102 @@
+"""/stats, /serverinfo and /help"""
+from datetime import datetime
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from oda_config import COMMAND_LIMIT, SHARDED
+from oda_embeds import BRAND_COLOR, branded_embed, truncated_field
+from oda_ratelimit import rate_limit
+
+HELP_COMMANDS = [
+    ("pun", "🎭 `/pun`", "Get a random Ordis joke"),
+    ("tip", "💡 `/tip`", "Get a Warframe gameplay tip"),
+    ("stats", "📊 `/stats`", "View bot statistics"),
+    ("find", "🔍 `/find`", "Search messages (Admin)"),
+    ("sync_ign", "🔄 `/sync_ign`", "Sync IGNs to nicknames (Admin)"),
+    ("ign_live", "📡 `/ign_live`", "Apply IGN posts as they arrive (Admin)"),
+    ("job", "🗂️ `/job`", "Check on or cancel /find and /sync_ign jobs (Admin)"),
+    ("serverinfo", "ℹ️ `/serverinfo`", "Server information"),
+    ("help", "❓ `/help`", "Show this message"),
+]
+
+
+def _build_help_embed(tree):
+    """Help for the commands of the extensions that are loaded"""
+    embed = branded_embed("🤖 Oda Bot Commands")
+    for command, name, desc in HELP_COMMANDS:
+        if tree.get_command(command) is not None:
+            embed.add_field(name=name, value=desc, inline=False)
+    embed.set_footer(text="Oda Bot v2.0")
+    return embed
+
+
+def _build_serverinfo_embed(guild, counts):
+    embed = discord.Embed(title=f"ℹ️ {guild.name}", color=BRAND_COLOR)
+    if guild.icon:
+        embed.set_thumbnail(url=guild.icon.url)
+
+    embed.add_field(name="👑 Owner", value=f"<@{guild.owner_id}>", inline=True)
+    embed.add_field(name="👥 Members", value=str(counts.members), inline=True)
+    embed.add_field(name="📅 Created", value=guild.created_at.strftime("%Y-%m-%d"), inline=True)
+    embed.add_field(name="💬 Channels", value=f"Text: {counts.text_channels}\nVoice: {counts.voice_channels}", inline=True)
+    embed.add_field(name="🎭 Roles", value=str(counts.roles), inline=True)
+    embed.add_field(name="😀 Emojis", value=str(counts.emojis), inline=True)
+    embed.add_field(name="🛡️ Verification", value=str(guild.verification_level), inline=True)
+    embed.add_field(name="🔔 Boost Level", value=f"Level {guild.premium_tier} ({guild.premium_subscription_count} boosts)", inline=True)
+    return embed
+
+
+class Info(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @app_commands.command(name="stats", description="View Oda's statistics")
+    @rate_limit(COMMAND_LIMIT)
+    async def stats(self, interaction: discord.Interaction):
+        bot = self.bot
+        uptime = datetime.utcnow() - bot.start_time
+        hours, remainder = divmod(int(uptime.total_seconds()), 3600)
+        minutes, seconds = divmod(remainder, 60)
+        counters = await bot.store.read_stats()
+
+        embed = branded_embed("📊 Oda Statistics")
+        embed.add_field(name="⏱️ Uptime", value=f"{hours}h {minutes}m {seconds}s", inline=True)
+        embed.add_field(name="🖥️ Guilds", value=str(bot.guild_stats.guild_count), inline=True)
+        embed.add_field(name="👥 Users", value=str(bot.guild_stats.total_members), inline=True)
+        embed.add_field(name="🎭 Puns Told", value=str(counters.get("puns_told", 0)), inline=True)
+        embed.add_field(name="⚙️ Commands Used", value=str(counters.get("commands_used", 0)), inline=True)
+        if SHARDED:
+            shard_lines = [f"#{shard_id}: {latency}ms • {guilds} guild{'s' if guilds != 1 else ''}"
+                           for shard_id, latency, guilds in bot.shard_summary()]
+            embed.add_field(name=f"🧩 Shards ({bot.shard_count} total)", value=truncated_field(shard_lines), inline=False)
+        latency_lines = []
+        histogram = bot.metrics.command_duration
+        for (command,) in sorted(histogram.label_sets(), key=lambda labels: -histogram.count(*labels))[:6]:
+            p50 = histogram.quantile(0.5, command) * 1000
+            p99 = histogram.quantile(0.99, command) * 1000
+            latency_lines.append(f"`/{command}` p50 {p50:.0f}ms • p99 {p99:.0f}ms ({histogram.count(command)} calls)")
+        if latency_lines:
+            embed.add_field(name="⏱️ Command Latency", value=truncated_field(latency_lines), inline=False)
+        embed.set_footer(text=f"Oda Bot v2.0 • Latency: {round(bot.latency * 1000)}ms")
+
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(name="serverinfo", description="Get information about the server")
+    @rate_limit(COMMAND_LIMIT)
+    async def serverinfo(self, interaction: discord.Interaction):
+        guild = interaction.guild
+        counts = self.bot.guild_stats.for_guild(guild)
+        embed = self.bot.embeds.for_guild("serverinfo", guild.id, lambda: _build_serverinfo_embed(guild, counts))
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(name="help", description="Show all available commands")
+    @rate_limit(COMMAND_LIMIT)
+    async def help_command(self, interaction: discord.Interaction):
+        embed = self.bot.embeds.static("help", lambda: _build_help_embed(self.bot.tree))
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+async def setup(bot):
+    await bot.add_cog(Info(bot))
@@ -0,0 +1,152 @@
+"""/job and delivery of background job progress and results (see oda_jobs)"""
+import logging
+import time
+from typing import Optional
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from oda_config import COMMAND_LIMIT, JOB_PROGRESS_EDIT_INTERVAL
+from oda_embeds import branded_embed, truncated_field
+from oda_jobs import JobQueueFull
+from oda_ratelimit import rate_limit, refund_rate_limits
+
+logger = logging.getLogger('OdaBot.jobs')
+
+FOLLOWUP_WINDOW = 14 * 60  # seconds a job's original response can still be edited (tokens last 15 minutes)
+
+STATUS_ICONS = {"queued": "🕒", "running": "⏳", "done": "✅", "failed": "⚠️", "cancelled": "🚫"}
+
+
+def _status_line(job):
+    return f"{STATUS_ICONS[job.status]} `{job.id}` `/{job.kind}` • {job.status} • <t:{int(job.record['created'])}:R> by <@{job.user_id}>"
+
+
+def _build_status_embed(job, scheduler):
+    embed = branded_embed(f"{STATUS_ICONS[job.status]} Job `{job.id}`")
+    status = job.status
+    if status == "queued":
+        ahead = scheduler.position(job)
+        status += f" ({ahead} job{'s' if ahead != 1 else ''} ahead in this server)" if ahead else " (next up)"
+    embed.add_field(name="Command", value=f"`/{job.kind}`", inline=True)
+    embed.add_field(name="Status", value=status, inline=True)
+    embed.add_field(name="Requested", value=f"<t:{int(job.record['created'])}:R> by <@{job.user_id}>", inline=True)
+    if job.progress.get("text") and job.active:
+        embed.add_field(name="Progress", value=job.progress["text"], inline=False)
+    if job.error:
+        embed.add_field(name="Error", value=job.error, inline=False)
+    if job.active:
+        where = "by DM" if job.record["notify"] else "here"
+        embed.set_footer(text=f"Results will be posted {where} • /job {job.id} shows the status")
+    return embed
+
+
+def _build_result_embeds(job, scheduler):
+    if job.status == "done" and job.result and "embed" in job.result:
+        return [discord.Embed.from_dict(job.result["embed"])]
+    return [_build_status_embed(job, scheduler)]
+
+
+class Jobs(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self._followups = {}  # job ID -> (interaction, deadline) while its response can still be edited
+        self._edited_at = {}
+
+    async def cog_load(self):
+        self.bot.jobs.add_listener(self.on_job_event)
+
+    async def cog_unload(self):
+        self.bot.jobs.remove_listener(self.on_job_event)
+
+    async def submit(self, interaction: discord.Interaction, kind: str, params: dict, dm: bool = False):
+        """Queue a job for an interaction and answer it with the job's status; returns the job or None"""
+        scheduler = self.bot.jobs
+        try:
+            job = scheduler.submit(kind, interaction.guild_id, interaction.user.id, params, notify=dm)
+        except JobQueueFull as e:
+            refund_rate_limits(interaction)
+            await interaction.response.send_message(f"❌ {e}. Try again once one finishes.", ephemeral=True)
+            return None
+        self._followups[job.id] = (interaction, time.monotonic() + FOLLOWUP_WINDOW)
+        await interaction.response.send_message(embed=_build_status_embed(job, scheduler), ephemeral=True)
+        return job
+
+    def _followup(self, job):
+        followup = self._followups.get(job.id)
+        if followup is not None and time.monotonic() > followup[1]:
+            del self._followups[job.id]
+            return None
+        return followup and followup[0]
+
+    async def on_job_event(self, job, event):
+        interaction = self._followup(job)
+        if event == "progress":
+            now = time.monotonic()
+            if interaction is not None and now - self._edited_at.get(job.id, 0) >= JOB_PROGRESS_EDIT_INTERVAL:
+                self._edited_at[job.id] = now
+                await interaction.edit_original_response(embed=_build_status_embed(job, self.bot.jobs))
+            return
+        self._followups.pop(job.id, None)
+        self._edited_at.pop(job.id, None)
+        embeds = _build_result_embeds(job, self.bot.jobs)
+        shown = False
+        if interaction is not None:
+            try:
+                await interaction.edit_original_response(embeds=embeds)
+                shown = True
+            except discord.HTTPException as e:
+                logger.info(f"Could not show the result of job {job.id} in its response: {e}")
+        # After a restart (or once the response expired) the admin only hears back by DM
+        if job.record["notify"] or not shown:
+            await self._send_dm(job, embeds)
+
+    async def _send_dm(self, job, embeds):
+        guild = self.bot.get_guild(job.guild_id)
+        try:
+            user = self.bot.get_user(job.user_id) or await self.bot.fetch_user(job.user_id)
+            await user.send(f"Your `/{job.kind}` job `{job.id}` in **{guild.name if guild else 'a server'}** "
+                            f"finished: {job.status}.", embeds=embeds)
+        except discord.HTTPException as e:
+            logger.info(f"Could not DM the result of job {job.id} to {job.user_id}: {e}")
+
+    @app_commands.command(name="job", description="Check on or cancel a background job (Admin)")
+    @app_commands.describe(
+        job_id="ID from the command's response; leave empty to list this server's recent jobs",
+        cancel="Cancel the job if it has not finished",
+    )
+    @rate_limit(COMMAND_LIMIT)
+    @app_commands.checks.has_permissions(administrator=True)
+    async def job(self, interaction: discord.Interaction, job_id: Optional[str] = None,
+                  cancel: Optional[bool] = False):
+        scheduler = self.bot.jobs
+        if not job_id:
+            jobs = scheduler.for_guild(interaction.guild_id)
+            embed = branded_embed("🗂️ Recent Jobs")
+            embed.description = truncated_field([_status_line(j) for j in jobs]) if jobs else "No jobs yet."
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        job = scheduler.get(job_id.strip().lower())
+        if job is None or job.guild_id != interaction.guild_id:
+            await interaction.response.send_message(f"❌ No job `{job_id}` in this server.", ephemeral=True)
+            return
+        if cancel:
+            if scheduler.cancel(job.id):
+                await interaction.response.send_message(f"🚫 Job `{job.id}` cancelled.", ephemeral=True)
+            else:
+                await interaction.response.send_message(f"❌ Job `{job.id}` already {job.status}.", ephemeral=True)
+            return
+        embeds = [_build_status_embed(job, scheduler)]
+        if job.status == "done":
+            embeds = _build_result_embeds(job, scheduler)
+        await interaction.response.send_message(embeds=embeds, ephemeral=True)
+
+    @job.error
+    async def job_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        if isinstance(error, app_commands.MissingPermissions):
+            await interaction.response.send_message("❌ You need Administrator permissions to use this command.", ephemeral=True)
+
+
+async def setup(bot):
+    await bot.add_cog(Jobs(bot))
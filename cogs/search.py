@@ -0,0 +1,333 @@
+"""/find and the full-text message index that backs it"""
+import asyncio
+import heapq
+import logging
+import time
+from typing import Literal, Optional
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from oda_config import (BACKFILL_BATCH_SIZE, BACKFILL_CONCURRENCY, FIND_CONCURRENCY, FIND_LIMIT, JOB_SCAN_LIMIT,
+                        MESSAGE_INDEX_ENABLED, MESSAGE_INDEX_FILE)
+from oda_embeds import branded_embed, truncated_field
+from oda_index import INDEX_FILE, MessageIndex
+from oda_jobs import JobError
+from oda_ratelimit import rate_limit, refund_rate_limits
+from oda_search import RESULT_LIMIT, QueryTimeout, compile_query, preview, scan_history
+
+logger = logging.getLogger('OdaBot.search')
+
+
+def _index_row(message):
+    """Row tuple for MessageIndex.add_many"""
+    return (message.id, message.content, message.guild.id, message.channel.id,
+            message.author.id, message.author.name)
+
+
+class Search(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.index = None
+        self._backfills = {}
+        self._caught_up = set()  # channels indexed up to the present since the gateway (re)connected
+        self._connection = 0  # bumped on every disconnect
+        self._backfill_slots = asyncio.Semaphore(BACKFILL_CONCURRENCY)
+
+    async def cog_load(self):
+        if MESSAGE_INDEX_ENABLED:
+            self.index = self.bot.message_index = MessageIndex(MESSAGE_INDEX_FILE or INDEX_FILE)
+        self.bot.jobs.register("find", self.run_find)
+
+    async def cog_unload(self):
+        self.bot.jobs.unregister("find")
+        for task in self._backfills.values():
+            task.cancel()
+        if self.index:
+            self.bot.message_index = None
+            self.index.close()
+
+    # -- Index maintenance ------------------------------------------------
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        if self.index and message.guild and not message.author.bot:
+            await self.index.add_many([_index_row(message)], advance_newest=message.channel.id in self._caught_up)
+
+    @commands.Cog.listener()
+    async def on_disconnect(self):
+        # Messages sent until the next connect only reach the index through a catch-up
+        self._connection += 1
+        self._caught_up.clear()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        await self.catch_up()
+
+    @commands.Cog.listener()
+    async def on_resumed(self):
+        await self.catch_up()
+
+    async def catch_up(self):
+        """Catch up every backfilled channel on the messages sent while the bot was away"""
+        if not self.index:
+            return
+        for channel_id in await self.index.backfilled_channels():
+            channel = self.bot.get_channel(channel_id)
+            if channel is not None:
+                self.ensure_backfill(channel)
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload):
+        if self.index and "content" in payload.data:
+            await self.index.update_content(payload.message_id, payload.data["content"])
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        if self.index:
+            await self.index.delete([payload.message_id])
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload):
+        if self.index:
+            await self.index.delete(payload.message_ids)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        if self.index:
+            await self.index.drop_channel(channel.id)
+
+    def ensure_backfill(self, channel):
+        """Start a backfill and catch-up of a channel into the index, if not already running"""
+        task = self._backfills.get(channel.id)
+        if task is None or task.done():
+            self._backfills[channel.id] = asyncio.create_task(self._backfill_channel(channel))
+
+    async def _backfill_channel(self, channel):
+        """Catch a channel up to the present, then walk its history oldest-ward where a previous run stopped"""
+        async with self._backfill_slots:
+            await self._backfill_channel_history(channel)
+
+    async def _backfill_channel_history(self, channel):
+        oldest_id, newest_id, complete = await self.index.backfill_state(channel.id)
+        batch = []
+        count = 0
+
+        async def save(done):
+            await self.index.add_many(batch)
+            await self.index.set_backfill_state(channel.id, channel.guild.id, oldest_id, newest_id, done)
+            batch.clear()
+
+        connection = self._connection
+        try:
+            if complete or newest_id:
+                # Messages sent while the bot was offline or disconnected, oldest first
+                async for message in channel.history(limit=None, after=discord.Object(id=newest_id or 0),
+                                                     oldest_first=True):
+                    if not message.author.bot:
+                        batch.append(_index_row(message))
+                    newest_id = message.id
+                    count += 1
+                    if count % BACKFILL_BATCH_SIZE == 0:
+                        await save(complete)
+                await save(complete)
+            if connection == self._connection:
+                self._caught_up.add(channel.id)
+            if complete:
+                if count:
+                    logger.info(f"Caught up {count} messages in #{channel.name} ({channel.id})")
+                return
+            before = discord.Object(id=oldest_id) if oldest_id else None
+            async for message in channel.history(limit=None, before=before):
+                if not message.author.bot:
+                    batch.append(_index_row(message))
+                oldest_id = message.id
+                newest_id = newest_id or message.id
+                count += 1
+                if count % BACKFILL_BATCH_SIZE == 0:
+                    await save(False)
+            await save(True)
+            logger.info(f"Indexed {count} messages from #{channel.name} ({channel.id})")
+        except discord.Forbidden:
+            logger.warning(f"Cannot read history of #{channel.name} ({channel.id}) for indexing")
+        except Exception as e:
+            await save(complete)
+            logger.error(f"Backfill of #{channel.name} stopped after {count} messages: {e}")
+
+    # -- /find --------------------------------------------------------------
+
+    @app_commands.command(name="find", description="Find messages containing specific text in a channel, category or the server")
+    @app_commands.describe(
+        text='Text to search for (matches inside words too); use "quotes" for phrases',
+        mode="all: every word must match • any: at least one word • regex: text is a regular expression",
+        channel="Channel to search; leave empty (and no category) to search the whole server",
+        category="Search every text channel in this category",
+        limit=f"Messages to scan per channel that is not indexed yet (max {JOB_SCAN_LIMIT})",
+        author="Only show messages from this member",
+        count_all="Keep scanning after the first results to count every match",
+        dm="Also send me the results by DM when the search finishes",
+    )
+    @rate_limit(FIND_LIMIT, "guild")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def find(self, interaction: discord.Interaction, text: str,
+                   mode: Optional[Literal["all", "any", "regex"]] = "all",
+                   channel: Optional[discord.TextChannel] = None, category: Optional[discord.CategoryChannel] = None,
+                   limit: Optional[int] = 100, author: Optional[discord.Member] = None,
+                   count_all: Optional[bool] = False, dm: Optional[bool] = False):
+        try:
+            compile_query(text, mode)
+        except ValueError as e:
+            refund_rate_limits(interaction)
+            await interaction.response.send_message(f"❌ {e}", ephemeral=True)
+            return
+        params = {
+            "text": text, "mode": mode, "limit": min(limit, JOB_SCAN_LIMIT), "count_all": count_all,
+            "channel_id": channel.id if channel else None, "category_id": category.id if category else None,
+            "author_id": author.id if author else None,
+        }
+        await self.bot.get_cog("Jobs").submit(interaction, "find", params, dm)
+
+    async def run_find(self, job):
+        """Job handler for /find: search the index and scan unindexed channels, returning the results embed"""
+        try:
+            return await self._run_find(job)
+        except QueryTimeout as e:
+            raise JobError(str(e))
+
+    async def _run_find(self, job):
+        params = job.params
+        guild = self.bot.get_guild(job.guild_id)
+        if guild is None:
+            raise JobError("The bot is no longer in this server")
+        text, mode, author_id = params["text"], params["mode"], params["author_id"]
+        matches = compile_query(text, mode)
+        if params["channel_id"]:
+            channel = guild.get_channel(params["channel_id"])
+            if channel is None:
+                raise JobError("The channel no longer exists")
+            channels, scope = [channel], channel.mention
+        elif params["category_id"]:
+            category = guild.get_channel(params["category_id"])
+            if category is None:
+                raise JobError("The category no longer exists")
+            channels, scope = category.text_channels, f"**{category.name}**"
+        else:
+            channels, scope = guild.text_channels, "this server"
+        channels = [c for c in channels if c.permissions_for(guild.me).read_message_history]
+
+        indexed_ids = set()
+        if self.index:
+            indexed_ids = await self.index.indexed_channels(c.id for c in channels if c.id in self._caught_up)
+            for c in channels:
+                if c.id not in indexed_ids:
+                    self.ensure_backfill(c)
+        pending = [c for c in channels if c.id not in indexed_ids]
+
+        hits = []  # (message_id, channel_id, author_name, preview)
+        total = 0
+        timings = []  # (channel_id, seconds, scanned, matches)
+        if indexed_ids:
+            started = time.perf_counter()
+            total, rows = await self.index.search(
+                text, guild.id, matches, channel_ids=indexed_ids, author_id=author_id, limit=RESULT_LIMIT, mode=mode
+            )
+            hits.extend((message_id, channel_id, author_name, preview(content))
+                        for message_id, channel_id, author_name, content in rows)
+            index_elapsed = time.perf_counter() - started
+
+        search_limit = params["limit"]
+        stop_after = None if params["count_all"] else RESULT_LIMIT
+        scanned_by_channel = {}
+        matches_by_channel = {}
+
+        async def report_progress():
+            found_so_far = total + sum(matches_by_channel.values())
+            await job.report(
+                scanned=sum(scanned_by_channel.values()), matches=found_so_far,
+                text=f"Scanned **{sum(scanned_by_channel.values())}** messages in {len(timings)}/{len(pending)} "
+                     f"unindexed channel{'s' if len(pending) != 1 else ''} of {scope}, "
+                     f"**{found_so_far}** match{'es' if found_so_far != 1 else ''} so far"
+            )
+
+        slots = asyncio.Semaphore(FIND_CONCURRENCY)
+
+        async def scan(c):
+            async with slots:
+                async def page_progress(scanned, matched):
+                    scanned_by_channel[c.id] = scanned
+                    matches_by_channel[c.id] = matched
+                    await report_progress()
+
+                started = time.perf_counter()
+                try:
+                    channel_hits, matched, scanned, stopped = await scan_history(
+                        c, matches, search_limit,
+                        stop_after=stop_after, author_id=author_id, progress=page_progress
+                    )
+                except discord.HTTPException as e:
+                    logger.warning(f"/find could not scan #{c.name} ({c.id}): {e}")
+                    return [], 0, False
+                scanned_by_channel[c.id] = scanned
+                matches_by_channel[c.id] = matched
+                timings.append((c.id, time.perf_counter() - started, scanned, matched))
+                return [(message_id, c.id, name, text_preview) for message_id, name, text_preview in channel_hits], matched, stopped
+
+        stopped_early = False
+        for channel_hits, matched, stopped in await asyncio.gather(*(scan(c) for c in pending)):
+            hits.extend(channel_hits)
+            total += matched
+            stopped_early = stopped_early or stopped
+        # Snowflake IDs sort by creation time, so this merges every source newest first
+        hits = heapq.nlargest(RESULT_LIMIT, hits)
+
+        embed = branded_embed("🔍 Search Results")
+        count = f"{total}+" if stopped_early else str(total)
+        embed.description = f"Found **{count}** message{'s' if total != 1 else ''} containing '{text}' in {scope}"
+        if author_id:
+            embed.description += f" from <@{author_id}>"
+
+        if hits:
+            msg_links = []
+            for message_id, channel_id, author_name, message_preview in hits:
+                message_url = f"https://discord.com/channels/{guild.id}/{channel_id}/{message_id}"
+                where = f" in <#{channel_id}>" if len(channels) > 1 else ""
+                msg_links.append(f"[{author_name}]({message_url}){where}: *{message_preview}*")
+
+            if total > RESULT_LIMIT:
+                msg_links.append(f"...and {total - RESULT_LIMIT} more")
+
+            embed.add_field(name="Messages", value=truncated_field(msg_links, joiner="\n"), inline=False)
+        else:
+            embed.add_field(name="Messages", value="No messages found.", inline=False)
+
+        if len(channels) > 1 and (timings or indexed_ids):
+            timing_lines = []
+            if indexed_ids:
+                timing_lines.append(f"Index ({len(indexed_ids)} channels): {index_elapsed * 1000:.0f}ms")
+            for channel_id, seconds, scanned, matched in sorted(timings, key=lambda t: -t[1]):
+                timing_lines.append(f"<#{channel_id}>: {seconds:.1f}s • {scanned} msgs • {matched} hits")
+            embed.add_field(name="⏱️ Channel Timing", value=truncated_field(timing_lines), inline=False)
+
+        footer = f"Searched {len(channels)} channel{'s' if len(channels) != 1 else ''}"
+        if indexed_ids:
+            footer += f" ({len(indexed_ids)} from the index)"
+        if pending:
+            footer += f" • scanned up to {search_limit} messages per unindexed channel"
+        if stopped_early:
+            footer += " • stopped after the first results"
+        if self.index and pending:
+            footer += " • indexing channel history for faster searches"
+        embed.set_footer(text=f"{footer} • job {job.id}")
+        return {"embed": embed.to_dict(), "matches": total}
+
+    @find.error
+    async def find_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        if isinstance(error, app_commands.MissingPermissions):
+            await interaction.response.send_message("❌ You need Administrator permissions to use this command.", ephemeral=True)
+
+
+async def setup(bot):
+    if "cogs.jobs" not in bot.extensions:
+        await bot.load_extension("cogs.jobs")
+    await bot.add_cog(Search(bot))
@@ -1,11 +1,14 @@
 from dotenv import load_dotenv
 import discord
+import asyncio
 import os
+import signal
 import random
-import subprocess
-import sys
 import re
-import unicodedata
+from pathlib import Path
+from oda_ign import sanitize_nickname
+from oda_state import command_tree_hash, write_atomic
+from oda_ratelimit import RateLimiter, rate_limit
 
 
 def _build_truncated_field(items, joiner="\n", max_chars=1024, more_fmt="...and {n} more"):
@@ -30,98 +33,67 @@ def _build_truncated_field(items, joiner="\n", max_chars=1024, more_fmt="...and
     return out
 
 
-def sanitize_nickname(raw: str, max_length: int = 32) -> str:
-    """Sanitize a proposed nickname to be safe for Discord:
-    - Strip control characters and zero-width joiners
-    - Remove Discord-style mentions/backticks
-    - Remove common emoji by filtering some unicode categories and combining marks
-    - Collapse whitespace
-    - Trim to max_length
-    Returns an empty string if nothing usable remains.
-    """
-    if not raw:
-        return ""
-    s = raw
-    # Remove common markdown/backtick chars and angle brackets used in mentions
-    s = s.replace('`', '')
-    s = s.replace('<', '')
-    s = s.replace('>', '')
-    # Remove Discord mention-like sequences (e.g., @here, @everyone)
-    s = re.sub(r"@(?:here|everyone)", "", s, flags=re.IGNORECASE)
-    # Remove nick mention patterns like <@!1234567890>
-    s = re.sub(r"<@!?(\d+)>", "", s)
-    # Normalize to NFKD and drop combining marks (this removes many emoji variants)
-    s = unicodedata.normalize('NFKD', s)
-    s = ''.join(ch for ch in s if not unicodedata.category(ch).startswith('C'))
-    # Remove combining marks
-    s = ''.join(ch for ch in s if unicodedata.category(ch) != 'Mn')
-    # Remove leftover variation selectors and zero-width joiners
-    s = re.sub(r"[\uFE0E\uFE0F\u200D\u200B]", "", s)
-    # Collapse whitespace
-    s = re.sub(r"\s+", " ", s).strip()
-    # Trim to max_length
-    if len(s) > max_length:
-        s = s[:max_length].strip()
-    return s
-
-# Automatically install requirements if missing
-def ensure_requirements():
-    try:
-        import discord
-    except ImportError:
-        print("discord.py not found, installing requirements...")
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"])
-        import discord
-
-ensure_requirements()
-
 load_dotenv()
 
 intents = discord.Intents.default()
 intents.message_content = True
 
+# Hash of the last synced command tree, so restarts skip unchanged syncs
+COMMAND_HASH_FILE = Path(".command_tree_hash")
+
+# "oda" replies: the first mention gets SAY_MY_NAME_GIF, another one within ODA_STREAK_WINDOW
+# seconds gets GODDAMN_RIGHT_GIF, then the trigger stays quiet for ODA_COOLDOWN seconds
+ODA_TRIGGER = re.compile(r"oda", re.IGNORECASE)
+ODA_STREAK_WINDOW = 60
+ODA_COOLDOWN = 3600
+SAY_MY_NAME_GIF = "https://tenor.com/view/waltwhite-breakingbad-say-my-name-gif-7259290"
+GODDAMN_RIGHT_GIF = "https://tenor.com/view/breaking-bad-walter-white-youre-goddamn-right-gif-14600753"
+
+# Admin commands that walk channel history, per user
+HISTORY_COMMAND_LIMIT = RateLimiter(2, 30)
+
 class OdaBot(discord.Client):
     def __init__(self, *, intents):
         super().__init__(intents=intents)
         self.tree = discord.app_commands.CommandTree(self)
-        self.oda_cooldown = {3000: 0}
-        self.oda_global_tracker = None
-        self.oda_tracker = {}
+        self.oda_streak = RateLimiter(1, ODA_STREAK_WINDOW, max_keys=1)
+        self.oda_cooldown = RateLimiter(1, ODA_COOLDOWN, max_keys=1)
+
+    async def setup_hook(self):
+        # Runs once per process, unlike on_ready which fires again on every reconnect
+        tree_hash = command_tree_hash(self.tree, self.application_id)
+        if COMMAND_HASH_FILE.exists() and COMMAND_HASH_FILE.read_text().strip() == tree_hash:
+            print("Command tree unchanged, skipping sync")
+            return
+        await self.tree.sync()
+        write_atomic(COMMAND_HASH_FILE, tree_hash)
 
     async def on_ready(self):
         print(f"Logged in as {self.user}")
-        await self.tree.sync()
 
     async def on_message(self, message):
-        if message.author.bot:
+        if message.author.bot or self.oda_cooldown.retry_after("global"):
             return
-        import time
-        now = time.time()
-        cooldown_key = 'global'
-        if cooldown_key in self.oda_cooldown:
-            last_trigger = self.oda_cooldown[cooldown_key]
-            if now - last_trigger < 3600:
-                return
-        if "oda" in message.content.lower():
-            if isinstance(self.oda_global_tracker, tuple) and len(self.oda_global_tracker) == 2:
-                count, first_time = self.oda_global_tracker
-                if now - first_time <= 60:
-                    if count == 1:
-                        await message.reply("https://tenor.com/view/breaking-bad-walter-white-youre-goddamn-right-gif-14600753")
-                        self.oda_global_tracker = (2, first_time)
-                        self.oda_cooldown[cooldown_key] = now
-                    elif count == 0:
-                        await message.reply("https://tenor.com/view/waltwhite-breakingbad-say-my-name-gif-7259290")
-                        self.oda_global_tracker = (1, first_time)
-                else:
-                    await message.reply("https://tenor.com/view/waltwhite-breakingbad-say-my-name-gif-7259290")
-                    self.oda_global_tracker = (1, now)
-            else:
-                await message.reply("https://tenor.com/view/waltwhite-breakingbad-say-my-name-gif-7259290")
-                self.oda_global_tracker = (1, now)
+        if not ODA_TRIGGER.search(message.content):
+            return
+        if not self.oda_streak.hit("global"):
+            await message.reply(SAY_MY_NAME_GIF)
+        else:
+            await message.reply(GODDAMN_RIGHT_GIF)
+            self.oda_cooldown.hit("global")
 
 bot = OdaBot(intents=intents)
 
+@bot.tree.error
+async def on_app_command_error(interaction: discord.Interaction, error: discord.app_commands.AppCommandError):
+    if isinstance(error, discord.app_commands.CommandOnCooldown):
+        await interaction.response.send_message(f"Slow down! Try again in {max(1, round(error.retry_after))}s.", ephemeral=True)
+        return
+    if isinstance(error, discord.app_commands.MissingPermissions):
+        await interaction.response.send_message("You do not have permission to run this command.", ephemeral=True)
+        return
+    await discord.app_commands.CommandTree.on_error(bot.tree, interaction, error)
+
 # Ordis Jokes
 ORDIS_JOKES = [
     "I admire you, Operator. You're strong, resourceful, and… ~~likely to die horribly at any moment.~~ Adaptive!",
@@ -138,11 +110,10 @@ async def pun(interaction: discord.Interaction):
     await interaction.response.send_message(joke)
 
 @bot.tree.command(name="find", description="Find messages containing specific text in a channel.")
+@rate_limit(HISTORY_COMMAND_LIMIT)
+# Only users with Administrator may run this command; checked before the rate limit charges them
+@discord.app_commands.checks.has_permissions(administrator=True)
 async def find(interaction: discord.Interaction, text: str, channel: discord.TextChannel):
-    # Permission check: only users with Administrator may run this command
-    if not interaction.user.guild_permissions.administrator:
-        await interaction.response.send_message("You do not have permission to run this command.", ephemeral=True)
-        return
     try:
         await interaction.response.defer(ephemeral=True, thinking=True)
     except (discord.NotFound, discord.HTTPException):
@@ -167,11 +138,10 @@ async def find(interaction: discord.Interaction, text: str, channel: discord.Tex
     await interaction.followup.send(embed=embed, ephemeral=True)
 
 @bot.tree.command(name="sync_ign", description="Sync IGNs from a channel and set as nicknames for all found users.")
+@rate_limit(HISTORY_COMMAND_LIMIT)
+# Only users with Administrator may run this command; checked before the rate limit charges them
+@discord.app_commands.checks.has_permissions(administrator=True)
 async def sync_ign(interaction: discord.Interaction, channel: discord.TextChannel):
-    # Permission check: only users with Administrator may run this command
-    if not interaction.user.guild_permissions.administrator:
-        await interaction.response.send_message("You do not have permission to run this command.", ephemeral=True)
-        return
     try:
         await interaction.response.defer(ephemeral=True, thinking=True)
     except (discord.NotFound, discord.HTTPException):
@@ -262,10 +232,19 @@ async def sync_ign(interaction: discord.Interaction, channel: discord.TextChanne
         embed.set_thumbnail(url="https://ik.imagekit.io/qcxbyrkgu/Golden_Pagoda_Emblem-clear.png?updatedAt=1752791247987")
         await interaction.followup.send(embed=embed, ephemeral=True)
 
+async def main(token):
+    # SIGTERM (docker stop, systemctl stop) closes the gateway cleanly instead of killing the process
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, lambda: asyncio.create_task(bot.close()))
+    async with bot:
+        await bot.start(token)
+
 # Main
 if __name__ == "__main__":
     TOKEN = os.getenv("DISCORD_TOKEN")
     if not TOKEN:
         print("Please set the DISCORD_TOKEN environment variable.")
     else:
-        bot.run(TOKEN)
+        discord.utils.setup_logging()
+        asyncio.run(main(TOKEN))
@@ -1,18 +1,26 @@
-from dotenv import load_dotenv
 import discord
 from discord import app_commands
 from discord.ext import commands
-import os
-import random
-import subprocess
+import asyncio
+import signal
 import sys
-import re
-import unicodedata
+import time
 import logging
 from datetime import datetime
-from typing import Optional
-import json
-from pathlib import Path
+from oda_config import (
+    DISCORD_TOKEN, STATE_BACKEND, STATE_FILE, STATE_DB_FILE, STATE_FLUSH_INTERVAL, DEV_GUILD_ID, FORCE_COMMAND_SYNC,
+    GUILD_READY_TIMEOUT, SHUTDOWN_TIMEOUT, SESSION_HANDOFF, HANDOFF_PATH, EXTENSIONS, JOB_WORKERS, MESSAGE_INDEX_ENABLED, LEAN_INTENTS, LIVE_IGN_ENABLED,
+    METRICS_HOST, METRICS_PORT, DIAGNOSTICS_ENABLED, BLOCK_THRESHOLD_MS, PROFILE_COMMANDS, PROFILE_PATH,
+    MEMBER_LRU_SIZE, LEAN_MEMBER_CACHE, MEMBER_CACHE_TTL, MEMBER_ABSENT_TTL, SHARD_IDS, SHARD_COUNT, SHARDED,
+)
+from oda_state import open_state_store, command_tree_hash
+from oda_cache import MemberResolver
+from oda_metrics import BotMetrics, InstrumentedCommandTree
+from oda_diag import Diagnostics
+from oda_gateway import EventFilter, SessionHandoff, lean_intents
+from oda_jobs import JobScheduler
+from oda_embeds import EmbedTemplates
+from oda_guildstats import GuildAggregates
 
 # Setup logging
 logging.basicConfig(
@@ -21,99 +29,118 @@ logging.basicConfig(
 )
 logger = logging.getLogger('OdaBot')
 
-# State file for persistence
-STATE_FILE = Path("state.json")
+def build_intents(state):
+    """Gateway intents for this run; message events only if something consumes them"""
+    if not LEAN_INTENTS:
+        intents = discord.Intents.default()
+        intents.message_content = True
+        intents.members = True
+        intents.guilds = True
+        return intents
+    live_ign = LIVE_IGN_ENABLED or ("ign" in EXTENSIONS and bool(state.get("ign_live_channels")))
+    return lean_intents(MESSAGE_INDEX_ENABLED or live_ign)
 
-def load_state():
-    """Load bot state from file"""
-    if STATE_FILE.exists():
-        try:
-            with open(STATE_FILE, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"Failed to load state: {e}")
-    return {"stats": {"commands_used": 0, "puns_told": 0}}
-
-def save_state(state):
-    """Save bot state to file"""
-    try:
-        with open(STATE_FILE, 'w') as f:
-            json.dump(state, f, indent=4)
-    except Exception as e:
-        logger.error(f"Failed to save state: {e}")
-
-def _build_truncated_field(items, joiner="\n", max_chars=1024, more_fmt="...and {n} more"):
-    """Join items with joiner but ensure result length <= max_chars."""
-    if not items:
-        return "None"
-    out = ""
-    for i, it in enumerate(items):
-        part = (joiner if out else "") + it
-        if len(out) + len(part) > max_chars:
-            remaining = len(items) - i
-            suffix = (joiner if out else "") + more_fmt.format(n=remaining)
-            if len(out) + len(suffix) <= max_chars:
-                out += suffix
-            else:
-                out = out[: max_chars - 3] + "..."
-            return out
-        out += part
-    return out
-
-def sanitize_nickname(raw: str, max_length: int = 32) -> str:
-    """Sanitize a proposed nickname to be safe for Discord"""
-    if not raw:
-        return ""
-    s = raw
-    s = s.replace('`', '').replace('<', '').replace('>', '')
-    s = re.sub(r"@(?:here|everyone)", "", s, flags=re.IGNORECASE)
-    s = re.sub(r"<@!?(\d+)>", "", s)
-    s = unicodedata.normalize('NFKD', s)
-    s = ''.join(ch for ch in s if not unicodedata.category(ch).startswith('C'))
-    s = ''.join(ch for ch in s if unicodedata.category(ch) != 'Mn')
-    s = re.sub(r"[FE0EFE0F200D200B]", "", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    if len(s) > max_length:
-        s = s[:max_length].strip()
-    return s
-
-def ensure_requirements():
-    """Automatically install requirements if missing"""
-    try:
-        import discord
-    except ImportError:
-        logger.info("discord.py not found, installing requirements...")
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"])
-
-ensure_requirements()
-load_dotenv()
-
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
-intents.guilds = True
-
-class OdaBot(commands.Bot):
+class OdaBot(commands.AutoShardedBot if SHARDED else commands.Bot):
     def __init__(self):
-        super().__init__(command_prefix="!", intents=intents)
-        # oda_cooldown and oda_global_tracker are no longer needed and have been removed
-        self.state = load_state()
+        shard_options = {"shard_count": SHARD_COUNT, "shard_ids": SHARD_IDS} if SHARDED else {}
+        cache_options = {}
+        if LEAN_MEMBER_CACHE:
+            cache_options = {
+                "chunk_guilds_at_startup": False,
+                "member_cache_flags": discord.MemberCacheFlags.none(),
+            }
+        store = open_state_store(STATE_BACKEND, STATE_DB_FILE if STATE_BACKEND == "sqlite" else STATE_FILE,
+                                 flush_interval=STATE_FLUSH_INTERVAL, json_path=STATE_FILE)
+        # The presence goes out with IDENTIFY instead of as a separate update after READY
+        activity = discord.Activity(type=discord.ActivityType.watching, name="over the Liset")
+        super().__init__(command_prefix="!", intents=build_intents(store.state), tree_cls=InstrumentedCommandTree,
+                         activity=activity, guild_ready_timeout=GUILD_READY_TIMEOUT, **shard_options, **cache_options)
+        self.metrics = BotMetrics()
+        self.embeds = EmbedTemplates()
+        self.guild_stats = GuildAggregates()  # O(1) counts for /serverinfo and /stats
+        self.diagnostics = Diagnostics(BLOCK_THRESHOLD_MS / 1000, PROFILE_PATH, PROFILE_COMMANDS)
+        self.store = store
+        self.state = store.state
         self.start_time = datetime.utcnow()
+        self.message_index = None  # opened by the search extension
+        self.jobs = JobScheduler(self.state, store.mark_dirty, JOB_WORKERS, profile=self.diagnostics.profile)
+        self.ign_sync_locks = {}  # channel ID -> lock, so concurrent syncs don't plan the same edits
+        self.members = MemberResolver(MEMBER_LRU_SIZE, MEMBER_CACHE_TTL, MEMBER_ABSENT_TTL,
+                                      cache_in_guild=not LEAN_MEMBER_CACHE)
+        self.message_filter = None
+        if self.intents.guild_messages and LEAN_INTENTS:
+            self.message_filter = EventFilter(self._connection, "MESSAGE_CREATE", self._wants_message,
+                                              self.metrics.gateway_events_dropped).install()
+        self.handoff = None
+        if SESSION_HANDOFF:
+            if SHARDED:
+                logger.warning("ODA_SESSION_HANDOFF is not supported with sharding; shards identify on restart")
+            else:
+                self.handoff = SessionHandoff(HANDOFF_PATH).install(self)
+        self.shutdown_task = None
+        self._gateway_left = False
 
     async def setup_hook(self):
         """Called when the bot is starting up"""
+        self.store.start()
+        self.metrics.instrument(self)
+        self.metrics.start(self)
+        if DIAGNOSTICS_ENABLED:
+            self.diagnostics.watchdog.start()
+        if METRICS_PORT:
+            await self.metrics.serve(METRICS_HOST, METRICS_PORT)
+        await self.load_extensions()
+        await self.sync_commands()
+        asyncio.create_task(self._start_jobs())
+
+    async def _start_jobs(self):
+        """Resume queued jobs once guilds are cached, so their handlers can find channels"""
+        await self.wait_until_ready()
+        self.jobs.start()
+
+    async def load_extensions(self):
+        """Import and register the command extensions in cogs/ selected by ODA_EXTENSIONS"""
+        started = time.perf_counter()
+        for name in EXTENSIONS:
+            if f"cogs.{name}" not in self.extensions:  # search and ign load jobs themselves
+                await self.load_extension(f"cogs.{name}")
+        loaded = [name.split(".", 1)[1] for name in self.extensions]
+        logger.info(f"Loaded extensions {', '.join(loaded) or '(none)'} in "
+                    f"{(time.perf_counter() - started) * 1000:.0f}ms")
+
+    async def sync_commands(self):
+        """Sync app commands to Discord, skipping the global sync when nothing changed"""
+        if DEV_GUILD_ID:
+            guild = discord.Object(id=DEV_GUILD_ID)
+            self.tree.copy_global_to(guild=guild)
+            await self.tree.sync(guild=guild)
+            logger.info(f"Command tree synced to dev guild {DEV_GUILD_ID}")
+            return
+        tree_hash = command_tree_hash(self.tree, self.application_id)
+        if not FORCE_COMMAND_SYNC and self.state.get("command_tree_hash") == tree_hash:
+            logger.info("Command tree unchanged, skipping sync")
+            return
         await self.tree.sync()
+        self.state["command_tree_hash"] = tree_hash
+        self.store.mark_dirty()
         logger.info("Command tree synced")
 
     async def on_ready(self):
         logger.info(f"Logged in as {self.user} (ID: {self.user.id})")
         logger.info(f"Connected to {len(self.guilds)} guild(s)")
-        await self.change_presence(
-            activity=discord.Activity(
-                type=discord.ActivityType.watching,
-                name="over the Liset"
-            )
-        )
+
+    async def on_shard_ready(self, shard_id):
+        logger.info(f"Shard {shard_id} ready")
+
+    def shard_summary(self):
+        """Per-shard (shard_id, latency_ms, guild_count) for the shards this process runs"""
+        if not SHARDED:
+            return [(0, round(self.latency * 1000), len(self.guilds))]
+        guild_counts = {}
+        for guild in self.guilds:
+            guild_counts[guild.shard_id] = guild_counts.get(guild.shard_id, 0) + 1
+        return [(shard_id, round(latency * 1000), guild_counts.get(shard_id, 0))
+                for shard_id, latency in sorted(self.latencies)]
 
     async def on_command_error(self, ctx, error):
         """Global error handler"""
@@ -127,239 +154,153 @@ class OdaBot(commands.Bot):
             logger.error(f"Error in command: {error}")
             await ctx.send("❌ An error occurred while processing your command.")
 
+    def remember_member(self, member):
+        """Keep a member seen in a message or interaction in the lean member cache"""
+        if LEAN_MEMBER_CACHE and isinstance(member, discord.Member):
+            self.members.remember(member)
+
+    async def on_interaction(self, interaction):
+        self.remember_member(interaction.user)
+
+    async def on_app_command_completion(self, interaction, command):
+        self.store.record_command(command.qualified_name, interaction.guild_id)
+
+    async def on_raw_member_remove(self, payload):
+        self.embeds.invalidate_guild(payload.guild_id)
+        self.guild_stats.member_removed(payload.guild_id)
+        self.members.remember_absent(payload.guild_id, payload.user.id)
+
+    def _wants_message(self, data):
+        """Raw MESSAGE_CREATE check: only user messages in guilds are indexed or applied as IGNs"""
+        if "guild_id" not in data or data["author"].get("bot"):
+            return False
+        return self.message_index is not None or int(data["channel_id"]) in self.state.get("ign_live_channels", ())
+
     async def on_message(self, message):
+        # Indexing and live IGN posts are handled by listeners in the search and ign extensions
         if message.author.bot:
             return
-        await self.process_commands(message)
-        # Entire Oda response gif logic and all references have been removed
+        self.remember_member(message.author)
+        if self.all_commands:
+            await self.process_commands(message)
+
+    # Anything shown by /serverinfo changed: update the guild's counts and drop its cached embeds
+    async def on_guild_available(self, guild):
+        self.guild_stats.add_guild(guild)
+        self.embeds.invalidate_guild(guild.id)
+
+    async def on_guild_join(self, guild):
+        self.guild_stats.add_guild(guild)
+
+    async def on_guild_update(self, before, after):
+        self.embeds.invalidate_guild(after.id)
+
+    async def on_guild_remove(self, guild):
+        self.guild_stats.remove_guild(guild.id)
+        self.embeds.invalidate_guild(guild.id)
+
+    async def on_guild_channel_create(self, channel):
+        self.guild_stats.channel_created(channel)
+        self.embeds.invalidate_guild(channel.guild.id)
+
+    async def on_guild_channel_delete(self, channel):
+        self.guild_stats.channel_deleted(channel)
+        self.embeds.invalidate_guild(channel.guild.id)
+
+    async def on_guild_channel_update(self, before, after):
+        self.guild_stats.channel_updated(before, after)
+        self.embeds.invalidate_guild(after.guild.id)
+
+    async def on_guild_role_create(self, role):
+        self.guild_stats.role_created(role)
+        self.embeds.invalidate_guild(role.guild.id)
+
+    async def on_guild_role_delete(self, role):
+        self.guild_stats.role_deleted(role)
+        self.embeds.invalidate_guild(role.guild.id)
+
+    async def on_guild_emojis_update(self, guild, before, after):
+        self.guild_stats.emojis_updated(guild, after)
+        self.embeds.invalidate_guild(guild.id)
+
+    async def on_member_join(self, member):
+        self.guild_stats.member_joined(member.guild.id)
+        self.embeds.invalidate_guild(member.guild.id)
+
+    def request_shutdown(self):
+        """Start shutdown() once, e.g. from a signal handler"""
+        if self.shutdown_task is None:
+            self.shutdown_task = asyncio.create_task(self.shutdown())
+        return self.shutdown_task
+
+    async def shutdown(self, timeout: float = SHUTDOWN_TIMEOUT):
+        """Graceful stop: finish running commands and jobs (for up to `timeout` seconds), leave the
+        gateway (handing the session off if enabled), then close, which flushes the state"""
+        deadline = time.monotonic() + timeout
+        logger.info(f"Shutting down; waiting up to {timeout:.0f}s for running commands and jobs")
+        # The gateway stays up meanwhile: /sync_ign resolves members over it. Jobs submitted now stay
+        # queued in the state for the next process.
+        jobs_left, _ = await asyncio.gather(self.jobs.drain(timeout), self.tree.drain(timeout))
+        await self.leave_gateway()
+        commands_left = await self.tree.drain(max(0.0, deadline - time.monotonic()))
+        if jobs_left or commands_left:
+            logger.warning(f"Stopping with {commands_left} command(s) and {jobs_left} job(s) unfinished; "
+                           f"the jobs run again on the next start")
+        await self.close()
+
+    async def leave_gateway(self):
+        """Close the gateway connection without letting discord.py reconnect"""
+        ws = self.ws
+        if ws is None or not ws.open:
+            return
+        self._gateway_left = True
+        if self.handoff is not None:
+            await ws.close(code=4000)  # any code but 1000/1001 keeps the session resumable
+            self.handoff.save(ws, self.user.id)
+        else:
+            await ws.close(code=1000)
+
+    def is_closed(self):
+        # discord.py reconnects after a close it did not start itself, unless the client is closed
+        return self._gateway_left or super().is_closed()
+
+    async def close(self):
+        # Running jobs are left as they are and picked up again on the next start
+        await self.jobs.close()
+        # Unloads the extensions, which closes the message index
+        await super().close()
+        await self.store.close()
+        await self.metrics.close()
+        self.diagnostics.watchdog.stop()
 
 bot = OdaBot()
 
-# Ordis Jokes (Expanded)
-ORDIS_JOKES = [
-    "I admire you, Operator. You're strong, resourceful, and… ~~likely to die horribly at any moment.~~ Adaptive!",
-    "Operator, I would tell you a joke about the Void, but it's... Devoid of humor.",
-    "I cleaned the Liset today, Operator. Oh, except the blood stains. Those are… sentimental.",
-    "Intruders Detected! Don't worry, Operator… I already gave them the tour. Of the airlock.",
-    "Systems stable, Operator. Heart rate normal. Blood pressure ~~boiling, spurting, catastrophic failure imminent.~~ Optimal!",
-    "Oda suggests taking a break, Operator. Hydrate, stretch, and then **annihilate all who oppose you.**",
-    "Did you know? The Corpus have a 100% mortality rate. ~~So do we all~~ Fascinating!",
-    "I've been practicing my humor subroutines, Operator. ~~Kill me~~ How am I doing?",
-    "Operator, would you like to hear about ship maintenance? ~~It's mind-numbingly dull~~ It's riveting!",
-    "I detect elevated stress levels, Operator. Have you considered ~~violence~~ meditation?"
-]
-
-# Warframe Tips
-WARFRAME_TIPS = [
-    "💡 Use your Operator's Void Dash to quickly cover distances and proc status effects!",
-    "💡 Mod for ability strength AND duration on most frames for maximum effectiveness.",
-    "💡 Helios with Detect Vulnerability can reveal enemy weaknesses in combat.",
-    "💡 Rolling gives you 75% damage reduction during the animation!",
-    "💡 Aim gliding increases your critical chance on many weapons.",
-    "💡 Most boss drops can be increased by using resource boosters.",
-    "💡 The Helminth system lets you transfer abilities between Warframes!",
-    "💡 Capturing targets on Fissure missions grants you more Void Traces.",
-    "💡 Exodia Contagion can be used to nuke crowds from a distance with any Zaw."
-]
-
-@bot.tree.command(name="pun", description="Ordis will tell you a random joke!")
-async def pun(interaction: discord.Interaction):
-    joke = random.choice(ORDIS_JOKES)
-    bot.state["stats"]["puns_told"] = bot.state["stats"].get("puns_told", 0) + 1
-    bot.state["stats"]["commands_used"] = bot.state["stats"].get("commands_used", 0) + 1
-    save_state(bot.state)
-    await interaction.response.send_message(joke)
-
-@bot.tree.command(name="tip", description="Get a random Warframe gameplay tip!")
-async def tip(interaction: discord.Interaction):
-    tip = random.choice(WARFRAME_TIPS)
-    bot.state["stats"]["commands_used"] = bot.state["stats"].get("commands_used", 0) + 1
-    save_state(bot.state)
-    await interaction.response.send_message(tip)
-
-@bot.tree.command(name="stats", description="View Oda's statistics")
-async def stats(interaction: discord.Interaction):
-    uptime = datetime.utcnow() - bot.start_time
-    hours, remainder = divmod(int(uptime.total_seconds()), 3600)
-    minutes, seconds = divmod(remainder, 60)
-    
-    embed = discord.Embed(title="📊 Oda Statistics", color=0xD4AF36)
-    embed.set_thumbnail(url="https://ik.imagekit.io/qcxbyrkgu/Golden_Pagoda_Emblem-clear.png?updatedAt=1752791247987")
-    embed.add_field(name="⏱️ Uptime", value=f"{hours}h {minutes}m {seconds}s", inline=True)
-    embed.add_field(name="🖥️ Guilds", value=str(len(bot.guilds)), inline=True)
-    embed.add_field(name="👥 Users", value=str(len(bot.users)), inline=True)
-    embed.add_field(name="🎭 Puns Told", value=str(bot.state["stats"].get("puns_told", 0)), inline=True)
-    embed.add_field(name="⚙️ Commands Used", value=str(bot.state["stats"].get("commands_used", 0)), inline=True)
-    embed.set_footer(text=f"Oda Bot v2.0 • Latency: {round(bot.latency * 1000)}ms")
-    
-    await interaction.response.send_message(embed=embed)
-
-@bot.tree.command(name="find", description="Find messages containing specific text in a channel")
-@app_commands.checks.has_permissions(administrator=True)
-async def find(interaction: discord.Interaction, text: str, channel: discord.TextChannel, limit: Optional[int] = 100):
-    await interaction.response.defer(ephemeral=True, thinking=True)
-    
-    found = []
-    search_limit = min(limit, 1000)  # Cap at 1000 for performance
-    
-    async for message in channel.history(limit=search_limit):
-        if text.lower() in message.content.lower():
-            found.append(message)
-    
-    embed = discord.Embed(title="🔍 Search Results", color=0xD4AF36)
-    embed.set_thumbnail(url="https://ik.imagekit.io/qcxbyrkgu/Golden_Pagoda_Emblem-clear.png?updatedAt=1752791247987")
-    embed.description = f"Found **{len(found)}** message{'s' if len(found) != 1 else ''} containing '{text}' in {channel.mention}"
-    
-    if found:
-        msg_links = []
-        for m in found[:10]:
-            message_url = f"https://discord.com/channels/{interaction.guild.id}/{channel.id}/{m.id}"
-            preview = m.content[:50] + "..." if len(m.content) > 50 else m.content
-            msg_links.append(f"[{m.author.name}]({message_url}): *{preview}*")
-        
-        if len(found) > 10:
-            msg_links.append(f"...and {len(found) - 10} more")
-        
-        embed.add_field(name="Messages", value=_build_truncated_field(msg_links, joiner="\n"), inline=False)
-    else:
-        embed.add_field(name="Messages", value="No messages found.", inline=False)
-    
-    embed.set_footer(text=f"Searched last {search_limit} messages")
-    await interaction.followup.send(embed=embed, ephemeral=True)
-
-@bot.tree.command(name="sync_ign", description="Sync IGNs from a channel and set as nicknames")
-@app_commands.checks.has_permissions(administrator=True)
-async def sync_ign(interaction: discord.Interaction, channel: discord.TextChannel, limit: Optional[int] = 100):
-    await interaction.response.defer(ephemeral=True, thinking=True)
-    
-    processed_users = set()
-    results = []
-    failures = []
-    ign_pattern = re.compile(r"ign:\s*(.+)", re.IGNORECASE)
-    
-    async for message in channel.history(limit=min(limit, 500)):
-        match = ign_pattern.search(message.content)
-        if match:
-            ign_raw = match.group(1).strip()
-            clan_idx = re.search(r"\bclan\b", ign_raw, re.IGNORECASE)
-            if clan_idx:
-                ign_raw = ign_raw[:clan_idx.start()].strip()
-            ign = re.sub(r"#\s*\d+", "", ign_raw).strip()
-            ign = sanitize_nickname(ign, max_length=32)
-            
-            member = interaction.guild.get_member(message.author.id)
-            if member is None:
-                try:
-                    member = await interaction.guild.fetch_member(message.author.id)
-                except discord.NotFound:
-                    continue
-            
-            if not ign:
-                ign = sanitize_nickname(message.author.display_name, max_length=32)
-                if not ign:
-                    continue
-            
-            if member and member.id not in processed_users:
-                previous_nick = member.nick if member.nick else member.name
-                try:
-                    await member.edit(nick=ign)
-                    results.append({
-                        "user": member,
-                        "ign": ign,
-                        "previous_nick": previous_nick,
-                        "message_id": message.id
-                    })
-                    processed_users.add(member.id)
-                except discord.Forbidden:
-                    failures.append(f"❌ Cannot change {member.display_name}'s nickname (missing permissions)")
-                except Exception as e:
-                    failures.append(f"❌ Failed for {member.display_name}: {str(e)[:50]}")
-    
-    embed = discord.Embed(title="🔄 IGN Sync Results", color=0xD4AF36)
-    embed.set_thumbnail(url="https://ik.imagekit.io/qcxbyrkgu/Golden_Pagoda_Emblem-clear.png?updatedAt=1752791247987")
-    
-    if results:
-        synced_count = len(results)
-        embed.description = f"✅ Successfully synced **{synced_count}** user{'s' if synced_count != 1 else ''}." 
-        
-        lines = []
-        for r in results[:10]:
-            lines.append(f"✓ {r['user'].name} → **{r['ign']}**")
-        if synced_count > 10:
-            lines.append(f"...and {synced_count - 10} more")
-        
-        embed.add_field(name="Updated Nicknames", value=_build_truncated_field(lines, joiner="\n"), inline=False)
-        
-        if failures:
-            embed.add_field(name="⚠️ Failures", value=_build_truncated_field(failures[:5], joiner="\n"), inline=False)
-    else:
-        embed.description = "📭 No IGN patterns found in the last messages."
-    
-    await interaction.followup.send(embed=embed, ephemeral=True)
-
-@bot.tree.command(name="serverinfo", description="Get information about the server")
-async def serverinfo(interaction: discord.Interaction):
-    guild = interaction.guild
-    
-    embed = discord.Embed(title=f"ℹ️ {guild.name}", color=0xD4AF36)
-    if guild.icon:
-        embed.set_thumbnail(url=guild.icon.url)
-    
-    embed.add_field(name="👑 Owner", value=guild.owner.mention, inline=True)
-    embed.add_field(name="👥 Members", value=str(guild.member_count), inline=True)
-    embed.add_field(name="📅 Created", value=guild.created_at.strftime("%Y-%m-%d"), inline=True)
-    embed.add_field(name="💬 Channels", value=f"Text: {len(guild.text_channels)}\nVoice: {len(guild.voice_channels)}", inline=True)
-    embed.add_field(name="🎭 Roles", value=str(len(guild.roles)), inline=True)
-    embed.add_field(name="😀 Emojis", value=str(len(guild.emojis)), inline=True)
-    embed.add_field(name="🛡️ Verification", value=str(guild.verification_level), inline=True)
-    embed.add_field(name="🔔 Boost Level", value=f"Level {guild.premium_tier} ({guild.premium_subscription_count} boosts)", inline=True)
-    
-    await interaction.response.send_message(embed=embed)
-
-@bot.tree.command(name="help", description="Show all available commands")
-async def help_command(interaction: discord.Interaction):
-    embed = discord.Embed(title="🤖 Oda Bot Commands", color=0xD4AF36)
-    embed.set_thumbnail(url="https://ik.imagekit.io/qcxbyrkgu/Golden_Pagoda_Emblem-clear.png?updatedAt=1752791247987")
-    
-    commands_list = [
-        ("🎭 `/pun`", "Get a random Ordis joke"),
-        ("💡 `/tip`", "Get a Warframe gameplay tip"),
-        ("📊 `/stats`", "View bot statistics"),
-        ("🔍 `/find`", "Search messages (Admin)"),
-        ("🔄 `/sync_ign`", "Sync IGNs to nicknames (Admin)"),
-        ("ℹ️ `/serverinfo`", "Server information"),
-        ("❓ `/help`", "Show this message"),
-    ]
-    
-    for name, desc in commands_list:
-        embed.add_field(name=name, value=desc, inline=False)
-    
-    embed.set_footer(text="Oda Bot v2.0")
-    
-    await interaction.response.send_message(embed=embed, ephemeral=True)
-
-# Error handlers for specific commands
-@find.error
-async def find_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
-    if isinstance(error, app_commands.MissingPermissions):
-        await interaction.response.send_message("❌ You need Administrator permissions to use this command.", ephemeral=True)
-
-@sync_ign.error
-async def sync_ign_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
-    if isinstance(error, app_commands.MissingPermissions):
-        await interaction.response.send_message("❌ You need Administrator permissions to use this command.", ephemeral=True)
+# Error handler for every app command; per-command handlers live with the commands in cogs/
+@bot.tree.error
+async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    if isinstance(error, app_commands.CommandOnCooldown):
+        await interaction.response.send_message(
+            f"⏳ Slow down, Operator! Try again in {max(1, round(error.retry_after))}s.", ephemeral=True)
+        return
+    await app_commands.CommandTree.on_error(bot.tree, interaction, error)
+
+async def main():
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, bot.request_shutdown)
+    async with bot:
+        await bot.start(DISCORD_TOKEN)
+        if bot.shutdown_task is not None:
+            await bot.shutdown_task
 
 # Main
 if __name__ == "__main__":
-    TOKEN = os.getenv("DISCORD_TOKEN")
-    if not TOKEN:
+    if not DISCORD_TOKEN:
         logger.error("Please set the DISCORD_TOKEN environment variable.")
         sys.exit(1)
     else:
         try:
-            bot.run(TOKEN)
-        except KeyboardInterrupt:
-            logger.info("Bot stopped by user")
+            asyncio.run(main())
         except Exception as e:
             logger.error(f"Fatal error: {e}")
-            sys.exit(1)
\ No newline at end of file
+            sys.exit(1)
@@ -0,0 +1,165 @@
+"""Small in-process caches and the cached member resolver."""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger('OdaBot.cache')
+
+MEMBER_QUERY_CHUNK = 100  # user IDs per gateway member query (Discord's maximum)
+MEMBER_TTL = 300.0  # seconds a resolved member is trusted
+MEMBER_NEGATIVE_TTL = 60.0  # seconds a "not in this guild" answer is trusted
+
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry once full"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return default
+        return self._data[key]
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        return self._data.pop(key, default)
+
+    def clear(self):
+        self._data.clear()
+
+
+class TTLCache:
+    """LRU cache whose entries also expire after a per-entry time-to-live"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.ttl = ttl
+        self._lru = LRUCache(maxsize)
+
+    def __len__(self):
+        return len(self._lru)
+
+    def get(self, key, default=None):
+        entry = self._lru.get(key)
+        if entry is None:
+            return default
+        expires, value = entry
+        if expires < time.monotonic():
+            self._lru.pop(key)
+            return default
+        return value
+
+    def put(self, key, value, ttl=None):
+        self._lru.put(key, (time.monotonic() + (self.ttl if ttl is None else ttl), value))
+
+    def pop(self, key, default=None):
+        entry = self._lru.pop(key)
+        return default if entry is None else entry[1]
+
+
+_MISSING = object()
+
+
+class MemberResolver:
+    """Resolves user IDs to guild members with caching and request coalescing.
+
+    Lookups check the guild's own member cache, then a TTL cache that also
+    remembers users who are not in the guild. Whatever is left is resolved
+    with bulk gateway member queries (MEMBER_QUERY_CHUNK IDs each) instead
+    of one REST fetch per user. Concurrent lookups of the same member
+    share a single in-flight query.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = MEMBER_TTL, negative_ttl: float = MEMBER_NEGATIVE_TTL,
+                 cache_in_guild: bool = True):
+        self.negative_ttl = negative_ttl
+        self.cache_in_guild = cache_in_guild
+        self._cache = TTLCache(maxsize, ttl)
+        self._inflight = {}
+
+    def remember(self, member):
+        self._cache.put((member.guild.id, member.id), member)
+
+    def remember_absent(self, guild_id: int, user_id: int):
+        self._cache.put((guild_id, user_id), None, ttl=self.negative_ttl)
+
+    async def resolve(self, guild, user_id: int):
+        return (await self.resolve_many(guild, [user_id])).get(user_id)
+
+    async def resolve_many(self, guild, user_ids):
+        """Map each user ID that is a member of `guild` to its Member; absent users are left out"""
+        members = {}
+        to_query = []
+        waiting = {}
+        for user_id in dict.fromkeys(user_ids):
+            member = guild.get_member(user_id)
+            if member is not None:
+                members[user_id] = member
+                continue
+            key = (guild.id, user_id)
+            cached = self._cache.get(key, _MISSING)
+            if cached is not _MISSING:
+                if cached is not None:
+                    members[user_id] = cached
+            elif key in self._inflight:
+                waiting[user_id] = self._inflight[key]
+            else:
+                to_query.append(user_id)
+
+        if to_query:
+            loop = asyncio.get_running_loop()
+            futures = {user_id: loop.create_future() for user_id in to_query}
+            for user_id, future in futures.items():
+                self._inflight[(guild.id, user_id)] = future
+            try:
+                found, answered = await self._query(guild, to_query)
+                for user_id, future in futures.items():
+                    member = found.get(user_id)
+                    if member is not None:
+                        self.remember(member)
+                        members[user_id] = member
+                    elif user_id in answered:
+                        self.remember_absent(guild.id, user_id)
+                    future.set_result(member)
+            finally:
+                for user_id, future in futures.items():
+                    self._inflight.pop((guild.id, user_id), None)
+                    if not future.done():
+                        future.set_result(None)
+
+        for user_id, future in waiting.items():
+            member = await asyncio.shield(future)
+            if member is not None:
+                members[user_id] = member
+        return members
+
+    async def _query(self, guild, user_ids):
+        """Bulk-query members; returns (found, answered) where answered holds IDs whose chunk succeeded"""
+        found = {}
+        answered = set()
+        for i in range(0, len(user_ids), MEMBER_QUERY_CHUNK):
+            chunk = user_ids[i:i + MEMBER_QUERY_CHUNK]
+            try:
+                result = await guild.query_members(user_ids=chunk, limit=len(chunk), cache=self.cache_in_guild)
+            except asyncio.TimeoutError:
+                logger.warning(f"Timed out resolving {len(chunk)} members in {guild.id}")
+                continue
+            answered.update(chunk)
+            for member in result:
+                found[member.id] = member
+        return found, answered
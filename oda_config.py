@@ -0,0 +1,139 @@
+"""Runtime configuration for oda_bot_improved_Version2 and its command extensions.
+
+Everything here is read from the environment (and `.env`) once, at import,
+so the bot module and every extension in cogs/ share the same settings and
+rate limiter instances without importing the bot script itself. Only modules
+the bot itself uses are imported here; settings of a single extension default
+to None, which that extension replaces with its module's default.
+"""
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from oda_cache import MEMBER_TTL, MEMBER_NEGATIVE_TTL
+from oda_diag import PROFILE_DIR
+from oda_gateway import HANDOFF_FILE
+from oda_ratelimit import RateLimiter
+from oda_state import STATE_FILE as DEFAULT_STATE_FILE, STATE_DB as DEFAULT_STATE_DB
+
+load_dotenv()
+
+DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
+
+# State persistence: "json" (default) rewrites state.json, "sqlite" uses a WAL database with
+# atomic counters that several processes/shards can share (imports state.json on first run)
+STATE_BACKEND = os.getenv("ODA_STATE_BACKEND", "json").lower()
+STATE_FILE = Path(os.getenv("ODA_STATE_PATH", str(DEFAULT_STATE_FILE)))
+STATE_DB_FILE = Path(os.getenv("ODA_STATE_DB", str(DEFAULT_STATE_DB)))
+STATE_FLUSH_INTERVAL = float(os.getenv("ODA_STATE_FLUSH_INTERVAL", "5"))
+
+# Command tree sync: global commands are only re-synced when their definitions change
+# (or ODA_FORCE_SYNC=1); ODA_DEV_GUILD_ID syncs to that one guild instead, instantly
+DEV_GUILD_ID = int(os.getenv("ODA_DEV_GUILD_ID")) if os.getenv("ODA_DEV_GUILD_ID") else None
+FORCE_COMMAND_SYNC = os.getenv("ODA_FORCE_SYNC", "0") == "1"
+
+# Seconds without a new GUILD_CREATE after which the gateway counts as READY (discord.py waits 2s).
+# Guilds that stream in later are still added; READY only gates on_ready.
+GUILD_READY_TIMEOUT = float(os.getenv("ODA_GUILD_READY_TIMEOUT", "0.5"))
+
+# Shutdown on SIGTERM/SIGINT: running commands and jobs get ODA_SHUTDOWN_TIMEOUT seconds to finish
+# (keep it below the container's stop grace period). With ODA_SESSION_HANDOFF=1 the gateway
+# session is saved to ODA_HANDOFF_PATH and the next process resumes it instead of identifying.
+SHUTDOWN_TIMEOUT = float(os.getenv("ODA_SHUTDOWN_TIMEOUT", "20"))
+SESSION_HANDOFF = os.getenv("ODA_SESSION_HANDOFF", "0") == "1"
+HANDOFF_PATH = Path(os.getenv("ODA_HANDOFF_PATH", str(HANDOFF_FILE)))
+
+# Command extensions (modules in cogs/) loaded at startup. ODA_EXTENSIONS narrows the set,
+# e.g. "fun,info"; modules only an extension uses (oda_content, oda_index, oda_search, oda_ign)
+# are imported by that extension, so they are not loaded when it is not. search and ign
+# load jobs themselves, since /find and /sync_ign run as background jobs.
+ALL_EXTENSIONS = ("fun", "info", "search", "ign", "jobs", "diagnostics")
+EXTENSIONS = [name.strip() for name in os.getenv("ODA_EXTENSIONS", ",".join(ALL_EXTENSIONS)).split(",")
+              if name.strip()]
+_unknown_extensions = sorted(set(EXTENSIONS) - set(ALL_EXTENSIONS))
+if _unknown_extensions:
+    raise RuntimeError(f"Unknown ODA_EXTENSIONS entries: {', '.join(_unknown_extensions)}")
+
+# Full-text message index used by /find (set ODA_MESSAGE_INDEX=0 to disable)
+MESSAGE_INDEX_ENABLED = os.getenv("ODA_MESSAGE_INDEX", "1") != "0" and "search" in EXTENSIONS
+MESSAGE_INDEX_FILE = Path(os.getenv("ODA_INDEX_PATH")) if os.getenv("ODA_INDEX_PATH") else None  # oda_index.INDEX_FILE
+BACKFILL_BATCH_SIZE = 500
+BACKFILL_CONCURRENCY = 2  # channels backfilled at once
+FIND_CONCURRENCY = int(os.getenv("ODA_FIND_CONCURRENCY", "4"))  # channels scanned at once by /find
+
+# Lean intents (default): subscribe only to the gateway events the bot uses. Message events are
+# enabled only when the index or live IGN sync (ODA_LIVE_IGN=1, or any /ign_live channel) needs
+# them, and MESSAGE_CREATE payloads nobody consumes are dropped before discord.py parses them.
+LEAN_INTENTS = os.getenv("ODA_LEAN_INTENTS", "1") != "0"
+LIVE_IGN_ENABLED = os.getenv("ODA_LIVE_IGN", "0") == "1" and "ign" in EXTENSIONS
+
+# /sync_ign nickname edits in flight at once
+IGN_SYNC_WORKERS = int(os.getenv("ODA_IGN_SYNC_WORKERS", "4"))
+IGN_PLAN_TIMEOUT = 300  # seconds a /sync_ign dry-run preview can still be applied
+IGN_PREVIEW_SCAN_LIMIT = 500  # messages a /sync_ign dry run scans while the admin waits
+
+# Background jobs: /find and /sync_ign run on ODA_JOB_WORKERS workers (one job per guild at a
+# time) and may scan up to ODA_JOB_SCAN_LIMIT messages per channel, since they no longer have
+# to finish within the 15 minute interaction window
+JOB_WORKERS = int(os.getenv("ODA_JOB_WORKERS", "2"))
+JOB_SCAN_LIMIT = int(os.getenv("ODA_JOB_SCAN_LIMIT", "100000"))
+JOB_PROGRESS_EDIT_INTERVAL = 1.5  # minimum seconds between progress edits of a job's response
+
+# /pun and /tip content: ordis_jokes.txt and warframe_tips.txt in ODA_CONTENT_DIR, re-read within
+# ODA_CONTENT_RELOAD_INTERVAL seconds of a change (0 disables). The last ODA_CONTENT_NO_REPEAT
+# picks in a channel are not repeated. Unset values use the defaults in oda_content.
+CONTENT_DIR = Path(os.getenv("ODA_CONTENT_DIR")) if os.getenv("ODA_CONTENT_DIR") else None
+CONTENT_RELOAD_INTERVAL = (float(os.getenv("ODA_CONTENT_RELOAD_INTERVAL"))
+                           if os.getenv("ODA_CONTENT_RELOAD_INTERVAL") else None)
+CONTENT_NO_REPEAT = int(os.getenv("ODA_CONTENT_NO_REPEAT")) if os.getenv("ODA_CONTENT_NO_REPEAT") else None
+
+# Token buckets that keep spammy users from driving command load and REST usage
+COMMAND_LIMIT = RateLimiter(5, 10)  # light commands, per user, shared between them
+FIND_LIMIT = RateLimiter(4, 60)  # /find, per guild
+SYNC_IGN_LIMIT = RateLimiter(1, 30)  # /sync_ign, per guild
+LIVE_IGN_LIMIT = RateLimiter(2, 60)  # nickname edits from live IGN posts, per user
+
+
+def _parse_shard_ids(spec):
+    """Parse ODA_SHARD_IDS such as "0-3" or "0,2,4" into a list of shard IDs"""
+    if not spec.strip():
+        return None
+    ids = []
+    for part in spec.split(","):
+        part = part.strip()
+        if "-" in part:
+            first, last = part.split("-", 1)
+            ids.extend(range(int(first), int(last) + 1))
+        elif part:
+            ids.append(int(part))
+    return sorted(set(ids))
+
+
+# Metrics are always collected; set ODA_METRICS_PORT to serve them at /metrics
+METRICS_HOST = os.getenv("ODA_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("ODA_METRICS_PORT")) if os.getenv("ODA_METRICS_PORT") else None
+
+# Diagnostics: ODA_DIAGNOSTICS=1 starts the loop watchdog at boot; ODA_PROFILE_COMMANDS
+# lists app commands to run under the sampling profiler. Both can be toggled with /diagnostics.
+DIAGNOSTICS_ENABLED = os.getenv("ODA_DIAGNOSTICS", "0") == "1"
+BLOCK_THRESHOLD_MS = float(os.getenv("ODA_BLOCK_THRESHOLD_MS", "250"))
+PROFILE_COMMANDS = [c.strip() for c in os.getenv("ODA_PROFILE_COMMANDS", "").split(",") if c.strip()]
+PROFILE_PATH = Path(os.getenv("ODA_PROFILE_DIR", str(PROFILE_DIR)))
+
+# Member cache policy: "full" chunks every guild at startup and caches all members;
+# "lean" skips chunking and keeps only recently seen members in a bounded LRU.
+# Resolved members (and users found to have left) are trusted for a TTL in both modes.
+MEMBER_CACHE_MODE = os.getenv("ODA_MEMBER_CACHE", "lean").lower()
+MEMBER_LRU_SIZE = int(os.getenv("ODA_MEMBER_CACHE_SIZE", "10000"))
+LEAN_MEMBER_CACHE = MEMBER_CACHE_MODE == "lean"
+MEMBER_CACHE_TTL = float(os.getenv("ODA_MEMBER_TTL", str(MEMBER_TTL)))
+MEMBER_ABSENT_TTL = float(os.getenv("ODA_MEMBER_ABSENT_TTL", str(MEMBER_NEGATIVE_TTL)))
+
+# Sharding: ODA_SHARDING=auto runs every shard Discord recommends in this process;
+# ODA_SHARD_COUNT plus ODA_SHARD_IDS pins a range of shards to this process/container
+SHARD_IDS = _parse_shard_ids(os.getenv("ODA_SHARD_IDS", ""))
+SHARD_COUNT = int(os.getenv("ODA_SHARD_COUNT")) if os.getenv("ODA_SHARD_COUNT") else None
+SHARDED = os.getenv("ODA_SHARDING", "off").lower() == "auto" or SHARD_IDS is not None or SHARD_COUNT is not None
+if SHARD_IDS is not None and SHARD_COUNT is None:
+    raise RuntimeError("ODA_SHARD_IDS requires ODA_SHARD_COUNT to be set")
@@ -0,0 +1,208 @@
+"""Content pools for /pun and /tip, loaded from text files and reloaded on change.
+
+Each pool is a UTF-8 text file with one entry per line. Blank lines and
+lines starting with "#" are skipped, a literal "\\n" becomes a line break, and
+an entry can carry a relative weight as a "3 | " prefix (default 1):
+
+    # ordis_jokes.txt
+    Operator, I would tell you a joke about the Void, but it's... Devoid of humor.
+    2 | Intruders Detected! Don't worry, Operator… I already gave them the tour. Of the airlock.
+
+Entries are interned and kept in a tuple, with the alias tables for weighted
+picks in flat arrays, so a pool of thousands of entries costs little more
+than its text. Picks are O(1) (Vose's alias method). Each channel remembers
+its last few picks in a small ring buffer, and a pick that repeats one of
+them is drawn again (a bounded number of times), so channels rarely see a
+line again soon after it came up.
+"""
+import asyncio
+import logging
+import random
+import re
+import sys
+from array import array
+from pathlib import Path
+
+from oda_cache import LRUCache
+
+logger = logging.getLogger('OdaBot.content')
+
+CONTENT_DIR = Path(__file__).resolve().parent / "data"
+RELOAD_INTERVAL = 5.0  # seconds between checks of the pool files for changes
+NO_REPEAT = 8  # recent picks per channel that are not repeated
+RECENT_CHANNELS = 10000  # channels whose recent picks are remembered
+MAX_REDRAWS = 8  # draws before a repeat is accepted, which keeps picks O(1) with skewed weights
+
+_WEIGHT_PREFIX = re.compile(r"^(\d+(?:\.\d+)?)\s*\|\s*(.*)$")
+
+
+def parse_entries(text: str):
+    """Parse a pool file into (entries, weights), merging the weights of duplicate entries"""
+    weights_by_entry = {}
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        weight = 1.0
+        match = _WEIGHT_PREFIX.match(line)
+        if match:
+            weight, line = float(match.group(1)), match.group(2).strip()
+        if not line or weight <= 0:
+            logger.warning(f"Skipping empty or zero-weight entry on line {number}")
+            continue
+        entry = sys.intern(line.replace("\\n", "\n"))
+        weights_by_entry[entry] = weights_by_entry.get(entry, 0.0) + weight
+    return tuple(weights_by_entry), list(weights_by_entry.values())
+
+
+def build_alias_table(weights):
+    """Vose's alias method: (prob, alias) arrays for O(1) weighted picks, or None when uniform"""
+    n = len(weights)
+    if n == 0 or min(weights) == max(weights):
+        return None
+    total = sum(weights)
+    scaled = [w * n / total for w in weights]
+    prob = array("d", [0.0]) * n
+    alias = array("I", [0]) * n
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        low, high = small.pop(), large.pop()
+        prob[low] = scaled[low]
+        alias[low] = high
+        scaled[high] -= 1.0 - scaled[low]
+        (small if scaled[high] < 1.0 else large).append(high)
+    for i in small + large:  # leftovers are 1.0 up to rounding
+        prob[i] = 1.0
+    return prob, alias
+
+
+class _Recent:
+    """Ring buffer of a channel's last picks, tied to the pool version they index into"""
+    __slots__ = ("version", "picks", "next")
+
+    def __init__(self, version: int, size: int):
+        self.version = version
+        self.picks = array("i", [-1]) * size
+        self.next = 0
+
+    def add(self, index: int):
+        self.picks[self.next] = index
+        self.next = (self.next + 1) % len(self.picks)
+
+
+class ContentPool:
+    """One reloadable pool of entries with weighted, no-repeat-per-channel picks"""
+
+    def __init__(self, path, no_repeat: int = NO_REPEAT, recent_channels: int = RECENT_CHANNELS):
+        self.path = Path(path)
+        self.no_repeat = no_repeat
+        self.entries = ()
+        self.version = 0
+        self._table = None
+        self._signature = None
+        self._recent = LRUCache(recent_channels)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _stat(self):
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def changed(self) -> bool:
+        return self._stat() != self._signature
+
+    def _read(self):
+        signature = self._stat()
+        try:
+            return signature, parse_entries(self.path.read_text(encoding="utf-8"))
+        except (OSError, UnicodeDecodeError) as e:
+            logger.error(f"Could not load {self.path}: {e}")
+            return signature, None
+
+    def _apply(self, signature, parsed) -> bool:
+        self._signature = signature  # a broken file is not retried until it changes again
+        if parsed is None:
+            return False
+        entries, weights = parsed
+        self.entries, self._table = entries, build_alias_table(weights)
+        self.version += 1
+        logger.info(f"Loaded {len(entries)} entries from {self.path}")
+        return True
+
+    def load(self) -> bool:
+        """Read the file and swap in its entries. Keeps the current entries (and returns False) on error"""
+        return self._apply(*self._read())
+
+    async def reload(self) -> bool:
+        """load() with the file read and parsed in a worker thread; the swap happens on the event loop"""
+        return self._apply(*await asyncio.to_thread(self._read))
+
+    def _draw(self) -> int:
+        i = random.randrange(len(self.entries))
+        if self._table is not None:
+            prob, alias = self._table
+            if random.random() >= prob[i]:
+                i = alias[i]
+        return i
+
+    def pick(self, channel_id=None):
+        """A random entry, avoiding the channel's recent picks where the pool allows. None if empty"""
+        if not self.entries:
+            return None
+        # Never remember more than half the pool, so a fresh entry is always likely to be drawn
+        window = min(self.no_repeat, len(self.entries) // 2)
+        if channel_id is None or window == 0:
+            return self.entries[self._draw()]
+        recent = self._recent.get(channel_id)
+        if recent is None or recent.version != self.version or len(recent.picks) != window:
+            recent = _Recent(self.version, window)
+            self._recent.put(channel_id, recent)
+        i = self._draw()
+        for _ in range(MAX_REDRAWS):
+            if i not in recent.picks:
+                break
+            i = self._draw()
+        recent.add(i)
+        return self.entries[i]
+
+
+class ContentLibrary:
+    """The named pools in a directory (name.txt each), with a background task reloading changed files"""
+
+    def __init__(self, directory=CONTENT_DIR, names=(), no_repeat: int = NO_REPEAT):
+        self.directory = Path(directory)
+        self.pools = {name: ContentPool(self.directory / f"{name}.txt", no_repeat) for name in names}
+        self._task = None
+
+    def __getitem__(self, name) -> ContentPool:
+        return self.pools[name]
+
+    async def reload(self, force: bool = False):
+        """Reload the pools whose files changed (or all of them); returns the names reloaded"""
+        reloaded = []
+        for name, pool in self.pools.items():
+            if (force or pool.changed()) and await pool.reload():
+                reloaded.append(name)
+        return reloaded
+
+    def start(self, interval: float = RELOAD_INTERVAL):
+        if interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._watch(interval))
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _watch(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reload()
+            except Exception as e:
+                logger.error(f"Content reload failed: {e}")
@@ -0,0 +1,166 @@
+"""Opt-in diagnostics: event-loop blocking detector and sampling command profiler.
+
+Both run in helper threads that inspect the event loop thread's current stack
+via sys._current_frames(), so they see synchronous code that is hogging the
+loop without needing any cooperation from it.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger('OdaBot.diag')
+
+BLOCK_THRESHOLD = 0.25  # seconds a callback may hold the loop before we log its stack
+BEAT_INTERVAL = 0.05
+SAMPLE_INTERVAL = 0.005
+PROFILE_DIR = Path("profiles")
+
+
+def _loop_thread_stack(thread_id):
+    frame = sys._current_frames().get(thread_id)
+    return traceback.format_stack(frame) if frame is not None else []
+
+
+class LoopWatchdog:
+    """Logs the loop thread's stack whenever it stops responding for longer than a threshold"""
+
+    def __init__(self, threshold: float = BLOCK_THRESHOLD):
+        self.threshold = threshold
+        self._last_beat = time.monotonic()
+        self._beat_task = None
+        self._thread = None
+        self._stop = None  # Event of the current run; each run gets its own, so a stale thread can't miss its stop
+        self._loop_thread_id = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop = threading.Event()
+        self._beat_task = asyncio.get_running_loop().create_task(self._beat())
+        self._thread = threading.Thread(target=self._watch, args=(self._stop,), name="oda-loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"Loop watchdog started (threshold {self.threshold * 1000:.0f}ms)")
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stop.set()
+        self._beat_task.cancel()
+        self._thread = None
+        logger.info("Loop watchdog stopped")
+
+    async def _beat(self):
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(BEAT_INTERVAL)
+
+    def _watch(self, stop):
+        stalled_since = None
+        while not stop.wait(self.threshold / 2):
+            blocked = time.monotonic() - self._last_beat - BEAT_INTERVAL
+            if blocked > self.threshold:
+                if stalled_since is None:
+                    stalled_since = self._last_beat
+                    stack = "".join(_loop_thread_stack(self._loop_thread_id))
+                    logger.warning(f"Event loop blocked for {blocked * 1000:.0f}ms, loop thread stack:\n{stack}")
+            elif stalled_since is not None:
+                logger.warning(f"Event loop unblocked after {(self._last_beat - stalled_since) * 1000:.0f}ms")
+                stalled_since = None
+
+
+class StackSampler:
+    """Samples the loop thread's stack on an interval and aggregates collapsed stacks.
+
+    Output is in the "folded" format understood by flamegraph.pl and speedscope.
+    Everything running on the loop while sampling is captured, not just the
+    profiled coroutine.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self._on_stopped = None
+
+    def start(self):
+        thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, args=(thread_id,), name="oda-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self, on_stopped=None):
+        """Signal the sampler thread to stop without waiting for it, since this runs on the loop.
+        `on_stopped`, if given, is called from the sampler thread once the samples are final."""
+        self._on_stopped = on_stopped
+        self._stop.set()
+
+    def _run(self, thread_id):
+        try:
+            self._sample(thread_id)
+        finally:
+            if self._on_stopped is not None:
+                self._on_stopped()
+
+    def _sample(self, thread_id):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def dump(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Diagnostics:
+    """Runtime-toggleable watchdog plus the set of app commands to profile"""
+
+    def __init__(self, threshold: float = BLOCK_THRESHOLD, profile_dir=PROFILE_DIR, profiled=()):
+        self.watchdog = LoopWatchdog(threshold)
+        self.profile_dir = Path(profile_dir)
+        self.profiled = set(profiled)
+
+    @contextmanager
+    def profile(self, command: str):
+        """Sample the loop while `command` runs and write the folded stacks to profile_dir"""
+        if command not in self.profiled:
+            yield
+            return
+        sampler = StackSampler()
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            path = self.profile_dir / f"{command.replace(' ', '_')}-{int(time.time() * 1000)}.folded"
+
+            def write():
+                # Runs on the sampler thread once it has stopped, so the write does not block the loop
+                try:
+                    sampler.dump(path)
+                    logger.info(f"Profiled /{command} ({elapsed * 1000:.0f}ms, "
+                                f"{sum(sampler.samples.values())} samples) -> {path}")
+                except OSError as e:
+                    logger.error(f"Failed to write profile for /{command}: {e}")
+            sampler.stop(on_stopped=write)
@@ -0,0 +1,62 @@
+"""Response templates: branded embeds, built once or cached per guild.
+
+Static embeds (like /help) are built a single time and reused for every
+response. Semi-static ones (like /serverinfo) are cached per guild until an
+event that changes their contents invalidates them.
+"""
+import discord
+
+BRAND_COLOR = 0xD4AF36
+BRAND_THUMBNAIL = "https://ik.imagekit.io/qcxbyrkgu/Golden_Pagoda_Emblem-clear.png?updatedAt=1752791247987"
+
+
+def branded_embed(title: str, description=None) -> discord.Embed:
+    """Embed in the bot's colour with the branded thumbnail"""
+    embed = discord.Embed(title=title, description=description, color=BRAND_COLOR)
+    embed.set_thumbnail(url=BRAND_THUMBNAIL)
+    return embed
+
+
+def truncated_field(items, joiner="\n", max_chars=1024, more_fmt="...and {n} more"):
+    """Join items with joiner but ensure result length <= max_chars."""
+    if not items:
+        return "None"
+    out = ""
+    for i, it in enumerate(items):
+        part = (joiner if out else "") + it
+        if len(out) + len(part) > max_chars:
+            remaining = len(items) - i
+            suffix = (joiner if out else "") + more_fmt.format(n=remaining)
+            if len(out) + len(suffix) <= max_chars:
+                out += suffix
+            else:
+                out = out[: max_chars - 3] + "..."
+            return out
+        out += part
+    return out
+
+
+class EmbedTemplates:
+    """Cache of prebuilt embeds. Cached embeds are shared, so callers must not mutate them."""
+
+    def __init__(self):
+        self._static = {}
+        self._per_guild = {}
+
+    def static(self, key, build):
+        """Embed that never changes for the lifetime of the process"""
+        embed = self._static.get(key)
+        if embed is None:
+            embed = self._static[key] = build()
+        return embed
+
+    def for_guild(self, key, guild_id: int, build):
+        """Embed cached per guild until invalidate_guild() is called for it"""
+        cache = self._per_guild.setdefault(guild_id, {})
+        embed = cache.get(key)
+        if embed is None:
+            embed = cache[key] = build()
+        return embed
+
+    def invalidate_guild(self, guild_id: int):
+        self._per_guild.pop(guild_id, None)
@@ -0,0 +1,223 @@
+"""Gateway intent selection and cheap pre-parse filtering of dispatch events.
+
+discord.py turns every dispatched payload into model objects (a Message with
+its author, mentions, embeds and attachments) before any listener sees it.
+The cheapest event is one Discord never sends, so lean_intents() subscribes
+only to what the bot consumes. For events that must stay on but are mostly
+irrelevant, EventFilter wraps the connection state's parser so unwanted
+payloads are dropped while they are still a raw dict.
+
+SessionHandoff lets a replacement process RESUME the gateway session of the
+process it replaces, so a deploy neither re-identifies nor loses the events
+sent in between (Discord replays them on resume).
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+import discord
+import yarl
+from discord.gateway import DiscordWebSocket
+
+logger = logging.getLogger('OdaBot.gateway')
+
+HANDOFF_FILE = Path("gateway_session.json")
+HANDOFF_MAX_AGE = 60.0  # seconds a saved session is worth resuming; Discord expires idle sessions soon after
+
+
+def lean_intents(message_events: bool) -> discord.Intents:
+    """Only the intents the bot has listeners or commands for.
+
+    - guilds: channels, roles and guild metadata for every command
+    - members: member joins/removals keep /serverinfo and the member resolver current
+    - emojis_and_stickers: keeps the /serverinfo emoji count current
+    - message_content: message text returned by REST history reads (/find, /sync_ign)
+    - guild_messages: MESSAGE_CREATE/UPDATE/DELETE, only when a feature consumes them
+    Typing, reactions, voice states, invites, DMs etc. stay off.
+    """
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.members = True
+    intents.emojis_and_stickers = True
+    intents.message_content = True
+    intents.guild_messages = message_events
+    return intents
+
+
+class EventFilter:
+    """Drops raw gateway payloads for `event` that `wants(data)` rejects, before parsing.
+
+    Dropped events never reach the cache or any listener, so only filter
+    events whose side effects (message cache, last_message_id) are unused.
+    """
+
+    def __init__(self, connection, event: str, wants, dropped_counter=None):
+        self.connection = connection
+        self.event = event
+        self.wants = wants
+        self.dropped_counter = dropped_counter
+        self.seen = 0
+        self.dropped = 0
+        self._original = None
+
+    def install(self):
+        if self._original is not None:
+            return self
+        parsers = self.connection.parsers
+        original = self._original = parsers[self.event]
+        wants = self.wants
+
+        def parse(data):
+            self.seen += 1
+            if wants(data):
+                return original(data)
+            self.dropped += 1
+            if self.dropped_counter is not None:
+                self.dropped_counter.inc(self.event)
+
+        # Mutated in place: gateway websockets hold a reference to this dict
+        parsers[self.event] = parse
+        logger.info(f"Filtering {self.event} before dispatch")
+        return self
+
+    def uninstall(self):
+        if self._original is not None:
+            self.connection.parsers[self.event] = self._original
+            self._original = None
+
+
+async def hydrate_guilds(client):
+    """Fill the guild cache over REST, standing in for the GUILD_CREATEs a resumed session never sends.
+
+    Each guild gets its channels, roles, emojis, approximate member count and
+    the bot's own member (for permission checks); other members are resolved
+    on demand as usual.
+    """
+    http, state = client.http, client._connection
+    partials, after = [], None
+    while True:
+        page = await http.get_guilds(200, after=after, with_counts=False)
+        partials.extend(page)
+        if len(page) < 200:
+            break
+        after = page[-1]["id"]
+
+    async def load(guild_id):
+        data, channels, me = await asyncio.gather(
+            http.get_guild(guild_id), http.get_all_guild_channels(guild_id), http.get_member(guild_id, state.self_id)
+        )
+        data.update(channels=channels, members=[me], member_count=data.get("approximate_member_count") or 0,
+                    threads=[], voice_states=[], presences=[], stage_instances=[], guild_scheduled_events=[],
+                    unavailable=False)
+        return state._add_guild_from_data(data)
+
+    return await asyncio.gather(*(load(int(partial["id"])) for partial in partials))
+
+
+class SessionHandoff:
+    """Passes a gateway session from a stopping process to the next one through a file.
+
+    The stopping process closes its websocket with code 4000, which (unlike
+    1000/1001) leaves the session resumable, and save()s the session ID,
+    last sequence number and resume URL. install() makes the next process's
+    first connection RESUME that session instead of identifying: its guild
+    cache is filled over REST first, and "ready" is dispatched once Discord
+    confirms the resume. If Discord rejects the resume, discord.py falls back
+    to a normal IDENTIFY and READY. Only unsharded clients are supported.
+    """
+
+    def __init__(self, path=HANDOFF_FILE, max_age: float = HANDOFF_MAX_AGE):
+        self.path = Path(path)
+        self.max_age = max_age
+        self.resumed = False
+        self._client = None
+        self._original = None
+        self._session = None
+        self._guilds = None
+
+    def save(self, ws, user_id: int):
+        """Write the session of a websocket that was closed with a resumable code"""
+        if not ws.session_id or ws.sequence is None:
+            return
+        session = {"session_id": ws.session_id, "sequence": ws.sequence, "resume_url": str(ws.gateway),
+                   "user_id": user_id, "saved": time.time()}
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(session))
+        os.replace(tmp, self.path)
+        logger.info(f"Saved gateway session {ws.session_id} at sequence {ws.sequence} for the next process")
+
+    def take(self):
+        """Read and delete the saved session, so it is only tried once. None if missing or too old"""
+        try:
+            session = json.loads(self.path.read_text())
+            self.path.unlink()
+        except (OSError, ValueError):
+            return None
+        age = time.time() - session.get("saved", 0)
+        if age > self.max_age:
+            logger.info(f"Not resuming gateway session saved {age:.0f}s ago")
+            return None
+        return session
+
+    def install(self, client):
+        if self._original is not None:
+            return self
+        self._client = client
+        self._session = self.take()
+        if self._session is None:
+            return self
+        self._original = DiscordWebSocket.from_client.__func__
+        handoff = self
+
+        async def from_client(cls, connecting, **params):
+            if connecting is handoff._client and params.get("initial") and handoff._session is not None:
+                return await handoff._resume(cls, connecting, params)
+            return await handoff._original(cls, connecting, **params)
+
+        DiscordWebSocket.from_client = classmethod(from_client)
+        parsers = client._connection.parsers
+        original_resumed, original_ready = parsers["RESUMED"], parsers["READY"]
+
+        def parse_resumed(data):
+            original_resumed(data)
+            if self._guilds is not None:
+                self._finish_resume()
+
+        def parse_ready(data):
+            if self._guilds is not None:
+                logger.warning("Gateway session could not be resumed; identified instead")
+                self._guilds = None
+            original_ready(data)
+
+        # Mutated in place: gateway websockets hold a reference to this dict
+        parsers["RESUMED"], parsers["READY"] = parse_resumed, parse_ready
+        return self
+
+    async def _resume(self, cls, client, params):
+        session, self._session = self._session, None
+        if client.user is None or session.get("user_id") != client.user.id:
+            return await self._original(cls, client, **params)
+        started = time.perf_counter()
+        try:
+            self._guilds = await hydrate_guilds(client)
+        except discord.HTTPException as e:
+            # discord.py cannot retry a failed first connection itself, so identify instead
+            logger.warning(f"Could not load guilds for resuming the gateway session ({e}); identifying instead")
+            return await self._original(cls, client, **params)
+        logger.info(f"Loaded {len(self._guilds)} guilds over REST in {(time.perf_counter() - started) * 1000:.0f}ms; "
+                    f"resuming gateway session {session['session_id']} from sequence {session['sequence']}")
+        params.update(initial=False, resume=True, session=session["session_id"], sequence=session["sequence"],
+                      gateway=yarl.URL(session["resume_url"]))
+        return await self._original(cls, client, **params)
+
+    def _finish_resume(self):
+        state, guilds, self._guilds = self._client._connection, self._guilds, None
+        self.resumed = True
+        logger.info("Resumed the previous process's gateway session")
+        for guild in guilds:
+            state.dispatch("guild_available", guild)
+        state.call_handlers("ready")
+        state.dispatch("ready")
@@ -0,0 +1,121 @@
+"""Per-guild aggregate counts kept current from gateway events.
+
+discord.py's Guild.text_channels, voice_channels, roles and emojis build
+(and mostly sort) a fresh list on every access, and Client.guilds copies the
+whole guild cache. GuildAggregates counts a guild's channels, roles, emojis
+and members once, when the guild becomes available, and then applies the
+create/delete events to those numbers, so /serverinfo and /stats read them
+in O(1). verify() recounts a guild from the cache to check the counters.
+"""
+import logging
+
+import discord
+
+logger = logging.getLogger('OdaBot.guildstats')
+
+
+class GuildCounts:
+    __slots__ = ("text_channels", "voice_channels", "roles", "emojis", "members")
+
+    def __init__(self, guild):
+        self.text_channels = sum(1 for c in guild.channels if isinstance(c, discord.TextChannel))
+        self.voice_channels = sum(1 for c in guild.channels if isinstance(c, discord.VoiceChannel))
+        self.roles = len(guild.roles)
+        self.emojis = len(guild.emojis)
+        self.members = guild.member_count or 0
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def _channel_kind(channel):
+    if isinstance(channel, discord.TextChannel):
+        return "text_channels"
+    if isinstance(channel, discord.VoiceChannel):
+        return "voice_channels"
+    return None
+
+
+class GuildAggregates:
+    """Counts per guild plus bot-wide guild and member totals"""
+
+    def __init__(self):
+        self._guilds = {}  # guild ID -> GuildCounts
+        self.total_members = 0
+
+    @property
+    def guild_count(self) -> int:
+        return len(self._guilds)
+
+    def add_guild(self, guild) -> GuildCounts:
+        """Count a guild from the cache (on join or availability), replacing any earlier counts"""
+        self.remove_guild(guild.id)
+        counts = self._guilds[guild.id] = GuildCounts(guild)
+        self.total_members += counts.members
+        return counts
+
+    def remove_guild(self, guild_id: int):
+        counts = self._guilds.pop(guild_id, None)
+        if counts is not None:
+            self.total_members -= counts.members
+
+    def for_guild(self, guild) -> GuildCounts:
+        """The guild's counts, counting it now if no event has added it yet"""
+        counts = self._guilds.get(guild.id)
+        return counts if counts is not None else self.add_guild(guild)
+
+    def _adjust(self, guild_id: int, name: str, delta: int):
+        counts = self._guilds.get(guild_id)
+        if counts is not None:
+            setattr(counts, name, getattr(counts, name) + delta)
+
+    def channel_created(self, channel):
+        kind = _channel_kind(channel)
+        if kind:
+            self._adjust(channel.guild.id, kind, 1)
+
+    def channel_deleted(self, channel):
+        kind = _channel_kind(channel)
+        if kind:
+            self._adjust(channel.guild.id, kind, -1)
+
+    def channel_updated(self, before, after):
+        # Text and announcement channels can be converted into each other; both count as text
+        if _channel_kind(before) != _channel_kind(after):
+            self.channel_deleted(before)
+            self.channel_created(after)
+
+    def role_created(self, role):
+        self._adjust(role.guild.id, "roles", 1)
+
+    def role_deleted(self, role):
+        self._adjust(role.guild.id, "roles", -1)
+
+    def emojis_updated(self, guild, after):
+        counts = self._guilds.get(guild.id)
+        if counts is not None:
+            counts.emojis = len(after)
+
+    def member_joined(self, guild_id: int):
+        if guild_id in self._guilds:
+            self._adjust(guild_id, "members", 1)
+            self.total_members += 1
+
+    def member_removed(self, guild_id: int):
+        if guild_id in self._guilds:
+            self._adjust(guild_id, "members", -1)
+            self.total_members -= 1
+
+    def verify(self, guild, repair: bool = False) -> dict:
+        """Recount a guild from the cache; returns {counter: (kept, recounted)} for each mismatch.
+        With `repair`, drifted counts are replaced by the recount."""
+        counts = self._guilds.get(guild.id)
+        if counts is None:
+            return {}
+        kept, actual = counts.as_dict(), GuildCounts(guild).as_dict()
+        mismatches = {name: (kept[name], actual[name]) for name in kept if kept[name] != actual[name]}
+        if mismatches:
+            logger.warning(f"Counts for guild {guild.id} drifted: {mismatches}")
+            if repair:
+                self.add_guild(guild)
+        return mismatches
@@ -0,0 +1,134 @@
+"""IGN post parsing, nickname sanitizing and change planning used by /sync_ign."""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+NICKNAME_MAX_LENGTH = 32
+
+IGN_PATTERN = re.compile(r"ign:\s*(.+)", re.IGNORECASE)
+CLAN_PATTERN = re.compile(r"\bclan\b", re.IGNORECASE)
+DISCRIMINATOR_PATTERN = re.compile(r"#\s*\d+")
+
+_USER_MENTION_PATTERN = re.compile(r"<@!?\d+>")
+_MASS_MENTION_PATTERN = re.compile(r"@(?:here|everyone)", re.IGNORECASE)
+_MARKUP_TABLE = str.maketrans('', '', '`<>')
+# ASCII control characters (category Cc) plus the markup characters above
+_ASCII_STRIP_TABLE = str.maketrans('', '', '`<>' + ''.join(map(chr, range(32))) + '\x7f')
+# Control/format/private-use/unassigned characters and combining marks
+_DROPPED_CATEGORIES = frozenset({'Cc', 'Cf', 'Cs', 'Co', 'Cn', 'Mn'})
+SANITIZE_CACHE_SIZE = 4096
+
+
+def sanitize_nickname(raw: str, max_length: int = NICKNAME_MAX_LENGTH) -> str:
+    """Sanitize a proposed nickname to be safe for Discord:
+    - Remove user mentions, @here/@everyone, backticks and angle brackets
+    - Normalize to NFKD and drop control/format characters and combining marks
+      (this covers zalgo text, variation selectors and zero-width joiners)
+    - Collapse whitespace and trim to max_length
+    Returns an empty string if nothing usable remains. Results are memoized.
+    """
+    if not raw:
+        return ""
+    return _sanitize_cached(raw, max_length)
+
+
+def _sanitize(raw: str, max_length: int) -> str:
+    s = raw
+    if '@' in s:
+        s = _USER_MENTION_PATTERN.sub("", s)
+    if s.isascii():
+        # NFKD is a no-op on ASCII and the only unwanted category is Cc
+        s = s.translate(_ASCII_STRIP_TABLE)
+        if '@' in s:
+            s = _MASS_MENTION_PATTERN.sub("", s)
+    else:
+        s = s.translate(_MARKUP_TABLE)
+        if '@' in s:
+            s = _MASS_MENTION_PATTERN.sub("", s)
+        s = unicodedata.normalize('NFKD', s)
+        category = unicodedata.category
+        s = ''.join(ch for ch in s if category(ch) not in _DROPPED_CATEGORIES)
+    s = " ".join(s.split())
+    if len(s) > max_length:
+        s = s[:max_length].rstrip()
+    return s
+
+
+_sanitize_cached = lru_cache(maxsize=SANITIZE_CACHE_SIZE)(_sanitize)
+
+
+def extract_ign(content: str) -> Optional[str]:
+    """Pull the IGN out of an "IGN: name" post.
+
+    Anything from a trailing "clan" section on and any '#1234' discriminator are
+    dropped before sanitizing. Returns None if the message is not an IGN post and
+    an empty string if nothing usable remains.
+    """
+    match = IGN_PATTERN.search(content)
+    if not match:
+        return None
+    ign_raw = match.group(1).strip()
+    clan_idx = CLAN_PATTERN.search(ign_raw)
+    if clan_idx:
+        ign_raw = ign_raw[:clan_idx.start()].strip()
+    ign = DISCRIMINATOR_PATTERN.sub("", ign_raw).strip()
+    return sanitize_nickname(ign, max_length=NICKNAME_MAX_LENGTH)
+
+
+class NicknameChange(NamedTuple):
+    member: object
+    before: Optional[str]  # current nickname, None if the member has none
+    after: str
+    message_id: int
+
+
+class IgnPlan:
+    """Everything a /sync_ign run would do, worked out before any nickname is edited.
+
+    - changes: members whose nickname differs from their IGN
+    - unchanged: members already showing their IGN
+    - missing: user IDs that posted but are no longer in the guild
+    - forbidden: members the bot is not allowed to rename (owner, role hierarchy)
+    """
+
+    def __init__(self, scanned: int = 0, newest_id: int = 0, incremental: bool = False):
+        self.scanned = scanned
+        self.newest_id = newest_id
+        self.incremental = incremental
+        self.changes = []
+        self.unchanged = []
+        self.missing = []
+        self.forbidden = []
+
+    @property
+    def edits(self):
+        """(member, ign, message_id) tuples for the changes, in plan order"""
+        return [(c.member, c.after, c.message_id) for c in self.changes]
+
+
+def shows_nickname(member, ign: str) -> bool:
+    """Whether `member` already displays `ign`, so renaming them would be a no-op"""
+    if member.nick is not None:
+        return member.nick == ign
+    return member.display_name == ign
+
+
+def plan_ign_sync(posts, members, can_rename=None, plan: Optional[IgnPlan] = None) -> IgnPlan:
+    """Build the minimal change set for `posts` ({user_id: (ign, message_id)}).
+
+    `members` maps user IDs to resolved members (absent if they left);
+    `can_rename(member)` filters out members an edit would be refused for.
+    """
+    plan = plan if plan is not None else IgnPlan()
+    for user_id, (ign, message_id) in posts.items():
+        member = members.get(user_id)
+        if member is None:
+            plan.missing.append(user_id)
+        elif shows_nickname(member, ign):
+            plan.unchanged.append(member)
+        elif can_rename is not None and not can_rename(member):
+            plan.forbidden.append(member)
+        else:
+            plan.changes.append(NicknameChange(member, member.nick, ign, message_id))
+    return plan
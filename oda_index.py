@@ -0,0 +1,255 @@
+"""Persistent full-text message index backing /find.
+
+Messages are stored in a single SQLite FTS5 table keyed by message ID, so
+edits and deletes are cheap rowid operations and searches never have to walk
+channel history over REST.
+
+The table uses the trigram tokenizer, so an FTS query finds every message
+containing a term as a substring. Searches use it only to narrow down the
+candidates; the /find matcher from oda_search decides what matches, exactly
+as it does for channels scanned over REST.
+"""
+import asyncio
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+
+from oda_search import filter_matches, parse_terms
+
+logger = logging.getLogger('OdaBot.index')
+
+INDEX_FILE = Path("message_index.db")
+
+_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages USING fts5(
+    content,
+    guild_id UNINDEXED,
+    channel_id UNINDEXED,
+    author_id UNINDEXED,
+    author_name UNINDEXED,
+    tokenize = 'trigram'
+);
+CREATE TABLE IF NOT EXISTS backfill (
+    channel_id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    oldest_id INTEGER,
+    newest_id INTEGER,
+    complete INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+SEARCH_PAGE_SIZE = 1000  # candidate rows read per query while holding the lock
+_TRIGRAM = 3  # shortest term the trigram index can look up
+
+
+def _indexable(term: str) -> bool:
+    # Terms whose case folding changes their length (e.g. "ß" -> "ss") may not be found by the index
+    return len(term) >= _TRIGRAM and term.casefold() == term.lower()
+
+
+def build_fts_query(text: str, match_any: bool = False) -> str:
+    """Translate /find search text into an FTS5 MATCH expression that prefilters candidates.
+
+    Every term becomes a quoted substring, so FTS5 operators in user input are
+    inert. With all terms required, terms the index cannot look up are left to
+    the matcher; if any term of a match_any query cannot be looked up, or none
+    remain, returns an empty string (no prefilter).
+    """
+    terms = parse_terms(text)
+    usable = [term for term in terms if _indexable(term)]
+    if match_any and len(usable) < len(terms):
+        return ""
+    return (" OR " if match_any else " AND ").join('"' + term.replace('"', '""') + '"' for term in usable)
+
+
+class MessageIndex:
+    """SQLite FTS5 index of message content per guild and channel.
+
+    All public coroutines run their SQL in a worker thread; the connection is
+    guarded by a lock so calls may overlap safely.
+    """
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self._conn.executescript(_SCHEMA)
+
+    def _migrate(self):
+        row = self._conn.execute("SELECT sql FROM sqlite_master WHERE name = 'messages'").fetchone()
+        if row and "trigram" not in row[0]:
+            # Indexes written with the old word tokenizer cannot answer substring queries; backfill again
+            logger.info("Rebuilding the message index for substring search")
+            with self._conn:
+                self._conn.execute("DROP TABLE messages")
+                self._conn.execute("DROP TABLE IF EXISTS backfill")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(backfill)")]
+        if columns and "newest_id" not in columns:
+            # Without the newest indexed message there is no catching up; walk those channels again
+            with self._conn:
+                self._conn.execute("ALTER TABLE backfill ADD COLUMN newest_id INTEGER")
+                self._conn.execute("DELETE FROM backfill")
+
+    def _execute(self, fn, *args):
+        with self._lock:
+            with self._conn:
+                return fn(self._conn, *args)
+
+    async def _run(self, fn, *args):
+        return await asyncio.to_thread(self._execute, fn, *args)
+
+    # -- writes -------------------------------------------------------------
+
+    @staticmethod
+    def _upsert(conn, rows):
+        conn.executemany("DELETE FROM messages WHERE rowid = ?", [(r[0],) for r in rows])
+        conn.executemany(
+            "INSERT INTO messages(rowid, content, guild_id, channel_id, author_id, author_name) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    async def add_many(self, rows, advance_newest: bool = False):
+        """Insert or replace rows of (message_id, content, guild_id, channel_id, author_id, author_name).
+
+        With `advance_newest` the rows' channels record them as their newest
+        indexed message; only pass it for messages that follow on from it.
+        """
+        rows = [r for r in rows if r[1]]
+        if not rows:
+            return
+
+        def _add(conn):
+            self._upsert(conn, rows)
+            if advance_newest:
+                conn.executemany("UPDATE backfill SET newest_id = ? WHERE channel_id = ? AND newest_id < ?",
+                                 [(r[0], r[3], r[0]) for r in rows])
+        await self._run(_add)
+
+    async def update_content(self, message_id: int, content: str):
+        def _update(conn):
+            conn.execute("UPDATE messages SET content = ? WHERE rowid = ?", (content, message_id))
+        await self._run(_update)
+
+    async def delete(self, message_ids):
+        ids = [(int(i),) for i in message_ids]
+        if not ids:
+            return
+
+        def _delete(conn):
+            conn.executemany("DELETE FROM messages WHERE rowid = ?", ids)
+        await self._run(_delete)
+
+    async def drop_channel(self, channel_id: int):
+        def _drop(conn):
+            conn.execute("DELETE FROM messages WHERE channel_id = ?", (channel_id,))
+            conn.execute("DELETE FROM backfill WHERE channel_id = ?", (channel_id,))
+        await self._run(_drop)
+
+    # -- backfill bookkeeping -----------------------------------------------
+
+    async def backfill_state(self, channel_id: int):
+        """Return (oldest_id, newest_id, complete) for a channel, or (None, None, False) if never backfilled.
+
+        Every message between oldest_id and newest_id is indexed; complete means
+        nothing older than oldest_id is left.
+        """
+        def _get(conn):
+            row = conn.execute(
+                "SELECT oldest_id, newest_id, complete FROM backfill WHERE channel_id = ?", (channel_id,)
+            ).fetchone()
+            return (row[0], row[1], bool(row[2])) if row else (None, None, False)
+        return await self._run(_get)
+
+    async def backfilled_channels(self):
+        """IDs of every channel with backfill progress"""
+        def _get(conn):
+            return [row[0] for row in conn.execute("SELECT channel_id FROM backfill")]
+        return await self._run(_get)
+
+    async def indexed_channels(self, channel_ids):
+        """Subset of channel_ids whose history has been fully backfilled"""
+        ids = list(channel_ids)
+        if not ids:
+            return set()
+
+        def _get(conn):
+            rows = conn.execute(
+                f"SELECT channel_id FROM backfill WHERE complete = 1 AND channel_id IN ({', '.join('?' * len(ids))})",
+                ids,
+            ).fetchall()
+            return {row[0] for row in rows}
+        return await self._run(_get)
+
+    async def set_backfill_state(self, channel_id: int, guild_id: int, oldest_id, newest_id, complete: bool):
+        def _set(conn):
+            conn.execute(
+                "INSERT INTO backfill(channel_id, guild_id, oldest_id, newest_id, complete) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(channel_id) DO UPDATE SET oldest_id = excluded.oldest_id, "
+                "newest_id = max(coalesce(newest_id, 0), coalesce(excluded.newest_id, 0)), "
+                "complete = excluded.complete",
+                (channel_id, guild_id, oldest_id, newest_id, int(complete)),
+            )
+        await self._run(_set)
+
+    # -- reads --------------------------------------------------------------
+
+    async def search(self, text: str, guild_id: int, matches, channel_ids=None, author_id=None,
+                     limit: int = 10, mode: str = "all"):
+        """Search indexed messages, newest first.
+
+        `matches` is the compiled /find query (oda_search.compile_query) and
+        decides every hit. For "all" and "any" queries an FTS5 query over the
+        terms in `text` narrows down the rows it has to look at. Rows are read
+        a page at a time under the lock and matched outside it, in a worker
+        thread; QueryTimeout from the matcher propagates.
+
+        Returns (total_matches, rows) where rows are
+        (message_id, channel_id, author_name, content) tuples, at most `limit` long.
+        """
+        query = build_fts_query(text, match_any=mode == "any") if mode != "regex" else ""
+        where, params = ["guild_id = ?"], [guild_id]
+        if query:
+            where.append("messages MATCH ?")
+            params.append(query)
+        if channel_ids:
+            ids = list(channel_ids)
+            where.append(f"channel_id IN ({', '.join('?' * len(ids))})")
+            params.extend(ids)
+        if author_id is not None:
+            where.append("author_id = ?")
+            params.append(author_id)
+        clause = " AND ".join(where)
+
+        def _page(conn, before):
+            return conn.execute(
+                f"SELECT rowid, content, channel_id, author_name FROM messages WHERE {clause} AND rowid < ? "
+                "ORDER BY rowid DESC LIMIT ?",
+                params + [before, SEARCH_PAGE_SIZE],
+            ).fetchall()
+
+        def _search():
+            total, rows = 0, []
+            before = (1 << 63) - 1
+            while True:
+                page = self._execute(_page, before)
+                found = filter_matches(matches, [row for row in page if row[1]])
+                total += len(found)
+                rows.extend((message_id, channel_id, author_name, content)
+                            for message_id, content, channel_id, author_name in found[:limit - len(rows)])
+                if len(page) < SEARCH_PAGE_SIZE:
+                    return total, rows
+                before = page[-1][0]
+        try:
+            return await asyncio.to_thread(_search)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Index search failed for {text!r}: {e}")
+            return 0, []
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
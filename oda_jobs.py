@@ -0,0 +1,323 @@
+"""Background jobs for long-running admin operations.
+
+Commands submit a job and answer with its ID straight away; a small pool of
+asyncio workers runs the jobs. Guilds take turns: workers pick guilds in
+round-robin order and run at most one job per guild at a time, so one busy
+server cannot starve the others.
+
+Job records (parameters, progress, result) live in the bot state under
+"jobs", so the state store persists them and they survive restarts. Jobs
+that were queued or running when the process stopped are queued again when
+the scheduler starts, which means handlers must be safe to run again from
+the beginning. Finished jobs are kept for RETENTION seconds so their status
+and result can still be looked up.
+"""
+import asyncio
+import logging
+import secrets
+import time
+from collections import deque
+from contextlib import nullcontext
+
+logger = logging.getLogger('OdaBot.jobs')
+
+STATUSES = ("queued", "running", "done", "failed", "cancelled")
+ACTIVE = ("queued", "running")
+WORKERS = 2
+GUILD_QUEUE_LIMIT = 5  # active jobs per guild
+RETENTION = 24 * 3600  # seconds finished jobs are kept
+PROGRESS_SAVE_INTERVAL = 5.0  # minimum seconds between persisted progress updates
+MAX_ATTEMPTS = 3  # runs of a job interrupted by restarts before it is failed
+
+
+class JobError(Exception):
+    """Raised by a handler to fail its job with a message meant for the user"""
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    """A persisted job record plus the handle its handler reports progress through"""
+
+    def __init__(self, record: dict, scheduler):
+        self.record = record
+        self._scheduler = scheduler
+        self._saved_at = 0.0
+
+    @property
+    def id(self):
+        return self.record["id"]
+
+    @property
+    def kind(self):
+        return self.record["kind"]
+
+    @property
+    def guild_id(self):
+        return self.record["guild_id"]
+
+    @property
+    def user_id(self):
+        return self.record["user_id"]
+
+    @property
+    def params(self):
+        return self.record["params"]
+
+    @property
+    def status(self):
+        return self.record["status"]
+
+    @property
+    def progress(self):
+        return self.record["progress"]
+
+    @property
+    def result(self):
+        return self.record.get("result")
+
+    @property
+    def error(self):
+        return self.record.get("error")
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE
+
+    async def report(self, **progress):
+        """Update the job's progress; persisted at most every PROGRESS_SAVE_INTERVAL seconds"""
+        self.record["progress"].update(progress)
+        now = time.monotonic()
+        if now - self._saved_at >= PROGRESS_SAVE_INTERVAL:
+            self._saved_at = now
+            self._scheduler.mark_dirty()
+        await self._scheduler._notify(self, "progress")
+
+
+class JobScheduler:
+    """Runs registered job handlers on a worker pool with per-guild fairness.
+
+    `state` is the bot state dict and `mark_dirty` the store's mark_dirty.
+    Handlers are `async def handler(job) -> dict`; the returned dict must be
+    JSON-serializable and becomes the job's result. Listeners registered with
+    add_listener are awaited with (job, event) for "progress" and "finished".
+    `profile`, if given, is called with a job's kind and returns the context
+    manager its handler runs under (e.g. oda_diag.Diagnostics.profile).
+    """
+
+    def __init__(self, state: dict, mark_dirty, workers: int = WORKERS,
+                 guild_queue_limit: int = GUILD_QUEUE_LIMIT, retention: float = RETENTION, profile=None):
+        self.records = state.setdefault("jobs", {})
+        self.mark_dirty = mark_dirty
+        self.profile = profile
+        self.workers = workers
+        self.guild_queue_limit = guild_queue_limit
+        self.retention = retention
+        self._jobs = {}  # job ID -> Job, for every record
+        self._handlers = {}
+        self._listeners = []
+        self._queues = {}  # guild ID -> deque of queued job IDs
+        self._ready = deque()  # guilds with queued jobs and none running, in turn order
+        self._busy = set()  # guilds with a running job
+        self._running = {}  # job ID -> handler task
+        self._cancelled = set()
+        self._wakeup = asyncio.Event()
+        self._worker_tasks = []
+        self._draining = False
+
+    def register(self, kind: str, handler):
+        self._handlers[kind] = handler
+
+    def unregister(self, kind: str):
+        self._handlers.pop(kind, None)
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def get(self, job_id: str):
+        if job_id not in self.records:
+            return None
+        job = self._jobs.get(job_id)
+        if job is None:
+            job = self._jobs[job_id] = Job(self.records[job_id], self)
+        return job
+
+    def for_guild(self, guild_id: int, limit: int = 10):
+        """The guild's jobs, newest first"""
+        records = sorted((r for r in self.records.values() if r["guild_id"] == guild_id),
+                         key=lambda r: r["created"], reverse=True)
+        return [self.get(r["id"]) for r in records[:limit]]
+
+    def position(self, job) -> int:
+        """Jobs ahead of a queued job in its guild's queue"""
+        queue = self._queues.get(job.guild_id, ())
+        return list(queue).index(job.id) if job.id in queue else 0
+
+    def submit(self, kind: str, guild_id: int, user_id: int, params: dict, notify: bool = False) -> Job:
+        """Queue a job; raises JobQueueFull when the guild already has guild_queue_limit active jobs"""
+        active = sum(1 for r in self.records.values() if r["guild_id"] == guild_id and r["status"] in ACTIVE)
+        if active >= self.guild_queue_limit:
+            raise JobQueueFull(f"This server already has {active} jobs queued or running")
+        self._prune()
+        job_id = secrets.token_hex(3)
+        while job_id in self.records:
+            job_id = secrets.token_hex(3)
+        self.records[job_id] = {
+            "id": job_id, "kind": kind, "guild_id": guild_id, "user_id": user_id, "params": params,
+            "notify": notify, "status": "queued", "progress": {}, "attempts": 0,
+            "created": time.time(), "started": None, "finished": None,
+        }
+        self.mark_dirty()
+        job = self.get(job_id)
+        self._enqueue(job)
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job. Returns False if it already finished"""
+        job = self.get(job_id)
+        if job is None or not job.active:
+            return False
+        if job.status == "queued":
+            queue = self._queues.get(job.guild_id)
+            if queue and job.id in queue:
+                queue.remove(job.id)
+                if not queue:
+                    del self._queues[job.guild_id]
+                    if job.guild_id in self._ready:
+                        self._ready.remove(job.guild_id)
+            self._finish(job, "cancelled")
+            return True
+        self._cancelled.add(job.id)
+        self._running[job.id].cancel()
+        return True
+
+    def start(self):
+        """Queue jobs left over from the previous run and start the workers"""
+        if self._worker_tasks:
+            return
+        self._prune()
+        queued = {job_id for queue in self._queues.values() for job_id in queue}
+        for record in sorted(self.records.values(), key=lambda r: r["created"]):
+            if record["status"] not in ACTIVE or record["id"] in queued:
+                continue
+            if record["status"] == "running":
+                if record["attempts"] >= MAX_ATTEMPTS:
+                    record.update(status="failed", finished=time.time(),
+                                  error=f"Interrupted by a restart {record['attempts']} times")
+                    continue
+                record["status"] = "queued"
+                logger.info(f"Requeued job {record['id']} ({record['kind']}) interrupted by a restart")
+            self._enqueue(self.get(record["id"]))
+        self.mark_dirty()
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def drain(self, timeout: float) -> int:
+        """Stop starting jobs and wait up to `timeout` seconds for the running ones.
+        Returns how many are still running; close() leaves those to be requeued on the next start"""
+        self._draining = True
+        running = list(self._running.values())
+        if running:
+            logger.info(f"Waiting up to {timeout:.0f}s for {len(running)} running job(s)")
+            await asyncio.wait(running, timeout=timeout)
+        return len(self._running)
+
+    async def close(self):
+        """Stop the workers. Running jobs stay "running" and are queued again on the next start"""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    def _enqueue(self, job):
+        guild_id = job.guild_id
+        self._queues.setdefault(guild_id, deque()).append(job.id)
+        if guild_id not in self._busy and guild_id not in self._ready:
+            self._ready.append(guild_id)
+        self._wakeup.set()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, r in self.records.items()
+                   if r["status"] not in ACTIVE and (r["finished"] or r["created"]) < cutoff]
+        for job_id in expired:
+            del self.records[job_id]
+            self._jobs.pop(job_id, None)
+        if expired:
+            self.mark_dirty()
+
+    async def _worker(self):
+        while True:
+            while self._draining or not self._ready:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            guild_id = self._ready.popleft()
+            queue = self._queues.get(guild_id)
+            if not queue:
+                continue
+            job = self.get(queue.popleft())
+            self._busy.add(guild_id)
+            try:
+                await self._run(job)
+            finally:
+                self._busy.discard(guild_id)
+                if self._queues.get(guild_id):
+                    self._ready.append(guild_id)  # back of the line
+                    self._wakeup.set()
+                else:
+                    self._queues.pop(guild_id, None)
+
+    async def _run(self, job):
+        handler = self._handlers.get(job.kind)
+        if handler is None:
+            job.record["error"] = f"No handler for {job.kind} jobs (extension not loaded)"
+            await self._complete(job, "failed")
+            return
+        job.record.update(status="running", started=time.time(), attempts=job.record["attempts"] + 1)
+        self.mark_dirty()
+        task = self._running[job.id] = asyncio.create_task(self._call(handler, job))
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if job.id not in self._cancelled:
+                raise  # shutting down: the job stays "running" and is requeued on the next start
+            await self._complete(job, "cancelled")
+        except JobError as e:
+            job.record["error"] = str(e)
+            await self._complete(job, "failed")
+        except Exception as e:
+            logger.exception(f"Job {job.id} ({job.kind}) failed")
+            job.record["error"] = f"{type(e).__name__}: {e}"[:200]
+            await self._complete(job, "failed")
+        else:
+            job.record["result"] = result
+            await self._complete(job, "done")
+        finally:
+            self._running.pop(job.id, None)
+            self._cancelled.discard(job.id)
+
+    async def _call(self, handler, job):
+        with self.profile(job.kind) if self.profile else nullcontext():
+            return await handler(job)
+
+    def _finish(self, job, status):
+        job.record.update(status=status, finished=time.time())
+        self.mark_dirty()
+        asyncio.create_task(self._notify(job, "finished"))
+
+    async def _complete(self, job, status):
+        job.record.update(status=status, finished=time.time())
+        self.mark_dirty()
+        await self._notify(job, "finished")
+
+    async def _notify(self, job, event):
+        for listener in self._listeners:
+            try:
+                await listener(job, event)
+            except Exception as e:
+                logger.warning(f"Job listener failed for {job.id} ({event}): {e}")
@@ -0,0 +1,313 @@
+"""Prometheus-style instrumentation for the bot.
+
+Collects per-command call counts, time to first response and end-to-end
+latency histograms, REST calls and 429s per route, gateway heartbeat latency
+and event-loop lag, and serves them in the Prometheus text format from a small
+local HTTP endpoint.
+"""
+import asyncio
+import functools
+import logging
+import math
+import re
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+import discord
+from discord import app_commands
+
+logger = logging.getLogger('OdaBot.metrics')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+LOOP_LAG_INTERVAL = 1.0
+
+_SNOWFLAKE = re.compile(r"/\d{15,}")
+_API_PREFIX = re.compile(r"^https?://[^/]+/api/v\d+")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def expose(self):
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        self._values[labels] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [bucket counts (+Inf last), sum, count]
+
+    def observe(self, value, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def label_sets(self):
+        return list(self._series)
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def quantile(self, q, *labels):
+        """Estimate a quantile by linear interpolation inside buckets (like histogram_quantile)"""
+        series = self._series.get(labels)
+        if not series or not series[2]:
+            return None
+        counts, _, total = series
+        rank = q * total
+        cumulative = 0
+        for i, bucket_count in enumerate(counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+    def expose(self):
+        for labels, (counts, total_sum, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = ("le", _format_value(bound))
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total_sum)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def expose(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+def command_label(interaction) -> str:
+    command = interaction.command
+    return command.qualified_name if command else "unknown"
+
+
+class _RateLimitLogHandler(logging.Handler):
+    """Counts 429 responses from discord.py's rate-limit warnings"""
+
+    def __init__(self, counter):
+        super().__init__(level=logging.WARNING)
+        self.counter = counter
+
+    def emit(self, record):
+        message = record.getMessage()
+        if "rate limit" not in message.lower():
+            return
+        args = record.args if isinstance(record.args, tuple) else ()
+        if len(args) >= 2 and isinstance(args[0], str) and isinstance(args[1], str):
+            route = _SNOWFLAKE.sub("/{id}", _API_PREFIX.sub("", args[1].split("?", 1)[0]))
+            self.counter.inc(args[0], route)
+        else:
+            self.counter.inc("*", "global")
+
+
+class BotMetrics:
+    """All metrics the bot records, plus the hooks that feed them"""
+
+    def __init__(self):
+        self.registry = Registry()
+        register = self.registry.register
+        self.command_calls = register(Counter(
+            "oda_command_calls_total", "App command invocations", ("command", "outcome")))
+        self.command_first_response = register(Histogram(
+            "oda_command_first_response_seconds", "Time from dispatch to the first defer/send", ("command",)))
+        self.command_duration = register(Histogram(
+            "oda_command_duration_seconds", "End-to-end app command handler latency", ("command",)))
+        self.rest_requests = register(Counter(
+            "oda_rest_requests_total", "REST requests issued", ("method", "route")))
+        self.rest_rate_limited = register(Counter(
+            "oda_rest_rate_limited_total", "REST responses that hit a 429", ("method", "route")))
+        self.gateway_events_dropped = register(Counter(
+            "oda_gateway_events_dropped_total", "Gateway events dropped before parsing", ("event",)))
+        self.gateway_latency = register(Gauge(
+            "oda_gateway_latency_seconds", "Gateway heartbeat latency", ("shard",)))
+        self.loop_lag = register(Histogram(
+            "oda_event_loop_lag_seconds", "Event loop scheduling lag", (), LOOP_LAG_BUCKETS))
+        self._sampler = None
+        self._runner = None
+
+    # -- hooks --------------------------------------------------------------
+
+    def instrument(self, bot):
+        """Wrap the bot's HTTP client, interaction responses and discord.py's rate-limit logging"""
+        original_request = bot.http.request
+
+        async def request(route, **kwargs):
+            self.rest_requests.inc(route.method, route.path)
+            return await original_request(route, **kwargs)
+
+        bot.http.request = request
+        logging.getLogger('discord.http').addHandler(_RateLimitLogHandler(self.rest_rate_limited))
+        if getattr(discord.InteractionResponse, "_oda_instrumented", False):
+            return
+        discord.InteractionResponse._oda_instrumented = True
+        for name in ("defer", "send_message", "send_modal"):
+            original = getattr(discord.InteractionResponse, name)
+            setattr(discord.InteractionResponse, name, self._wrap_first_response(original))
+
+    def _wrap_first_response(self, original):
+        @functools.wraps(original)
+        async def wrapper(response, *args, **kwargs):
+            result = await original(response, *args, **kwargs)
+            interaction = response._parent
+            started = interaction.extras.pop("oda_response_pending", None)
+            if started is not None:
+                self.command_first_response.observe(time.perf_counter() - started, command_label(interaction))
+            return result
+        return wrapper
+
+    def start(self, bot):
+        if self._sampler is None:
+            self._sampler = asyncio.get_running_loop().create_task(self._sample(bot))
+
+    async def _sample(self, bot):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            self.loop_lag.observe(max(0.0, loop.time() - started - LOOP_LAG_INTERVAL))
+            latencies = getattr(bot, "latencies", None) or [(bot.shard_id or 0, bot.latency)]
+            for shard_id, latency in latencies:
+                if math.isfinite(latency):
+                    self.gateway_latency.set(latency, str(shard_id))
+
+    # -- HTTP endpoint ------------------------------------------------------
+
+    async def serve(self, host: str, port: int):
+        """Expose /metrics over HTTP"""
+        from aiohttp import web  # the server side of aiohttp is only imported when metrics are served
+
+        async def handle(request):
+            return web.Response(text=self.registry.expose(), content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logger.info(f"Metrics available at http://{host}:{port}/metrics")
+
+    async def close(self):
+        if self._sampler is not None:
+            self._sampler.cancel()
+            self._sampler = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class InstrumentedCommandTree(app_commands.CommandTree):
+    """Command tree that times every app command through the client's BotMetrics.
+
+    If the client has a `diagnostics` attribute (see oda_diag.Diagnostics), commands
+    selected for profiling are also run under its sampling profiler. Commands
+    still running are tracked so a shutdown can drain() them.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._in_flight = set()
+
+    async def drain(self, timeout: float) -> int:
+        """Wait up to `timeout` seconds for running commands; returns how many are still running"""
+        if self._in_flight:
+            await asyncio.wait(set(self._in_flight), timeout=timeout)
+        return len(self._in_flight)
+
+    async def _call(self, interaction):
+        task = asyncio.current_task()
+        self._in_flight.add(task)
+        try:
+            await self._call_instrumented(interaction)
+        finally:
+            self._in_flight.discard(task)
+
+    async def _call_instrumented(self, interaction):
+        metrics = getattr(self.client, "metrics", None)
+        diagnostics = getattr(self.client, "diagnostics", None)
+        if metrics is None and diagnostics is None:
+            return await super()._call(interaction)
+        label = command_label(interaction)
+        started = time.perf_counter()
+        interaction.extras["oda_response_pending"] = started
+        outcome = "ok"
+        try:
+            with diagnostics.profile(label) if diagnostics else nullcontext():
+                await super()._call(interaction)
+            # CommandTree._call handles a command's errors itself and only flags the interaction
+            if interaction.command_failed:
+                outcome = "error"
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            if metrics is not None:
+                metrics.command_duration.observe(time.perf_counter() - started, label)
+                metrics.command_calls.inc(label, outcome)
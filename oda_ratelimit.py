@@ -0,0 +1,150 @@
+"""Bounded token-bucket rate limiting for app commands and message triggers.
+
+RateLimiter keeps one float per key (the bucket's "theoretical arrival time",
+as in GCRA), so a check is a dict lookup and a comparison. Keys live in an
+OrderedDict in last-use order: once a key's bucket has refilled it is
+indistinguishable from a new key and is dropped from the front, and
+`max_keys` evicts the least recently used key as a hard bound.
+
+Keys are derived from an interaction or message by scope: "user", "channel",
+"guild" or "global".
+"""
+import functools
+import time
+from collections import OrderedDict
+
+from discord import app_commands
+
+SCOPES = ("user", "channel", "guild", "global")
+MAX_KEYS = 10000
+
+_CHARGES = "oda_rate_limits"  # interaction.extras key: (limiter, key) pairs charged by rate_limit checks
+
+
+class RateLimiter:
+    """Allow `rate` hits per `per` seconds per key, with bursts of up to `burst` (default `rate`)"""
+
+    def __init__(self, rate: int, per: float, burst: int = None, max_keys: int = MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> theoretical arrival time
+        self.configure(rate, per, burst)
+
+    def configure(self, rate: int, per: float, burst: int = None):
+        """Change the limit in place; existing keys keep their current debt"""
+        self.rate = rate
+        self.per = per
+        self.burst = burst or rate
+        self._interval = per / rate
+        self._tolerance = self._interval * (self.burst - 1)
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def _expire(self, now):
+        buckets = self._buckets
+        while buckets:
+            key, tat = next(iter(buckets.items()))
+            if tat > now:
+                break
+            del buckets[key]
+
+    def retry_after(self, key, now: float = None) -> float:
+        """Seconds until `key` may hit again (0.0 if it may now), without using up a token"""
+        now = time.monotonic() if now is None else now
+        tat = self._buckets.get(key)
+        if tat is None:
+            return 0.0
+        return max(0.0, tat - now - self._tolerance)
+
+    def hit(self, key, now: float = None) -> float:
+        """Use a token for `key`. Returns 0.0 if allowed, otherwise the seconds until it would be"""
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        buckets = self._buckets
+        tat = max(buckets.get(key, now), now)
+        if tat - now > self._tolerance:
+            return tat - now - self._tolerance
+        buckets[key] = tat + self._interval
+        buckets.move_to_end(key)
+        if len(buckets) > self.max_keys:
+            buckets.popitem(last=False)
+        return 0.0
+
+    def refund(self, key):
+        """Give back the token a hit() took, for a request that was rejected after all"""
+        tat = self._buckets.get(key)
+        if tat is not None:
+            self._buckets[key] = tat - self._interval
+
+    def reset(self, key=None):
+        """Forget one key, or every key"""
+        if key is None:
+            self._buckets.clear()
+        else:
+            self._buckets.pop(key, None)
+
+
+def _check_scope(scope):
+    if scope not in SCOPES:
+        raise ValueError(f"Unknown rate limit scope {scope!r}, expected one of {', '.join(SCOPES)}")
+
+
+def _scope_key(scope, user_id, channel_id, guild_id):
+    if scope == "user":
+        return user_id
+    if scope == "channel":
+        return channel_id
+    if scope == "guild":
+        return guild_id or channel_id  # DMs are limited per channel
+    return None
+
+
+def interaction_key(scope: str, interaction):
+    return _scope_key(scope, interaction.user.id, interaction.channel_id, interaction.guild_id)
+
+
+def message_key(scope: str, message):
+    return _scope_key(scope, message.author.id, message.channel.id, message.guild.id if message.guild else None)
+
+
+def rate_limit(limiter: RateLimiter, scope: str = "user"):
+    """App command check that raises app_commands.CommandOnCooldown once `limiter` is exhausted.
+
+    Checks run bottom-up, so place it above permission checks to only charge
+    users who may run the command. A command that then rejects the request
+    itself (invalid input, queue full) should call refund_rate_limits().
+    """
+    _check_scope(scope)
+    cooldown = app_commands.Cooldown(limiter.rate, limiter.per)
+
+    def predicate(interaction):
+        key = interaction_key(scope, interaction)
+        retry_after = limiter.hit(key)
+        if retry_after:
+            raise app_commands.CommandOnCooldown(cooldown, retry_after)
+        interaction.extras.setdefault(_CHARGES, []).append((limiter, key))
+        return True
+    return app_commands.check(predicate)
+
+
+def refund_rate_limits(interaction):
+    """Give back every token rate_limit checks took for an interaction the command rejected"""
+    for limiter, key in interaction.extras.pop(_CHARGES, ()):
+        limiter.refund(key)
+
+
+def limit_messages(limiter: RateLimiter, scope: str = "user"):
+    """Decorator for message handlers: the call is skipped (returns None) while `limiter` is exhausted.
+
+    The handler must take the message as its last positional argument.
+    """
+    _check_scope(scope)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if limiter.hit(message_key(scope, args[-1])):
+                return None
+            return await func(*args, **kwargs)
+        return wrapper
+    return decorator
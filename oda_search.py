@@ -0,0 +1,209 @@
+"""Message search over channel history for /find.
+
+Queries are compiled once into a matcher (case-insensitive substring terms
+combined with AND/OR, or a regex). Terms are case-folded up front, so
+each message is case-folded exactly once and then tested with plain substring
+checks, which measured faster than IGNORECASE regexes. History is streamed page by page and
+only lightweight (message_id, author_name, preview) tuples are kept, so
+memory stays flat no matter how many messages are scanned.
+
+Regexes run on the `regex` module with a timeout on every search and a time
+budget for the whole query that grows with the number of messages searched,
+so a pattern that backtracks catastrophically fails the query instead of
+hanging it while a cheap pattern can scan any amount of history. Matching
+happens in a worker thread, one page of messages at a time, and never on the
+event loop.
+"""
+import asyncio
+import re
+import threading
+import time
+
+import regex
+
+try:
+    import ahocorasick
+except ImportError:  # optional: pyahocorasick speeds up queries with many terms
+    ahocorasick = None
+
+MATCH_MODES = ("all", "any", "regex")
+AHO_CORASICK_MIN_TERMS = 8  # use an automaton instead of per-term searches from this many terms
+MAX_TERMS = 64
+MAX_REGEX_LENGTH = 200
+REGEX_TIMEOUT = 0.05  # seconds per message
+REGEX_BUDGET = 2.0  # seconds of regex matching per query, across every channel it searches...
+REGEX_BUDGET_PER_MESSAGE = 0.0001  # ...plus this much for every message searched
+
+_QUERY_TOKEN = re.compile(r'"([^"]+)"|(\S+)')
+
+RESULT_LIMIT = 10  # hits shown in the /find embed
+PAGE_SIZE = 100  # messages per history page; progress is reported once per page
+PREVIEW_LENGTH = 50
+
+
+def parse_terms(text: str):
+    """Split a query into terms; "quoted phrases" stay whole and trailing '*' is dropped"""
+    terms = []
+    for phrase, word in _QUERY_TOKEN.findall(text or ""):
+        term = phrase.strip() if phrase else word.rstrip('*')
+        if term:
+            terms.append(term)
+    return terms
+
+
+class QueryTimeout(Exception):
+    """A regex query used up its time budget"""
+
+
+def _compile_regex(text):
+    if len(text) > MAX_REGEX_LENGTH:
+        raise ValueError(f"Regex is longer than {MAX_REGEX_LENGTH} characters.")
+    try:
+        pattern = regex.compile(text, regex.IGNORECASE)
+    except regex.error as e:
+        raise ValueError(f"Invalid regex: {e}")
+    spent = 0.0
+    searched = 0
+    lock = threading.Lock()
+
+    def matches(content):
+        nonlocal spent, searched
+        started = time.perf_counter()
+        try:
+            # concurrent=True releases the GIL, so a slow pattern does not stall the event loop either
+            return pattern.search(content, timeout=REGEX_TIMEOUT, concurrent=True) is not None
+        except TimeoutError:
+            return False
+        finally:
+            # Pages are matched in several worker threads at once
+            with lock:
+                spent += time.perf_counter() - started
+                searched += 1
+                exhausted = spent > REGEX_BUDGET + searched * REGEX_BUDGET_PER_MESSAGE
+            if exhausted:
+                raise QueryTimeout("The regex is too slow for this many messages; try a simpler pattern.")
+    return matches
+
+
+def _compile_automaton(terms, require_all):
+    automaton = ahocorasick.Automaton()
+    for i, term in enumerate(terms):
+        automaton.add_word(term.casefold(), i)
+    automaton.make_automaton()
+    if not require_all:
+        def matches(content):
+            for _ in automaton.iter(content.casefold()):
+                return True
+            return False
+        return matches
+
+    wanted = len(terms)
+
+    def matches_all(content):
+        seen = set()
+        for _, i in automaton.iter(content.casefold()):
+            seen.add(i)
+            if len(seen) == wanted:
+                return True
+        return False
+    return matches_all
+
+
+def compile_query(text: str, mode: str = "all"):
+    """Compile a /find query into a `matches(content) -> bool` callable.
+
+    Modes:
+    - "all": every term must appear (case-insensitive substring match)
+    - "any": at least one term must appear
+    - "regex": `text` is a case-insensitive regular expression; messages it
+      cannot search within REGEX_TIMEOUT do not match, and the matcher raises
+      QueryTimeout once the query has spent more than REGEX_BUDGET seconds
+      plus REGEX_BUDGET_PER_MESSAGE for every message searched
+    Raises ValueError for queries that cannot be used.
+    """
+    if mode not in MATCH_MODES:
+        raise ValueError(f"Unknown match mode {mode!r}.")
+    if mode == "regex":
+        return _compile_regex(text)
+    terms = list(dict.fromkeys(parse_terms(text)))
+    if not terms:
+        raise ValueError("The search text is empty.")
+    if len(terms) > MAX_TERMS:
+        raise ValueError(f"At most {MAX_TERMS} search terms are supported.")
+    if len(terms) >= AHO_CORASICK_MIN_TERMS and ahocorasick is not None:
+        return _compile_automaton(terms, require_all=mode == "all")
+    folded = [term.casefold() for term in terms]
+    if len(folded) == 1:
+        needle = folded[0]
+        return lambda content: needle in content.casefold()
+    if mode == "any":
+        def matches_any(content):
+            content = content.casefold()
+            for term in folded:
+                if term in content:
+                    return True
+            return False
+        return matches_any
+
+    def matches_all(content):
+        content = content.casefold()
+        for term in folded:
+            if term not in content:
+                return False
+        return True
+    return matches_all
+
+
+def preview(content: str) -> str:
+    return content[:PREVIEW_LENGTH] + "..." if len(content) > PREVIEW_LENGTH else content
+
+
+def filter_matches(matches, items):
+    """The (key, content) items whose content matches, in order. Meant to run in a worker thread"""
+    return [item for item in items if matches(item[1])]
+
+
+async def scan_history(channel, matches, limit, stop_after=None, author_id=None, progress=None):
+    """Scan up to `limit` messages of a channel's history, newest first.
+
+    `matches` is called with each message's content, a page of messages at a
+    time in a worker thread. Scanning stops early once `stop_after` matches
+    were found (None counts every match). `progress`, if given, is awaited with
+    (scanned, total) after every page.
+
+    Returns (hits, total, scanned, stopped_early) where hits holds at most
+    RESULT_LIMIT (message_id, author_name, preview) tuples.
+    """
+    hits = []
+    total = 0
+    scanned = 0
+    page = []
+
+    async def flush():
+        """Match the buffered page; returns True once stop_after is reached"""
+        nonlocal total, scanned
+        candidates = [(message, message.content) for message in page
+                      if author_id is None or message.author.id == author_id]
+        found = await asyncio.to_thread(filter_matches, matches, candidates) if candidates else []
+        scanned += len(page)
+        for message, content in found:
+            total += 1
+            if len(hits) < RESULT_LIMIT:
+                hits.append((message.id, message.author.name, preview(content)))
+            if stop_after is not None and total >= stop_after:
+                # Only the messages up to this match count as scanned
+                scanned -= sum(1 for m in page if m.id < message.id)
+                return True
+        page.clear()
+        return False
+
+    async for message in channel.history(limit=limit):
+        page.append(message)
+        if len(page) == PAGE_SIZE:
+            if await flush():
+                return hits, total, scanned, True
+            if progress is not None:
+                await progress(scanned, total)
+    if page and await flush():
+        return hits, total, scanned, True
+    return hits, total, scanned, False
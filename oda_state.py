@@ -0,0 +1,475 @@
+"""Bot state persistence.
+
+Commands only mark the state dirty; a background task writes it out on a timer
+or once enough changes have piled up. Writes are serialized on the event loop
+(so the snapshot is consistent) and performed in a worker thread.
+
+Two backends share that machinery:
+- JSON (default): the whole state is written to state.json via a temp file
+  plus rename, so a crash never leaves a torn file behind.
+- SQLite (WAL): counters are applied as atomic `value = value + delta`
+  updates, with per-guild and per-command stats in their own tables, so
+  several processes or shards can share one database. Everything else in the
+  state dict is stored as JSON values in a key/value table, and a flush only
+  merges in the entries this process changed (see SqliteStateStore).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+logger = logging.getLogger('OdaBot.state')
+
+STATE_FILE = Path("state.json")
+STATE_DB = Path("state.db")
+BACKENDS = ("json", "sqlite")
+FLUSH_INTERVAL = 5.0  # seconds between timed flushes
+FLUSH_THRESHOLD = 50  # pending changes that trigger an early flush
+
+
+def default_state():
+    return {"stats": {"commands_used": 0, "puns_told": 0}}
+
+
+def load_state(path=STATE_FILE):
+    """Load bot state from file"""
+    path = Path(path)
+    if path.exists():
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Failed to load state: {e}")
+    return default_state()
+
+
+def write_atomic(path, data: str):
+    """Write text to path via a temp file in the same directory and an atomic rename"""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent or ".", prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def command_tree_hash(tree, application_id=None) -> str:
+    """Stable hash of an app command tree's serialized global command definitions.
+
+    Compared against the hash stored at the last sync, it lets the bot skip
+    `tree.sync()` when nothing changed.
+    """
+    payloads = []
+    for command in tree.get_commands():
+        try:
+            payloads.append(command.to_dict(tree))
+        except TypeError:  # discord.py < 2.4 takes no tree argument
+            payloads.append(command.to_dict())
+    payloads.sort(key=lambda p: (p.get("type", 1), p["name"]))
+    blob = json.dumps({"application_id": application_id, "commands": payloads}, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def save_state(state, path=STATE_FILE):
+    """Synchronously and atomically save bot state to file"""
+    try:
+        write_atomic(path, json.dumps(state, indent=4))
+    except Exception as e:
+        logger.error(f"Failed to save state: {e}")
+
+
+class StateBackend:
+    """Holds the state dict and persists it in debounced batches.
+
+    Call mark_dirty() after mutating `state` (or use increment()/record_command()
+    for counters); call start() once the event loop is running and close() on
+    shutdown to flush anything still pending.
+
+    Subclasses implement _load(), _snapshot(), _write() and _restore().
+    """
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL, flush_threshold: int = FLUSH_THRESHOLD):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.state = self._load()
+        self.state.setdefault("stats", {})
+        self._pending = 0
+        self._lock = asyncio.Lock()
+        self._timer = None
+        self._early_flush = None
+
+    # -- backend hooks ------------------------------------------------------
+
+    def _load(self) -> dict:
+        raise NotImplementedError
+
+    def _snapshot(self):
+        """Capture what needs writing; runs on the event loop"""
+        raise NotImplementedError
+
+    def _write(self, snapshot):
+        """Persist a snapshot; runs in a worker thread"""
+        raise NotImplementedError
+
+    def _restore(self, snapshot):
+        """Put a snapshot whose write failed back so the next flush retries it"""
+
+    # -- counters -----------------------------------------------------------
+
+    def increment(self, name: str, amount: int = 1, guild_id=None):
+        """Add to a global counter, and to the guild's counter when guild_id is given"""
+        stats = self.state["stats"]
+        stats[name] = stats.get(name, 0) + amount
+        self.mark_dirty()
+
+    def record_command(self, command: str, guild_id=None):
+        """Count one app command invocation globally, per command and per guild"""
+        self.increment("commands_used", guild_id=guild_id)
+
+    async def read_stats(self) -> dict:
+        """Current global counters"""
+        return dict(self.state["stats"])
+
+    # -- flushing -----------------------------------------------------------
+
+    @property
+    def dirty(self) -> bool:
+        return self._pending > 0
+
+    def mark_dirty(self):
+        """Record a state change; flushes early once enough changes are pending"""
+        self._pending += 1
+        if self._pending >= self.flush_threshold and (self._early_flush is None or self._early_flush.done()):
+            self._early_flush = asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self):
+        """Persist the state if anything changed since the last flush"""
+        async with self._lock:
+            if not self._pending:
+                return
+            snapshot = self._snapshot()
+            pending, self._pending = self._pending, 0
+            try:
+                await asyncio.to_thread(self._write, snapshot)
+            except Exception as e:
+                self._restore(snapshot)
+                self._pending += pending
+                logger.error(f"Failed to save state: {e}")
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().create_task(self._flush_periodically())
+
+    async def close(self):
+        """Stop the flush timer and write out any pending changes"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._early_flush is not None:
+            await asyncio.gather(self._early_flush, return_exceptions=True)
+        await self.flush()
+
+
+class StateStore(StateBackend):
+    """JSON file backend: the whole state dict is rewritten atomically on each flush.
+
+    Per-guild and per-command counters live under the "guild_stats" and
+    "command_stats" keys.
+    """
+
+    def __init__(self, path=STATE_FILE, flush_interval: float = FLUSH_INTERVAL,
+                 flush_threshold: int = FLUSH_THRESHOLD):
+        self.path = Path(path)
+        super().__init__(flush_interval, flush_threshold)
+
+    def _load(self):
+        return load_state(self.path)
+
+    def _snapshot(self):
+        return json.dumps(self.state, indent=4)
+
+    def _write(self, data):
+        write_atomic(self.path, data)
+
+    def increment(self, name: str, amount: int = 1, guild_id=None):
+        if guild_id is not None:
+            guild = self.state.setdefault("guild_stats", {}).setdefault(str(guild_id), {})
+            guild[name] = guild.get(name, 0) + amount
+        super().increment(name, amount)
+
+    def record_command(self, command: str, guild_id=None):
+        commands = self.state.setdefault("command_stats", {})
+        commands[command] = commands.get(command, 0) + 1
+        super().record_command(command, guild_id)
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS guild_stats (
+    guild_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    value INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, name)
+);
+CREATE TABLE IF NOT EXISTS command_stats (
+    command TEXT PRIMARY KEY,
+    calls INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_COUNTER_UPSERT = ("INSERT INTO counters(name, value) VALUES (?, ?) "
+                   "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value")
+_GUILD_UPSERT = ("INSERT INTO guild_stats(guild_id, name, value) VALUES (?, ?, ?) "
+                 "ON CONFLICT(guild_id, name) DO UPDATE SET value = value + excluded.value")
+_COMMAND_UPSERT = ("INSERT INTO command_stats(command, calls) VALUES (?, ?) "
+                   "ON CONFLICT(command) DO UPDATE SET calls = calls + excluded.calls")
+
+
+def _apply_deltas(conn, deltas):
+    conn.executemany(_COUNTER_UPSERT, list(deltas["counters"].items()))
+    conn.executemany(_GUILD_UPSERT, [(g, n, v) for (g, n), v in deltas["guilds"].items()])
+    conn.executemany(_COMMAND_UPSERT, list(deltas["commands"].items()))
+
+
+def _empty_deltas():
+    return {"counters": {}, "guilds": {}, "commands": {}}
+
+
+def _add(table, key, amount):
+    table[key] = table.get(key, 0) + amount
+
+
+# Dict keys whose conflicting numeric items resolve with a function instead of last writer wins:
+# a stale writer must not move a cursor backwards or a hold past a post that is still held
+_RESOLVE_CONFLICTS = {"ign_cursors": max, "ign_held_cursors": min}
+
+
+def _entries(value):
+    """Split a kv value into entries that merge independently: (kind, entries).
+
+    Dicts merge per item ({key: item JSON}) and lists per element ([element JSON],
+    keeping order and duplicates); any other value is a single entry.
+    """
+    if isinstance(value, dict):
+        return dict, {key: json.dumps(item, sort_keys=True) for key, item in value.items()}
+    if isinstance(value, list):
+        return list, [json.dumps(item, sort_keys=True) for item in value]
+    return None, {"": json.dumps(value, sort_keys=True)}
+
+
+def _merge(key, current, kind, entries, old_entries):
+    """Apply one process's changes (from `old_entries` to `entries`) to the kv value currently stored"""
+    if kind is dict and isinstance(current, dict):
+        resolve = _RESOLVE_CONFLICTS.get(key)
+        for item_key in old_entries.keys() - entries.keys():
+            current.pop(item_key, None)
+        for item_key, item in entries.items():
+            if old_entries.get(item_key) == item:
+                continue
+            value = json.loads(item)
+            stored = current.get(item_key)
+            if resolve is not None and isinstance(value, int) and isinstance(stored, int):
+                value = resolve(value, stored)
+            current[item_key] = value
+        return current
+    if kind is list and isinstance(current, list):
+        stored = [json.dumps(item, sort_keys=True) for item in current]
+        if stored == old_entries:
+            # Nobody else changed the list: our version, in our order
+            return [json.loads(item) for item in entries]
+        ours, before = Counter(entries), Counter(old_entries)
+        # Drop the elements we removed (as many copies as we removed), then append the ones we added
+        drop = before - ours
+        merged = []
+        for item, value in zip(stored, current):
+            if drop[item] > 0:
+                drop[item] -= 1
+            else:
+                merged.append(value)
+        added = ours - before
+        for item in entries:
+            if added[item] > 0:
+                added[item] -= 1
+                merged.append(json.loads(item))
+        return merged
+    # Nothing stored yet, a plain value, or the type changed: our value replaces it
+    if kind is dict:
+        return {item_key: json.loads(item) for item_key, item in entries.items()}
+    if kind is list:
+        return [json.loads(item) for item in entries]
+    return json.loads(entries[""])
+
+
+class SqliteStateStore(StateBackend):
+    """SQLite (WAL) backend shared safely between processes.
+
+    Counter changes are buffered as deltas and applied with atomic upserts on
+    flush, so concurrent writers add up instead of overwriting each other. The
+    rest of the state dict is written to the kv table, one row per top-level key.
+    Each flush diffs the state against what this process last loaded or wrote
+    and, inside one write transaction, merges only the changed dict items and
+    list elements into the stored rows. Another process's jobs or cursors are
+    therefore never overwritten by a flush that did not touch them, and when
+    two processes move the same IGN cursor the newer one wins.
+    Lists keep their order: elements this process removed are dropped from the
+    stored list and the ones it added are appended.
+    On first use an existing state.json at `migrate_from` is imported.
+    """
+
+    def __init__(self, path=STATE_DB, flush_interval: float = FLUSH_INTERVAL,
+                 flush_threshold: int = FLUSH_THRESHOLD, migrate_from=STATE_FILE):
+        self.path = Path(path)
+        self.migrate_from = Path(migrate_from) if migrate_from else None
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SQLITE_SCHEMA)
+        self._deltas = _empty_deltas()
+        self._base = {}  # top-level key -> (kind, entries) as last loaded or written
+        super().__init__(flush_interval, flush_threshold)
+
+    def _execute(self, fn, *args):
+        with self._db_lock:
+            with self._conn:
+                return fn(self._conn, *args)
+
+    def _load(self):
+        self._execute(self._migrate)
+        state = {}
+        with self._db_lock:
+            for key, value in self._conn.execute("SELECT key, value FROM kv"):
+                state[key] = json.loads(value)
+                self._base[key] = _entries(state[key])
+            state["stats"] = dict(self._conn.execute("SELECT name, value FROM counters"))
+        return state
+
+    def _migrate(self, conn):
+        """Import state.json into an empty database"""
+        if self.migrate_from is None or not self.migrate_from.exists():
+            return
+        if conn.execute("SELECT 1 FROM kv UNION ALL SELECT 1 FROM counters LIMIT 1").fetchone():
+            return
+        legacy = load_state(self.migrate_from)
+        deltas = _empty_deltas()
+        for name, value in legacy.pop("stats", {}).items():
+            deltas["counters"][name] = value
+        for guild_id, counters in legacy.pop("guild_stats", {}).items():
+            for name, value in counters.items():
+                deltas["guilds"][(int(guild_id), name)] = value
+        deltas["commands"].update(legacy.pop("command_stats", {}))
+        _apply_deltas(conn, deltas)
+        conn.executemany("INSERT INTO kv(key, value) VALUES (?, ?)",
+                         [(key, json.dumps(value)) for key, value in legacy.items()])
+        logger.info(f"Migrated {self.migrate_from} into {self.path}")
+
+    def _snapshot(self):
+        changes = []
+        previous = {}
+        for key, value in self.state.items():
+            if key == "stats":
+                continue
+            kind, entries = _entries(value)
+            old_kind, old_entries = self._base.get(key, (None, {}))
+            if kind is not old_kind:
+                old_entries = kind() if kind else {}
+            if entries != old_entries or key not in self._base:
+                changes.append((key, kind, entries, old_entries))
+                previous[key] = self._base.get(key)
+                self._base[key] = (kind, entries)
+        deleted = [key for key in self._base if key not in self.state]
+        for key in deleted:
+            previous[key] = self._base.pop(key)
+        deltas, self._deltas = self._deltas, _empty_deltas()
+        return changes, deleted, previous, deltas
+
+    def _write(self, snapshot):
+        changes, deleted, _, deltas = snapshot
+
+        def _save(conn):
+            # Take the write lock before reading, so no other process writes between our read and merge
+            conn.execute("BEGIN IMMEDIATE")
+            for key, kind, entries, old_entries in changes:
+                row = conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+                value = _merge(key, json.loads(row[0]) if row else None, kind, entries, old_entries)
+                conn.execute(
+                    "INSERT INTO kv(key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                    (key, json.dumps(value)),
+                )
+            conn.executemany("DELETE FROM kv WHERE key = ?", [(key,) for key in deleted])
+            _apply_deltas(conn, deltas)
+        self._execute(_save)
+
+    def _restore(self, snapshot):
+        _, _, previous, deltas = snapshot
+        for key, base in previous.items():
+            if base is None:
+                self._base.pop(key, None)
+            else:
+                self._base[key] = base
+        for table, entries in deltas.items():
+            for key, amount in entries.items():
+                _add(self._deltas[table], key, amount)
+
+    def increment(self, name: str, amount: int = 1, guild_id=None):
+        _add(self._deltas["counters"], name, amount)
+        if guild_id is not None:
+            _add(self._deltas["guilds"], (guild_id, name), amount)
+        super().increment(name, amount)
+
+    def record_command(self, command: str, guild_id=None):
+        _add(self._deltas["commands"], command, 1)
+        super().record_command(command, guild_id)
+
+    async def read_stats(self) -> dict:
+        """Counters as stored by every process sharing the database, plus our unflushed deltas"""
+        def _read(conn):
+            return dict(conn.execute("SELECT name, value FROM counters"))
+        stats = await asyncio.to_thread(self._execute, _read)
+        for name, amount in self._deltas["counters"].items():
+            _add(stats, name, amount)
+        return stats
+
+    async def close(self):
+        await super().close()
+        with self._db_lock:
+            self._conn.close()
+
+
+def open_state_store(backend: str = "json", path=None, flush_interval: float = FLUSH_INTERVAL,
+                     json_path=STATE_FILE) -> StateBackend:
+    """Create the state store for `backend` ("json" or "sqlite").
+
+    The SQLite store imports `json_path` the first time its database is created.
+    """
+    if backend == "sqlite":
+        return SqliteStateStore(path or STATE_DB, flush_interval=flush_interval, migrate_from=json_path)
+    if backend != "json":
+        raise ValueError(f"Unknown state backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+    return StateStore(path or json_path, flush_interval=flush_interval)
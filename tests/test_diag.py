@@ -0,0 +1,52 @@
+import asyncio
+import threading
+import time
+
+import oda_diag
+from oda_diag import Diagnostics, LoopWatchdog
+
+
+class SlowStartThread(threading.Thread):
+    """A thread that is scheduled late, so it first checks its stop event after a quick restart"""
+
+    def run(self):
+        time.sleep(0.05)
+        super().run()
+
+
+def test_restarting_the_watchdog_leaves_one_thread(monkeypatch):
+    monkeypatch.setattr(oda_diag.threading, "Thread", SlowStartThread)
+    threads = []
+
+    async def run():
+        watchdog = LoopWatchdog(threshold=0.2)
+        for _ in range(3):
+            watchdog.start()
+            threads.append(watchdog._thread)
+            watchdog.stop()
+        watchdog.start()
+        threads.append(watchdog._thread)
+        await asyncio.sleep(0.3)
+        alive = [t for t in threads if t.is_alive()]
+        watchdog.stop()
+        return alive
+
+    assert asyncio.run(run()) == [threads[-1]]
+
+
+def test_profile_is_written_without_blocking_the_loop(tmp_path):
+    diagnostics = Diagnostics(profile_dir=tmp_path, profiled={"find"})
+
+    async def run():
+        with diagnostics.profile("find"):
+            await asyncio.sleep(0.1)
+        stopped = time.perf_counter()
+        # the sampler thread writes the profile after the context exits
+        while not list(tmp_path.glob("find-*.folded")) and time.perf_counter() - stopped < 2:
+            await asyncio.sleep(0.01)
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    assert time.perf_counter() - started < 2
+    [profile] = tmp_path.glob("find-*.folded")
+    assert "base_events.py:run_forever" in profile.read_text()
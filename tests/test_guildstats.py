@@ -0,0 +1,86 @@
+import random
+from types import SimpleNamespace
+
+import discord
+
+from oda_guildstats import GuildAggregates
+
+
+def _channel(kind, guild, channel_id):
+    channel = kind.__new__(kind)
+    channel.id, channel.guild = channel_id, guild
+    return channel
+
+
+class FakeGuild:
+    """The parts of discord.Guild that GuildCounts reads, kept the way discord.py's cache would"""
+
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.channels = [_channel(discord.TextChannel, self, 1), _channel(discord.VoiceChannel, self, 2),
+                         _channel(discord.CategoryChannel, self, 3)]
+        self.roles = [SimpleNamespace(id=10, guild=self)]
+        self.emojis = []
+        self.member_count = 3
+
+
+def test_counts_follow_events():
+    rng = random.Random(7)
+    stats = GuildAggregates()
+    guild = FakeGuild(100)
+    other = FakeGuild(200)
+    stats.add_guild(guild)
+    stats.add_guild(other)
+    next_id = iter(range(1000, 10**6))
+
+    for _ in range(2000):
+        event = rng.choice(["channel_create", "channel_delete", "channel_update", "role_create", "role_delete",
+                            "member_join", "member_remove", "unknown_guild_member_remove", "emojis"])
+        if event == "channel_create":
+            channel = _channel(rng.choice([discord.TextChannel, discord.VoiceChannel, discord.StageChannel]),
+                               guild, next(next_id))
+            guild.channels.append(channel)
+            stats.channel_created(channel)
+        elif event == "channel_delete" and guild.channels:
+            channel = guild.channels.pop(rng.randrange(len(guild.channels)))
+            stats.channel_deleted(channel)
+        elif event == "channel_update" and guild.channels:
+            i = rng.randrange(len(guild.channels))
+            before = guild.channels[i]
+            after = guild.channels[i] = _channel(rng.choice([discord.TextChannel, discord.VoiceChannel]),
+                                                 guild, before.id)
+            stats.channel_updated(before, after)
+        elif event == "role_create":
+            role = SimpleNamespace(id=next(next_id), guild=guild)
+            guild.roles.append(role)
+            stats.role_created(role)
+        elif event == "role_delete" and guild.roles:
+            stats.role_deleted(guild.roles.pop(rng.randrange(len(guild.roles))))
+        elif event == "member_join":
+            guild.member_count += 1
+            stats.member_joined(guild.id)
+        elif event == "member_remove" and guild.member_count:
+            # discord.py lowers member_count for any removal in a known guild, cached user or not
+            guild.member_count -= 1
+            stats.member_removed(guild.id)
+        elif event == "unknown_guild_member_remove":
+            stats.member_removed(999)
+        elif event == "emojis":
+            guild.emojis = [object()] * rng.randrange(5)
+            stats.emojis_updated(guild, guild.emojis)
+
+    assert stats.verify(guild) == {}
+    assert stats.verify(other) == {}
+    assert stats.guild_count == 2
+    assert stats.total_members == guild.member_count + other.member_count
+
+
+def test_removing_an_unknown_guild_changes_nothing():
+    stats = GuildAggregates()
+    guild = FakeGuild(100)
+    stats.add_guild(guild)
+    stats.remove_guild(999)
+    stats.member_removed(999)
+    stats.channel_created(_channel(discord.TextChannel, FakeGuild(999), 5))
+    assert stats.verify(guild) == {}
+    assert (stats.guild_count, stats.total_members) == (1, 3)
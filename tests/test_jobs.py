@@ -0,0 +1,32 @@
+import asyncio
+from contextlib import contextmanager
+
+from oda_jobs import JobScheduler
+
+
+def test_job_body_runs_under_the_profiler():
+    profiled = []
+
+    @contextmanager
+    def profile(kind):
+        profiled.append((kind, "enter"))
+        yield
+        profiled.append((kind, "exit"))
+
+    async def handler(job):
+        profiled.append((job.kind, "body"))
+        await asyncio.sleep(0)
+        return {"ok": True}
+
+    async def run():
+        scheduler = JobScheduler({}, lambda: None, workers=1, profile=profile)
+        scheduler.register("find", handler)
+        scheduler.start()
+        job = scheduler.submit("find", guild_id=1, user_id=2, params={})
+        while job.active:
+            await asyncio.sleep(0.01)
+        await scheduler.close()
+        return job.status
+
+    assert asyncio.run(run()) == "done"
+    assert profiled == [("find", "enter"), ("find", "body"), ("find", "exit")]
@@ -0,0 +1,42 @@
+import asyncio
+
+import discord
+
+from oda_metrics import BotMetrics, InstrumentedCommandTree
+
+
+def _interaction(client, name):
+    data = {
+        "id": "1", "application_id": "2", "type": 2, "token": "token", "version": 1,
+        "channel_id": "3", "locale": "en-US", "attachment_size_limit": 8388608,
+        "user": {"id": "4", "username": "tenno", "discriminator": "0", "avatar": None},
+        "data": {"id": "5", "name": name, "type": 1},
+    }
+    return discord.Interaction(data=data, state=client._connection)
+
+
+def test_command_outcomes_are_counted():
+    async def run():
+        client = discord.Client(intents=discord.Intents.none())
+        client.metrics = BotMetrics()
+        tree = InstrumentedCommandTree(client)
+        tree.on_error = lambda interaction, error: asyncio.sleep(0)
+
+        @tree.command(name="works")
+        async def works(interaction: discord.Interaction):
+            pass
+
+        @tree.command(name="breaks")
+        async def breaks(interaction: discord.Interaction):
+            raise RuntimeError("boom")
+
+        for name in ("works", "breaks", "breaks"):
+            await tree._call(_interaction(client, name))
+        await client.close()
+        return client.metrics.command_calls
+
+    calls = asyncio.run(run())
+    assert calls.value("works", "ok") == 1
+    assert calls.value("works", "error") == 0
+    assert calls.value("breaks", "error") == 2
+    assert calls.value("breaks", "ok") == 0
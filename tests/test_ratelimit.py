@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+
+import pytest
+from discord import app_commands
+
+from oda_ratelimit import RateLimiter, rate_limit, refund_rate_limits
+
+
+def _interaction():
+    return SimpleNamespace(user=SimpleNamespace(id=1), channel_id=2, guild_id=3, extras={})
+
+
+def test_refund_gives_the_token_back():
+    limiter = RateLimiter(2, 60)
+    assert limiter.hit("k", now=0) == limiter.hit("k", now=0) == 0.0
+    assert limiter.hit("k", now=0) > 0
+    limiter.refund("k")
+    assert limiter.hit("k", now=0) == 0.0
+    assert limiter.hit("k", now=0) > 0
+
+
+def test_rejected_requests_are_refunded():
+    limiter = RateLimiter(1, 60)
+
+    @rate_limit(limiter, "guild")
+    async def command(interaction):
+        pass
+
+    check = command.__discord_app_commands_checks__[0]
+    for _ in range(3):
+        interaction = _interaction()
+        assert check(interaction)
+        refund_rate_limits(interaction)  # e.g. invalid input or a full job queue
+    assert check(_interaction())
+    with pytest.raises(app_commands.CommandOnCooldown):
+        check(_interaction())
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import oda_search
+from oda_index import MessageIndex
+from oda_search import QueryTimeout, compile_query, scan_history
+
+CONTENTS = ["Need help with a riven", "WTS Wukong Prime set", "void relic fissure run?",
+            "anyone for steel path", "rivens are wild", "FISSURE time"] * 50
+
+
+class FakeChannel:
+    def __init__(self, contents):
+        author = SimpleNamespace(id=7, name="tenno")
+        # history() is newest first
+        self.messages = [SimpleNamespace(id=i, content=c, author=author) for i, c in enumerate(contents, 1)][::-1]
+
+    async def history(self, limit=None):
+        for message in self.messages[:limit]:
+            yield message
+
+
+@pytest.mark.parametrize("pattern", [r"(\w+\s?)+$", r"(x+x+)+y", r"(.*a){25}"])
+def test_catastrophic_regex_is_bounded(pattern, monkeypatch):
+    monkeypatch.setattr(oda_search, "REGEX_BUDGET", 0.5)
+    matches = compile_query(pattern, "regex")
+    started = time.perf_counter()
+    with pytest.raises(QueryTimeout):
+        for _ in range(10000):
+            matches("a" * 27 + "!")
+            matches("x" * 27)
+    assert time.perf_counter() - started < 2
+
+
+def test_cheap_regex_is_not_limited_by_the_budget(monkeypatch):
+    monkeypatch.setattr(oda_search, "REGEX_BUDGET", 0.01)
+    matches = compile_query(r"relic|fissure", "regex")
+    assert sum(matches(content) for content in CONTENTS * 200) == 2 * 50 * 200
+
+
+@pytest.mark.parametrize("text,mode", [("riven", "all"), ("ssu", "all"), ("void fissure", "all"),
+                                       ("wts path", "any"), ("ss", "any"), (r"^\w+ (time|relic)", "regex")])
+def test_index_and_scan_agree(tmp_path, text, mode):
+    async def run():
+        index = MessageIndex(tmp_path / "index.db")
+        await index.add_many([(i, c, 1, 2, 7, "tenno") for i, c in enumerate(CONTENTS, 1)])
+        indexed_total, rows = await index.search(text, 1, compile_query(text, mode), limit=10, mode=mode)
+        hits, scanned_total, _, _ = await scan_history(FakeChannel(CONTENTS), compile_query(text, mode), None)
+        index.close()
+        return indexed_total, [r[0] for r in rows], scanned_total, [h[0] for h in hits]
+
+    indexed_total, indexed_ids, scanned_total, scanned_ids = asyncio.run(run())
+    assert indexed_total == scanned_total > 0
+    assert indexed_ids == scanned_ids
+
+
+class HistoryChannel:
+    def __init__(self, channel_id=2, guild_id=1):
+        self.id, self.name, self.guild = channel_id, "general", SimpleNamespace(id=guild_id)
+        self.messages = []
+
+    def send(self, content):
+        author = SimpleNamespace(id=7, name="tenno", bot=False)
+        self.messages.append(SimpleNamespace(id=len(self.messages) + 1, content=content, author=author,
+                                             guild=self.guild, channel=self))
+
+    async def history(self, limit=None, before=None, after=None, oldest_first=False):
+        messages = [m for m in self.messages
+                    if (before is None or m.id < before.id) and (after is None or m.id > after.id)]
+        for message in (messages if oldest_first else messages[::-1])[:limit]:
+            yield message
+
+
+def test_backfill_catches_up_on_messages_sent_while_offline(tmp_path):
+    from cogs.search import Search
+
+    channel = HistoryChannel()
+    for i in range(30):
+        channel.send(f"old message {i}")
+
+    async def searchable(cog, text):
+        indexed = await cog.index.indexed_channels(c for c in [channel.id] if c in cog._caught_up)
+        total, _ = await cog.index.search(text, 1, compile_query(text), channel_ids=indexed)
+        return indexed, total
+
+    async def run():
+        bot = SimpleNamespace(get_channel=lambda channel_id: channel)
+        cog = Search(bot)
+        cog.index = MessageIndex(tmp_path / "index.db")
+        await cog._backfill_channel_history(channel)
+        assert await searchable(cog, "old") == ({channel.id}, 30)
+        cog.index.close()
+
+        # Offline: nothing reaches on_message
+        for i in range(5):
+            channel.send(f"missed message {i}")
+
+        cog = Search(bot)
+        cog.index = MessageIndex(tmp_path / "index.db")
+        assert await searchable(cog, "missed") == (set(), 0)
+        await cog.catch_up()
+        await asyncio.gather(*cog._backfills.values())
+        result = await searchable(cog, "missed")
+        assert await cog.index.backfill_state(channel.id) == (1, 35, True)
+        cog.index.close()
+        return result
+
+    assert asyncio.run(run()) == ({channel.id}, 5)
@@ -0,0 +1,106 @@
+import asyncio
+import multiprocessing
+
+from oda_state import SqliteStateStore
+
+
+def _process_a(path, b_loaded, a_flushed):
+    async def run():
+        store = SqliteStateStore(path, migrate_from=None)
+        b_loaded.wait()
+        store.state.setdefault("jobs", {})["a1"] = {"id": "a1", "status": "queued"}
+        store.state.setdefault("ign_cursors", {})["100"] = 5
+        store.state["ign_live_channels"] = [100]
+        store.mark_dirty()
+        await store.close()
+    asyncio.run(run())
+    a_flushed.set()
+
+
+def _process_b(path, b_loaded, a_flushed):
+    async def run():
+        store = SqliteStateStore(path, migrate_from=None)
+        b_loaded.set()
+        a_flushed.wait()
+        # A counter-only change, then changes to other entries of the same keys
+        store.increment("commands_used")
+        await store.flush()
+        store.state.setdefault("ign_cursors", {})["200"] = 9
+        store.state.setdefault("ign_live_channels", []).append(200)
+        store.mark_dirty()
+        await store.close()
+    asyncio.run(run())
+
+
+def test_flushes_from_two_processes_merge(tmp_path):
+    path = tmp_path / "state.db"
+    SqliteStateStore(path, migrate_from=None)._conn.close()
+    ctx = multiprocessing.get_context("spawn")
+    b_loaded, a_flushed = ctx.Event(), ctx.Event()
+    processes = [ctx.Process(target=target, args=(path, b_loaded, a_flushed)) for target in (_process_a, _process_b)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+
+    store = SqliteStateStore(path, migrate_from=None)
+    try:
+        assert store.state["jobs"] == {"a1": {"id": "a1", "status": "queued"}}
+        assert store.state["ign_cursors"] == {"100": 5, "200": 9}
+        assert sorted(store.state["ign_live_channels"]) == [100, 200]
+        assert store.state["stats"]["commands_used"] == 1
+    finally:
+        asyncio.run(store.close())
+
+
+def test_removed_entries_are_removed(tmp_path):
+    async def run():
+        store = SqliteStateStore(tmp_path / "state.db", migrate_from=None)
+        store.state["jobs"] = {"a": {"status": "done"}, "b": {"status": "queued"}}
+        store.mark_dirty()
+        await store.flush()
+        other = SqliteStateStore(tmp_path / "state.db", migrate_from=None)
+        other.state["jobs"]["c"] = {"status": "queued"}
+        other.mark_dirty()
+        await other.close()
+        del store.state["jobs"]["a"]
+        store.mark_dirty()
+        await store.close()
+        return SqliteStateStore(tmp_path / "state.db", migrate_from=None).state["jobs"]
+
+    assert asyncio.run(run()) == {"b": {"status": "queued"}, "c": {"status": "queued"}}
+
+
+def test_stale_cursor_does_not_move_backwards(tmp_path):
+    async def run():
+        store = SqliteStateStore(tmp_path / "state.db", migrate_from=None)
+        stale = SqliteStateStore(tmp_path / "state.db", migrate_from=None)
+        store.state.setdefault("ign_cursors", {})["100"] = 50
+        store.mark_dirty()
+        await store.close()
+        stale.state.setdefault("ign_cursors", {})["100"] = 20
+        stale.mark_dirty()
+        await stale.close()
+        return SqliteStateStore(tmp_path / "state.db", migrate_from=None).state["ign_cursors"]
+
+    assert asyncio.run(run()) == {"100": 50}
+
+
+def test_list_merge_keeps_order_and_duplicates(tmp_path):
+    async def run():
+        store = SqliteStateStore(tmp_path / "state.db", migrate_from=None)
+        store.state["queue"] = ["c", "a", "b", "a"]
+        store.mark_dirty()
+        await store.flush()
+        other = SqliteStateStore(tmp_path / "state.db", migrate_from=None)
+        other.state["queue"].append("a")
+        other.mark_dirty()
+        await other.close()
+        store.state["queue"].remove("a")
+        store.state["queue"].append("d")
+        store.mark_dirty()
+        await store.close()
+        return SqliteStateStore(tmp_path / "state.db", migrate_from=None).state["queue"]
+
+    assert asyncio.run(run()) == ["c", "b", "a", "a", "d"]